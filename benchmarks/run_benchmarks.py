@@ -0,0 +1,183 @@
+"""
+Offline benchmark for the agent workflows.
+
+Starts the synthetic stand-in sites on localhost, drives each workflow with a
+deterministic scripted LLM in a headless browser, and writes steps, wall time
+per step, browser action latency, tokens per step and peak memory as JSON.
+
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --workflow jira_subtasks --repeat 3
+
+Needs Playwright's Chromium (`playwright install chromium`), no API keys.
+"""
+
+import os
+
+os.environ.setdefault('ANONYMIZED_TELEMETRY', 'false')
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+from importlib.metadata import version
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from browser_use import Agent, Browser, BrowserConfig, Controller
+
+from benchmarks.scripted_llm import ScriptedChatModel
+from benchmarks.site_server import SiteServer
+from benchmarks.workflows import WORKFLOWS, Workflow
+
+logger = logging.getLogger(__name__)
+
+
+class TimedController:
+    """Controller proxy that records how long every executed action takes"""
+
+    def __init__(self, controller: Controller):
+        self._controller = controller
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+
+    def __getattr__(self, name):
+        return getattr(self._controller, name)
+
+    async def act(self, action, browser_context, *args, **kwargs):
+        name = next(iter(action.model_dump(exclude_unset=True)), 'unknown')
+        start = time.perf_counter()
+        try:
+            return await self._controller.act(action, browser_context, *args, **kwargs)
+        finally:
+            self.latencies[name].append(time.perf_counter() - start)
+
+
+def summarize(values: list[float]) -> dict:
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+    return {
+        'count': len(ordered),
+        'mean': statistics.fmean(ordered),
+        'p50': ordered[int(0.5 * (len(ordered) - 1))],
+        'p95': ordered[int(round(0.95 * (len(ordered) - 1)))],
+        'max': ordered[-1],
+    }
+
+
+async def run_workflow(workflow: Workflow, base_url: str, headless: bool = True) -> dict:
+    llm = ScriptedChatModel(script=workflow.script, base_url=base_url)
+    controller = TimedController(workflow.controller())
+    browser = Browser(config=BrowserConfig(headless=headless))
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        agent = Agent(
+            task=workflow.task.format(base=base_url),
+            llm=llm,
+            controller=controller,
+            browser=browser,
+        )
+        history = await agent.run(max_steps=len(workflow.script) + 2)
+    finally:
+        await browser.close()
+    wall_time = time.perf_counter() - start
+    _, peak_traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    steps = []
+    for i, item in enumerate(history.history):
+        actions = [next(iter(a.model_dump(exclude_unset=True)), None) for a in item.model_output.action] if item.model_output else []
+        steps.append(
+            {
+                'step': i + 1,
+                'duration_s': item.metadata.duration_seconds if item.metadata else None,
+                'input_tokens': llm.input_tokens[i] if i < len(llm.input_tokens) else None,
+                'actions': actions,
+                'errors': [r.error for r in item.result if r.error],
+            }
+        )
+
+    durations = [s['duration_s'] for s in steps if s['duration_s'] is not None]
+    tokens = [s['input_tokens'] for s in steps if s['input_tokens'] is not None]
+    return {
+        'workflow': workflow.name,
+        'success': bool(history.is_successful()) and llm.divergence is None,
+        'divergence': llm.divergence,
+        'steps': len(steps),
+        'wall_time_s': wall_time,
+        'step_time_s': summarize(durations),
+        'action_latency_s': {name: summarize(values) for name, values in controller.latencies.items()},
+        'tokens_per_step': summarize(tokens),
+        'total_input_tokens': sum(tokens),
+        'peak_python_mb': peak_traced / 2**20,
+        'per_step': steps,
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], text=True, stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--workflow', action='append', choices=sorted(WORKFLOWS), help='workflow to run (default: all)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per workflow')
+    parser.add_argument('--output', type=Path, help='JSON results file (default: benchmarks/results/<timestamp>.json)')
+    parser.add_argument('--headful', action='store_true', help='show the browser')
+    args = parser.parse_args(argv)
+
+    output = args.output or Path(__file__).parent / 'results' / f'{datetime.now():%Y%m%d-%H%M%S}.json'
+    output = output.absolute()
+    names = args.workflow or sorted(WORKFLOWS)
+    revision = _git_revision()
+
+    # workflows write job stores and caches relative to the working directory
+    workdir = tempfile.mkdtemp(prefix='agent-bench-')
+    os.chdir(workdir)
+
+    results = []
+    with SiteServer() as server:
+        for name in names:
+            for run in range(args.repeat):
+                logger.info(f'Running {name} ({run + 1}/{args.repeat})')
+                result = await run_workflow(WORKFLOWS[name], server.base_url, headless=not args.headful)
+                result['run'] = run + 1
+                results.append(result)
+                logger.info(
+                    f"{name}: {result['steps']} steps in {result['wall_time_s']:.1f}s, "
+                    f"p50 step {result['step_time_s'].get('p50', 0):.2f}s, success={result['success']}"
+                )
+
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': revision,
+        'python': platform.python_version(),
+        'browser_use': version('browser-use'),
+        # ru_maxrss is in KiB on Linux; children covers the Chrome processes
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        'peak_rss_children_mb': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024,
+        'results': results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f'Benchmark results written to {output}')
+    return report
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,131 @@
+"""
+Deterministic stand-in for the agent LLM.
+
+Plays back a fixed script of steps. Steps refer to page elements by their
+visible text or attributes instead of highlight indexes, and are resolved
+against the interactive elements listed in the latest browser-use state
+message, so a script keeps working when indexes shift between runs.
+
+Script step actions:
+    {'click': 'Create subtask'}              -> click_element on the matching element
+    {'input': ['Summary', 'some text']}      -> input_text into the matching element
+    {'upload_cv': 'Resume'}                  -> any action taking an element index
+    {'go_to_url': {'url': '{base}/x.html'}}  -> passed through, '{base}' filled in
+"""
+
+import re
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+
+from common.tokens import count_tokens
+
+_ELEMENT_LINE = re.compile(r'^\[(\d+)\]<(\w+) ?(.*?)/>$', re.MULTILINE)
+# actions whose single string argument is an element to resolve to an index
+_INDEX_ACTIONS = {'click': 'click_element'}
+
+
+class ScriptDiverged(Exception):
+    pass
+
+
+class ScriptedChatModel(BaseChatModel):
+    script: list[list[dict]]
+    base_url: str = ''
+    model_name: str = 'scripted'
+    step: int = 0
+    # input tokens of every request, for per-step token accounting
+    input_tokens: list[int] = []
+    divergence: Optional[str] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return 'scripted'
+
+    def bind_tools(self, tools, *, tool_choice=None, **kwargs):
+        return self.bind(tools=[convert_to_openai_tool(tool) for tool in tools])
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        self.input_tokens.append(sum(count_tokens(_text(message.content)) for message in messages))
+        tools = kwargs.get('tools') or []
+        tool_name = tools[0]['function']['name'] if tools else 'AgentOutput'
+
+        page = next((_text(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), '')
+        try:
+            actions = self._resolve(self.script[self.step], page) if self.step < len(self.script) else self._finish()
+        except ScriptDiverged as e:
+            self.divergence = f'step {self.step + 1}: {e}'
+            actions = [{'done': {'text': f'Script diverged at {self.divergence}', 'success': False}}]
+        self.step += 1
+
+        output = {
+            'current_state': {
+                'evaluation_previous_goal': 'Success',
+                'memory': f'Scripted step {self.step}/{len(self.script)}',
+                'next_goal': next(iter(actions[0])),
+            },
+            'action': actions,
+        }
+        message = AIMessage(content='', tool_calls=[{'name': tool_name, 'args': output, 'id': f'scripted-{self.step}'}])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _finish(self) -> list[dict]:
+        return [{'done': {'text': 'Script finished', 'success': True}}]
+
+    def _resolve(self, step: list[dict], page: str) -> list[dict]:
+        actions = []
+        for action in step:
+            (name, value), = action.items()
+            if name == 'input':
+                label, text = value
+                actions.append({'input_text': {'index': _find(page, label), 'text': text}})
+            elif name in _INDEX_ACTIONS:
+                actions.append({_INDEX_ACTIONS[name]: {'index': _find(page, value)}})
+            elif isinstance(value, str):
+                actions.append({name: {'index': _find(page, value)}})
+            else:
+                actions.append({name: _fill(value, self.base_url)})
+        return actions
+
+
+def _text(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    return '\n'.join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+
+
+def _find(page: str, label: str) -> int:
+    """Index of the element whose text or attributes best match `label`"""
+    wanted = label.lower()
+    exact, partial = None, None
+    for match in _ELEMENT_LINE.finditer(page):
+        index, _, rest = match.groups()
+        parts = [p.strip().lower() for p in re.split(r'[;>]', rest) if p.strip()]
+        if wanted in parts and exact is None:
+            exact = int(index)
+        elif partial is None and wanted in rest.lower():
+            partial = int(index)
+    if exact is not None:
+        return exact
+    if partial is not None:
+        return partial
+    raise ScriptDiverged(f'no element matching {label!r} on the page')
+
+
+def _fill(value: Any, base_url: str) -> Any:
+    if isinstance(value, str):
+        return value.replace('{base}', base_url)
+    if isinstance(value, dict):
+        return {k: _fill(v, base_url) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_fill(v, base_url) for v in value]
+    return value
@@ -0,0 +1,39 @@
+"""
+Serves the synthetic stand-in sites from benchmarks/sites on localhost.
+"""
+
+import functools
+import logging
+import threading
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+SITES_DIR = Path(__file__).parent / 'sites'
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+class SiteServer:
+    def __init__(self, directory: Path = SITES_DIR, port: int = 0):
+        handler = functools.partial(_QuietHandler, directory=str(directory))
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        logger.info(f'Serving benchmark sites at {self.base_url}')
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
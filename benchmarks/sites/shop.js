@@ -0,0 +1,68 @@
+// Minimal grocery storefront: search -> results -> product -> cart -> checkout.
+// Catalogue and prices come from the data-* attributes on <body>.
+(function () {
+  const body = document.body;
+  const store = body.dataset.store;
+  const catalogue = JSON.parse(body.dataset.catalogue);
+  const deliveryFee = Number(body.dataset.deliveryFee);
+  const eta = body.dataset.eta;
+  const main = document.getElementById('main');
+  let cart = [];
+
+  function money(value) {
+    return '₹' + value.toFixed(0);
+  }
+
+  function home() {
+    main.innerHTML =
+      '<form id="search-form"><input id="q" name="q" placeholder="Search for products" aria-label="Search for products">' +
+      '<button type="submit">Search</button></form>';
+    document.getElementById('search-form').onsubmit = function (e) {
+      e.preventDefault();
+      results(document.getElementById('q').value);
+    };
+  }
+
+  function results(query) {
+    const words = query.toLowerCase().split(/\s+/).filter(Boolean);
+    const hits = catalogue.filter(p => words.some(w => p.name.toLowerCase().includes(w)));
+    main.innerHTML = '<h2>Results for "' + query + '"</h2><ul id="results"></ul>';
+    const list = document.getElementById('results');
+    hits.forEach(p => {
+      const li = document.createElement('li');
+      li.innerHTML = '<a href="#" data-id="' + p.id + '">' + p.name + '</a> <span class="price">' + money(p.price) + '</span>';
+      li.querySelector('a').onclick = e => { e.preventDefault(); product(p); };
+      list.appendChild(li);
+    });
+  }
+
+  function product(p) {
+    main.innerHTML =
+      '<h1 class="product-name">' + p.name + '</h1>' +
+      '<div class="price">Price: ' + money(p.price) + '</div>' +
+      '<div class="mrp">MRP: <s>' + money(p.mrp) + '</s></div>' +
+      '<div class="delivery">Delivery fee: ' + money(deliveryFee) + ' · Arrives ' + eta + '</div>' +
+      '<div class="offers">' + (p.offer || 'No offers') + '</div>' +
+      '<button id="add">Add to cart</button>';
+    document.getElementById('add').onclick = function () { cart.push(p); showCart(); };
+  }
+
+  function showCart() {
+    const total = cart.reduce((sum, p) => sum + p.price, 0) + deliveryFee;
+    main.innerHTML =
+      '<h2>Your cart</h2><ul>' + cart.map(p => '<li>' + p.name + ' ' + money(p.price) + '</li>').join('') + '</ul>' +
+      '<div class="total">Total with delivery: ' + money(total) + '</div>' +
+      '<button id="checkout">Proceed to checkout</button>';
+    document.getElementById('checkout').onclick = checkout;
+  }
+
+  function checkout() {
+    main.innerHTML =
+      '<h2>Select a payment method</h2>' +
+      '<label><input type="radio" name="pay" value="upi"> UPI</label>' +
+      '<label><input type="radio" name="pay" value="card"> Card</label>';
+  }
+
+  document.title = store;
+  home();
+})();
@@ -0,0 +1,110 @@
+"""
+Benchmark workflows: the repo's agent tasks pointed at the local stand-in sites,
+each with the script the ScriptedChatModel plays back.
+"""
+
+from dataclasses import dataclass, field
+from typing import Callable
+
+from browser_use import Controller
+
+
+@dataclass
+class Workflow:
+    name: str
+    task: str
+    script: list[list[dict]]
+    controller: Callable[[], Controller] = field(default=Controller)
+
+
+def _job_search_controller() -> Controller:
+    # imported lazily, only this workflow needs the job search module
+    from job_search_agent.read_apply_job import controller
+
+    return controller
+
+
+GROCERY = Workflow(
+    name='grocery_compare',
+    task=(
+        'Help purchase Fortune Basmati Rice 5kg by comparing prices on Flipmart Minutes ({base}/shop_a.html) '
+        'and Amazone Fresh ({base}/shop_b.html). Search each store, note the product name, price and delivery fee, '
+        'add the cheaper one to the cart and proceed to checkout. Stop at the payment selection page.'
+    ),
+    script=[
+        [{'go_to_url': {'url': '{base}/shop_a.html'}}],
+        [{'input': ['Search for products', 'Fortune Basmati Rice 5kg']}],
+        [{'click': 'Search'}],
+        [{'click': 'Fortune Basmati Rice 5kg'}],
+        [{'go_to_url': {'url': '{base}/shop_b.html'}}],
+        [{'input': ['Search for products', 'Fortune Basmati Rice 5kg']}],
+        [{'click': 'Search'}],
+        [{'click': 'Fortune Basmati Rice 5kg'}],
+        [{'go_to_url': {'url': '{base}/shop_a.html'}}],
+        [{'input': ['Search for products', 'Fortune Basmati Rice 5kg']}],
+        [{'click': 'Search'}],
+        [{'click': 'Fortune Basmati Rice 5kg'}],
+        [{'click': 'Add to cart'}],
+        [{'click': 'Proceed to checkout'}],
+        [{'done': {'text': 'Flipmart Minutes is cheaper: 629 + 25 delivery vs 649 free delivery', 'success': True}}],
+    ],
+)
+
+_SUBTASKS = [
+    ('Set up JWT authentication infrastructure', 'Token generation, signing and verification utilities'),
+    ('Create authentication middleware for REST API endpoints', 'Validate JWT tokens on protected routes'),
+    ('Document authenticated API endpoints with Swagger', 'Document auth requirements for each endpoint'),
+    ('Implement secure token refresh mechanism', 'Refresh tokens, rotation and blacklisting'),
+]
+
+JIRA = Workflow(
+    name='jira_subtasks',
+    task=(
+        'Navigate to {base}/jira_issue.html and create 4 JWT authentication subtasks under MP-1 using the '
+        '"Create subtask" button. Fill in summary, description and labels for each and save it.'
+    ),
+    script=[[{'go_to_url': {'url': '{base}/jira_issue.html'}}]]
+    + [
+        step
+        for summary, description in _SUBTASKS
+        for step in (
+            [{'click': 'Create subtask'}],
+            [{'input': ['Summary', summary]}],
+            [{'input': ['Description', description]}],
+            [{'input': ['Labels', 'authentication, api']}],
+            [{'click': 'Create'}],
+        )
+    ]
+    + [[{'done': {'text': 'Created 4 subtasks under MP-1', 'success': True}}]],
+)
+
+CAREERS = Workflow(
+    name='careers_apply',
+    task=(
+        'You are a professional job finder. First, read my CV using the read_cv action. Then open the careers page '
+        '{base}/careers.html, find the machine learning internship, apply with my details and upload my CV, '
+        'and save the listing with a fit score.'
+    ),
+    script=[
+        [{'read_cv': {}}],
+        [{'go_to_url': {'url': '{base}/careers.html'}}],
+        [{'click': 'Machine Learning Intern'}],
+        [{'fill_application_form': {}}],
+        [{'click': 'Submit application'}],
+        [
+            {
+                'save_jobs': {
+                    'title': 'Machine Learning Intern',
+                    'link': '{base}/careers.html#ml-intern',
+                    'company': 'Gooble',
+                    'fit_score': 0.8,
+                    'location': 'Berlin, Germany',
+                }
+            }
+        ],
+        [{'done': {'text': 'Applied to Machine Learning Intern at Gooble', 'success': True}}],
+    ],
+    controller=_job_search_controller,
+)
+
+WORKFLOWS = {workflow.name: workflow for workflow in (GROCERY, JIRA, CAREERS)}
@@ -1,71 +1,134 @@
-from browser_use import Agent, Browser, BrowserConfig
+from browser_use import Agent, Controller
 from langchain_openai import ChatOpenAI
+import argparse
 import asyncio
 import dotenv
 import os
+import sys
+from typing import Optional
 from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.browser_profiles import get_profile
+from common.context_budget import PayloadStore, register_payload_actions, with_context_budget
+from common.history_log import HistoryLog
+from common.llm_cache import with_llm_cache
+from common.screenshots import ScreenshotSink
+from browser_agent.site_crawler import CrawlConfig, SiteCrawler, write_user_guide
+
 dotenv.load_dotenv()
 
-# Create documentation directory if it doesn't exist
+URL = "https://civic-info-frontend.vercel.app/"
+
+# Documentation directory, created when a run starts
 docs_dir = "website_documentation"
-if not os.path.exists(docs_dir):
-    os.makedirs(docs_dir)
-
-# Configure the browser to connect to your Chrome instance
-browser = Browser(
-    config=BrowserConfig(
-        # Specify the path to your Chrome executable
-        chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',  # macOS path
-        # For Windows, typically: 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
-        # For Linux, typically: '/usr/bin/google-chrome'
-    )
-)
 
-# Create the agent with your configured browser
-agent = Agent(
-    task="""
-    Explore and document the website at https://civic-info-frontend.vercel.app/ thoroughly.
-    
+EXPLORATION_TASK = f"""
+    Explore and document the website at {URL} thoroughly.
+
     Follow these steps in your exploration:
-    1. Start by visiting the homepage and capture a screenshot.
+    1. Start by visiting the homepage.
     2. Identify all main navigation elements (menu items, buttons, links).
     3. Systematically explore each section of the website by clicking on navigation elements.
     4. For each page you visit:
-       - Take a screenshot
        - Record the page title and main headings
        - Document all interactive elements (buttons, forms, links)
        - Note the purpose and functionality of the page
     5. Test any forms or interactive elements you encounter (without submitting personal information).
     6. Document the user flow between pages.
-    
+
     Generate comprehensive documentation that includes:
     - A site map showing the relationship between pages
     - Step-by-step instructions for common user journeys
     - Detailed descriptions of UI elements and their functions
-    - Screenshots of each important page and feature
-    
-    Save all screenshots to the 'website_documentation' folder with descriptive filenames.
-    
+
+    Screenshots of every page are captured automatically, do not take them yourself.
+
     Compile all findings into a markdown document that provides a complete user guide to the website.
-    """,
-    llm=ChatOpenAI(model='gpt-4o'),
-    browser=browser,
-)
+    """
+
+
+def create_screenshot_sink(output_dir=docs_dir):
+    # Every page's screenshot is deduplicated and stored as WebP off the event loop
+    return ScreenshotSink(os.path.join(output_dir, "screenshots"), format="webp", quality=70)
+
+
+async def document_with_crawler(max_pages, concurrency, screenshots=None, url=URL, output_dir=docs_dir, llm=None):
+    """Crawl the site without an LLM, then write the guide from the sitemap in a few LLM calls"""
+    os.makedirs(output_dir, exist_ok=True)
+    config = CrawlConfig(max_pages=max_pages, concurrency=concurrency)
+    sitemap = await SiteCrawler(config, screenshots=screenshots).crawl(url)
+    sitemap_path = os.path.join(output_dir, "sitemap.json")
+    sitemap.save(sitemap_path)
+    print(f"Crawled {len(sitemap.pages)} pages ({len(sitemap.edges())} links), sitemap saved to {sitemap_path}")
+
+    guide = await write_user_guide(sitemap, llm or with_llm_cache(ChatOpenAI(model='gpt-4o')))
+    guide_path = os.path.join(output_dir, "user_guide.md")
+    with open(guide_path, "w") as f:
+        f.write(guide)
+    return f"User guide written to {guide_path}"
+
+
+async def document_with_agent(screenshots: Optional[ScreenshotSink] = None):
+    """Let the agent drive every click of the exploration"""
+    # Your Chrome (CHROME_PATH); the screenshots need images, so this does not default to the fast profile
+    browser = get_profile('document_site').create_browser()
+    payloads = PayloadStore()
+    controller = Controller()
+    register_payload_actions(controller, payloads)
+    agent = Agent(
+        task=EXPLORATION_TASK,
+        llm=with_context_budget(with_llm_cache(ChatOpenAI(model='gpt-4o')), payloads),
+        controller=controller,
+        browser=browser,
+        register_new_step_callback=screenshots.step_callback() if screenshots else None,
+    )
+    # Only the last steps stay in memory; the whole exploration is logged to disk
+    history_log = HistoryLog.from_env()
+    run = history_log.attach(agent, label='document_site') if history_log else None
+    try:
+        result = await agent.run()
+        if run is not None:
+            pages = {entry.url for entry in history_log.index(run.id) if entry.url}
+            print(f"Explored {len(pages)} pages in {run.steps} steps, see: python -m common.history_log steps {run.id}")
+        if sys.stdin.isatty():
+            input('Press Enter to close the browser...')
+    finally:
+        await browser.close()
+        if history_log is not None:
+            history_log.log_stats()
+            history_log.close()
+    return result
+
 
 async def main():
+    parser = argparse.ArgumentParser(description="Document a website")
+    parser.add_argument("--agent", action="store_true", help="explore with the LLM agent instead of the crawler")
+    parser.add_argument("--max-pages", type=int, default=200, help="crawler page limit")
+    parser.add_argument("--concurrency", type=int, default=4, help="crawler tabs in parallel")
+    args = parser.parse_args()
+
     print(f"Starting website documentation at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"Target website: https://civic-info-frontend.vercel.app/")
-    print("Agent is exploring the website and generating documentation...")
-    
-    result = await agent.run()
-    
+    print(f"Target website: {URL}")
+
+    os.makedirs(docs_dir, exist_ok=True)
+    screenshots = create_screenshot_sink()
+    try:
+        if args.agent:
+            print("Agent is exploring the website and generating documentation...")
+            result = await document_with_agent(screenshots)
+        else:
+            print("Crawling the website, the LLM only writes the final guide...")
+            result = await document_with_crawler(args.max_pages, args.concurrency, screenshots)
+    finally:
+        screenshots.close()
+
     print("\nDocumentation generation complete!")
     print(f"Results saved to the '{docs_dir}' directory")
+    print(f"Screenshots: {screenshots.stats['saved']} saved, {screenshots.stats['duplicates']} duplicates skipped (see {screenshots.manifest_path})")
     print("Summary of findings:")
     print(result)
-    
-    input('Press Enter to close the browser...')
-    await browser.close()
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -1,34 +1,36 @@
-from browser_use import Agent, Browser, BrowserConfig
+from browser_use import Agent
 from langchain_openai import ChatOpenAI
 import asyncio
 import dotenv
+import os
+import sys
 dotenv.load_dotenv()
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.browser_profiles import get_profile
+
 # Define the target URL
 JIRA_URL = "https://knowledge-gain-ai.atlassian.net/jira/software/projects/MP/boards/2"
 
-# Configure the browser to connect to your Chrome instance
-browser = Browser(
-    config=BrowserConfig(
-        chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-        headless=False,
-    )
-)
+async def main():
+    # Connects to your Chrome instance (CHROME_PATH) so its Jira login is reused
+    browser = get_profile('google_search').create_browser()
 
-# Create the agent with your configured browser
-agent = Agent(
-    task=f"Open a new tab and navigate to {JIRA_URL}",
-    llm=ChatOpenAI(model='gpt-4'),
-    browser=browser
-)
+    # Create the agent with your configured browser
+    agent = Agent(
+        task=f"Open a new tab and navigate to {JIRA_URL}",
+        llm=ChatOpenAI(model='gpt-4'),
+        browser=browser
+    )
 
-async def main():
     try:
         result = await agent.run()
         print("Navigation completed!")
         print("Result:", result)
         
-        input('Press Enter to close the browser tab...')
+        if sys.stdin.isatty():
+            input('Press Enter to close the browser tab...')
     except Exception as e:
         print(f"An error occurred: {str(e)}")
     finally:
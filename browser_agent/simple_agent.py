@@ -1,35 +1,42 @@
 from langchain_openai import ChatOpenAI
-from browser_use import Agent, Browser, BrowserConfig
+from browser_use import Agent
 from dotenv import load_dotenv
 import os
 from langchain_google_genai import ChatGoogleGenerativeAI
 from pydantic import SecretStr
+import sys
 load_dotenv()
 
 import asyncio
 
-llm = ChatOpenAI(model="gpt-4o")
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.browser_profiles import get_profile
+from common.model_router import with_model_router
+
 URL = "https://civic-info-frontend.vercel.app/"
 
 api_key = os.getenv("GEMINI_API_KEY")
 
-# Initialize the model
-llm_gemini = ChatGoogleGenerativeAI(model='gemini-2.0-flash-exp', api_key=SecretStr(os.getenv('GEMINI_API_KEY')))
 
+async def main():
+    # Initialize the model
+    llm_gemini = ChatGoogleGenerativeAI(model='gemini-2.0-flash-exp', api_key=SecretStr(os.getenv('GEMINI_API_KEY')))
+
+    # Gemini Flash drives the routine steps, GPT-4o plans and recovers from errors
+    llm = with_model_router(ChatOpenAI(model="gpt-4o"), fast=llm_gemini)
 
-browser = Browser(
-    config=BrowserConfig(
-        chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
-    )
-)
+    # Your Chrome (CHROME_PATH) by default, AGENT_BROWSER_PROFILE_SIMPLE_AGENT=fast for headless
+    browser = get_profile('simple_agent').create_browser()
 
-async def main():
     agent = Agent(
         task="Open this https://civic-info-frontend.vercel.app/ and once page is loaded search for Donald Trump",
-        llm=llm_gemini,
+        llm=llm,
         browser=browser
     )
     result = await agent.run()
     print(result)
+    llm.log_stats()
 
-asyncio.run(main())
\ No newline at end of file
+if __name__ == '__main__':
+    asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,331 @@
+"""
+Deterministic breadth-first site crawler for the documentation agent.
+
+Crawls a site with a handful of tabs in parallel, with no LLM in the loop.
+A deduplicated URL frontier stays inside the start origin. Each page yields
+its title, headings, forms, buttons and links, which are recorded in a
+sitemap graph. The graph is compact enough to hand to the LLM in a few calls
+that only write the user-guide prose.
+"""
+
+import asyncio
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urldefrag, urlsplit, urlunsplit
+
+from browser_use import Browser, BrowserConfig
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from common.rate_limit import DomainRateLimiter
+from common.screenshots import ScreenshotSink
+from common.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Collects everything the guide needs from a rendered page in one round trip
+_EXTRACT_JS = """
+() => {
+    const text = (el) => (el.innerText || el.value || el.getAttribute('aria-label') || el.title || '')
+        .replace(/\\s+/g, ' ').trim().slice(0, 120);
+    const visible = (el) => !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    const headings = [...document.querySelectorAll('h1, h2, h3, h4')]
+        .filter(visible)
+        .map((el) => ({level: Number(el.tagName[1]), text: text(el)}))
+        .filter((h) => h.text);
+    const forms = [...document.querySelectorAll('form')].map((form) => ({
+        action: form.getAttribute('action') ? form.action : null,
+        method: (form.getAttribute('method') || 'get').toLowerCase(),
+        fields: [...form.querySelectorAll('input, select, textarea')]
+            .filter((el) => el.type !== 'hidden')
+            .map((el) => {
+                const label = (el.labels && el.labels[0] && text(el.labels[0])) || el.placeholder || el.name || el.id || '';
+                return {name: el.name || el.id || '', type: el.type || el.tagName.toLowerCase(), label: label.slice(0, 80), required: !!el.required};
+            }),
+        submit: text(form.querySelector('button[type=submit], input[type=submit], button') || form) || null,
+    }));
+    const links = [...document.querySelectorAll('a[href]')]
+        .filter((a) => !a.href.startsWith('javascript:') && !a.href.startsWith('mailto:') && !a.href.startsWith('tel:'))
+        .map((a) => ({href: a.href, text: text(a)}));
+    const buttons = [...document.querySelectorAll('button, [role=button], input[type=button]')]
+        .filter((el) => visible(el) && !el.closest('form'))
+        .map(text)
+        .filter(Boolean);
+    const description = document.querySelector('meta[name=description]');
+    return {
+        title: document.title,
+        description: description ? description.content : null,
+        headings, forms, links,
+        buttons: [...new Set(buttons)].slice(0, 30),
+    };
+}
+"""
+
+
+@dataclass
+class CrawlConfig:
+    max_pages: int = 200
+    # Tabs crawling in parallel
+    concurrency: int = 4
+    max_depth: Optional[int] = None
+    # Milliseconds to wait for navigation, and for client-side rendering to settle after it
+    timeout: int = 15000
+    settle: int = 500
+    # Seconds between requests to the site, 0 for none
+    delay: float = 0.0
+    # URL path patterns that are never visited (regular expressions)
+    exclude: list[str] = field(default_factory=lambda: [r'logout', r'sign-?out', r'\.(pdf|zip|png|jpe?g|gif|svg)$'])
+    headless: bool = True
+
+
+@dataclass
+class PageInfo:
+    url: str
+    depth: int
+    title: str = ''
+    description: Optional[str] = None
+    headings: list[dict] = field(default_factory=list)
+    forms: list[dict] = field(default_factory=list)
+    buttons: list[str] = field(default_factory=list)
+    # Same-origin pages this page links to, with their link texts
+    links: dict[str, str] = field(default_factory=dict)
+    external_links: list[str] = field(default_factory=list)
+    status: Optional[int] = None
+    error: Optional[str] = None
+
+
+@dataclass
+class SiteMap:
+    start_url: str
+    pages: dict[str, PageInfo] = field(default_factory=dict)
+
+    def edges(self) -> list[tuple[str, str]]:
+        return [(url, target) for url, page in self.pages.items() for target in page.links if target in self.pages]
+
+    def save(self, path: str | Path):
+        data = {'start_url': self.start_url, 'pages': [asdict(page) for page in self.pages.values()]}
+        Path(path).write_text(json.dumps(data, indent=2))
+
+    @classmethod
+    def load(cls, path: str | Path) -> 'SiteMap':
+        data = json.loads(Path(path).read_text())
+        return cls(data['start_url'], {page['url']: PageInfo(**page) for page in data['pages']})
+
+    def compact(self, urls: Optional[list[str]] = None) -> str:
+        """Plain-text outline of the crawled pages for the LLM"""
+        origin = _origin(self.start_url)
+
+        def path(url: str) -> str:
+            return url[len(origin):] or '/'
+
+        blocks = []
+        for url in urls or sorted(self.pages, key=lambda u: (self.pages[u].depth, u)):
+            page = self.pages[url]
+            if page.error:
+                continue
+            lines = [f'## {path(url)} | {page.title}']
+            if page.description:
+                lines.append(f'Description: {page.description}')
+            lines += [f"{'  ' * (h['level'] - 1)}- {h['text']}" for h in page.headings[:15]]
+            for form in page.forms:
+                fields = ', '.join(f"{f['label'] or f['name']} ({f['type']}{', required' if f['required'] else ''})" for f in form['fields'])
+                lines.append(f"Form [{form['method'].upper()}] fields: {fields}; submit: {form['submit']}")
+            if page.buttons:
+                lines.append(f"Buttons: {', '.join(page.buttons[:15])}")
+            targets = [f'{text or "?"} -> {path(target)}' for target, text in page.links.items() if target in self.pages]
+            if targets:
+                lines.append(f"Links: {'; '.join(targets[:25])}")
+            blocks.append('\n'.join(lines))
+        return '\n\n'.join(blocks)
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f'{parts.scheme}://{parts.netloc}'
+
+
+def normalize_url(url: str) -> str:
+    """Canonical page URL: no fragment (unless it is a hash route), no trailing slash"""
+    base, fragment = urldefrag(url)
+    parts = urlsplit(base)
+    path = parts.path.rstrip('/') or '/'
+    normalized = urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+    # SPA hash routing ('#/about', '#!/about') addresses different pages
+    return f'{normalized}#{fragment}' if fragment.startswith(('/', '!')) else normalized
+
+
+class SiteCrawler:
+    def __init__(self, config: Optional[CrawlConfig] = None, screenshots: Optional[ScreenshotSink] = None):
+        self.config = config or CrawlConfig()
+        self.screenshots = screenshots
+        self._exclude = [re.compile(pattern, re.IGNORECASE) for pattern in self.config.exclude]
+        self._rate_limiter = DomainRateLimiter(min_interval=self.config.delay, jitter=0)
+
+    def in_scope(self, url: str, origin: str) -> bool:
+        if _origin(url) != origin:
+            return False
+        return not any(pattern.search(urlsplit(url).path) for pattern in self._exclude)
+
+    async def crawl(self, start_url: str) -> SiteMap:
+        start_url = normalize_url(start_url)
+        origin = _origin(start_url)
+        sitemap = SiteMap(start_url)
+        frontier: asyncio.Queue[tuple[str, int]] = asyncio.Queue()
+        seen = {start_url}
+        frontier.put_nowait((start_url, 0))
+        # pages claimed by workers, so parallel tabs never overshoot max_pages
+        claimed = 0
+
+        browser = Browser(config=BrowserConfig(headless=self.config.headless))
+        try:
+            playwright_browser = await browser.get_playwright_browser()
+            context = await playwright_browser.new_context(viewport={'width': 1280, 'height': 800})
+
+            async def worker():
+                nonlocal claimed
+                page = await context.new_page()
+                try:
+                    while True:
+                        url, depth = await frontier.get()
+                        try:
+                            if claimed >= self.config.max_pages:
+                                continue
+                            claimed += 1
+                            try:
+                                info = await self._visit(page, url, depth, step=claimed)
+                            except Exception as e:
+                                # one bad page must not end the worker, or the join below never returns
+                                logger.exception(f'Crawling {url} failed')
+                                info = PageInfo(url=url, depth=depth, error=str(e).splitlines()[0] if str(e) else type(e).__name__)
+                            sitemap.pages[url] = info
+                            logger.info(f'[{len(sitemap.pages)}/{self.config.max_pages}] {url} {info.error or ""}'.rstrip())
+                            if self.config.max_depth is not None and depth >= self.config.max_depth:
+                                continue
+                            for link in info.links:
+                                if link not in seen and self.in_scope(link, origin):
+                                    seen.add(link)
+                                    frontier.put_nowait((link, depth + 1))
+                        finally:
+                            frontier.task_done()
+                finally:
+                    await page.close()
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.config.concurrency)]
+            try:
+                await frontier.join()
+            finally:
+                for task in workers:
+                    task.cancel()
+                await asyncio.gather(*workers, return_exceptions=True)
+                await context.close()
+        finally:
+            await browser.close()
+        return sitemap
+
+    async def _visit(self, page, url: str, depth: int, step: int) -> PageInfo:
+        await self._rate_limiter.wait(url)
+        try:
+            response = await page.goto(url, wait_until='domcontentloaded', timeout=self.config.timeout)
+            try:
+                await page.wait_for_load_state('networkidle', timeout=self.config.settle * 4)
+            except Exception:
+                # pages with polling or websockets never go idle
+                pass
+            await page.wait_for_timeout(self.config.settle)
+            data = await page.evaluate(_EXTRACT_JS)
+        except Exception as e:
+            return PageInfo(url=url, depth=depth, error=str(e).splitlines()[0])
+
+        origin = _origin(url)
+        links, external = {}, []
+        for link in data['links']:
+            target = normalize_url(link['href'])
+            if _origin(target) == origin:
+                if target != url:
+                    links.setdefault(target, link['text'])
+            elif target not in external:
+                external.append(target)
+
+        if self.screenshots is not None:
+            try:
+                self.screenshots.submit(await page.screenshot(type='png'), url, step)
+            except Exception as e:
+                # a crashed page or a navigation during the capture only costs the screenshot
+                logger.warning(f'Screenshot of {url} failed: {str(e).splitlines()[0]}')
+
+        return PageInfo(
+            url=url,
+            depth=depth,
+            title=data['title'],
+            description=data['description'],
+            headings=data['headings'],
+            forms=data['forms'],
+            buttons=data['buttons'],
+            links=links,
+            external_links=external[:50],
+            status=response.status if response else None,
+        )
+
+
+GUIDE_SYSTEM_PROMPT = (
+    'You are a technical writer. You get an outline of a website produced by a crawler: every page with its '
+    'path, title, headings, forms, buttons and the links between pages. Write clear, accurate user documentation '
+    'in Markdown. Only describe what the outline shows; do not invent features.'
+)
+
+SECTION_PROMPT = """Document these pages of {site} for a user guide. For every page explain its purpose, its main \
+sections, how to use its forms and buttons, and where its links lead.
+
+{outline}"""
+
+GUIDE_PROMPT = """Write the complete user guide for {site} in Markdown with:
+- an overview of the site and its purpose
+- a site map showing how the pages relate (nested list)
+- step-by-step instructions for the common user journeys
+- a section per page describing its UI elements and what they do
+
+{material}"""
+
+
+async def write_user_guide(sitemap: SiteMap, llm: BaseChatModel, max_tokens_per_call: int = 12000) -> str:
+    """User guide prose from the sitemap: one call for small sites, per-section calls plus one merge otherwise"""
+    site = sitemap.start_url
+    outline = sitemap.compact()
+    if count_tokens(outline) <= max_tokens_per_call:
+        return await _complete(llm, GUIDE_PROMPT.format(site=site, material=f'Site outline:\n\n{outline}'))
+
+    # group pages into outline chunks that fit a call, documented in parallel
+    chunks, current, size = [], [], 0
+    for url in sorted(sitemap.pages, key=lambda u: (urlsplit(u).path, u)):
+        tokens = count_tokens(sitemap.compact([url]))
+        if current and size + tokens > max_tokens_per_call:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(url)
+        size += tokens
+    if current:
+        chunks.append(current)
+    logger.info(f'Writing the guide in {len(chunks)} sections plus one merge call')
+    sections = await asyncio.gather(
+        *(_complete(llm, SECTION_PROMPT.format(site=site, outline=sitemap.compact(chunk))) for chunk in chunks)
+    )
+
+    # the merge call gets the page sections plus a bare page/link skeleton for the site map
+    origin = _origin(site)
+    skeleton = '\n'.join(
+        f"{url[len(origin):] or '/'} | {page.title} -> "
+        + ', '.join(t[len(origin):] or '/' for t in page.links if t in sitemap.pages)
+        for url, page in sitemap.pages.items()
+        if not page.error
+    )
+    material = f'Page links:\n{skeleton}\n\nPage documentation:\n\n' + '\n\n'.join(sections)
+    return await _complete(llm, GUIDE_PROMPT.format(site=site, material=material))
+
+
+async def _complete(llm: BaseChatModel, prompt: str) -> str:
+    message = await llm.ainvoke([SystemMessage(content=GUIDE_SYSTEM_PROMPT), HumanMessage(content=prompt)])
+    return message.content if isinstance(message.content, str) else str(message.content)
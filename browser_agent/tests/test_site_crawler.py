@@ -0,0 +1,135 @@
+import asyncio
+
+import pytest
+
+from browser_agent import site_crawler
+from browser_agent.site_crawler import CrawlConfig, PageInfo, SiteCrawler, SiteMap, normalize_url
+
+ORIGIN = 'https://docs.example'
+
+
+@pytest.mark.parametrize('url,expected', [
+    ('https://Docs.Example/guide/', 'https://docs.example/guide'),
+    ('https://docs.example', 'https://docs.example/'),
+    ('https://docs.example/guide#install', 'https://docs.example/guide'),
+    ('https://docs.example/guide/?page=2#top', 'https://docs.example/guide?page=2'),
+    ('https://docs.example/#/about', 'https://docs.example/#/about'),
+    ('https://docs.example/#!/about', 'https://docs.example/#!/about'),
+])
+def test_normalize_url(url, expected):
+    assert normalize_url(url) == expected
+
+
+def test_in_scope_keeps_to_the_origin_and_skips_excluded_paths():
+    crawler = SiteCrawler(CrawlConfig(exclude=CrawlConfig().exclude + [r'^/admin']))
+    assert crawler.in_scope(f'{ORIGIN}/guide', ORIGIN)
+    assert not crawler.in_scope('https://other.example/guide', ORIGIN)
+    assert not crawler.in_scope(f'{ORIGIN}/account/Sign-Out', ORIGIN)
+    assert not crawler.in_scope(f'{ORIGIN}/files/manual.PDF', ORIGIN)
+    assert not crawler.in_scope(f'{ORIGIN}/admin/users', ORIGIN)
+    # crawlers do not share their configuration
+    assert not SiteCrawler().in_scope(f'{ORIGIN}/logout', ORIGIN)
+    assert SiteCrawler().in_scope(f'{ORIGIN}/admin/users', ORIGIN)
+
+
+def _sitemap() -> SiteMap:
+    sitemap = SiteMap(f'{ORIGIN}/')
+    sitemap.pages = {
+        f'{ORIGIN}/': PageInfo(
+            url=f'{ORIGIN}/', depth=0, title='Home',
+            headings=[{'level': 1, 'text': 'Welcome'}, {'level': 2, 'text': 'Getting started'}],
+            buttons=['Sign in'],
+            links={f'{ORIGIN}/guide': 'Guide', f'{ORIGIN}/gone': 'Old page', f'{ORIGIN}/never-crawled': 'Elsewhere'},
+        ),
+        f'{ORIGIN}/guide': PageInfo(
+            url=f'{ORIGIN}/guide', depth=1, title='Guide', description='How to use it',
+            forms=[{'method': 'get', 'submit': 'Search', 'fields': [
+                {'name': 'q', 'type': 'search', 'label': 'Search docs', 'required': True},
+                {'name': 'lang', 'type': 'select', 'label': '', 'required': False},
+            ]}],
+            links={f'{ORIGIN}/': ''},
+        ),
+        f'{ORIGIN}/gone': PageInfo(url=f'{ORIGIN}/gone', depth=1, error='net::ERR_NAME_NOT_RESOLVED'),
+    }
+    return sitemap
+
+
+def test_sitemap_outline_and_edges():
+    sitemap = _sitemap()
+    assert sitemap.edges() == [(f'{ORIGIN}/', f'{ORIGIN}/guide'), (f'{ORIGIN}/', f'{ORIGIN}/gone'), (f'{ORIGIN}/guide', f'{ORIGIN}/')]
+    assert sitemap.compact() == '\n'.join([
+        '## / | Home',
+        '- Welcome',
+        '  - Getting started',
+        'Buttons: Sign in',
+        'Links: Guide -> /guide; Old page -> /gone',
+        '',
+        '## /guide | Guide',
+        'Description: How to use it',
+        'Form [GET] fields: Search docs (search, required), lang (select); submit: Search',
+        'Links: ? -> /',
+    ])
+    assert sitemap.compact([f'{ORIGIN}/guide']).startswith('## /guide | Guide')
+
+
+def test_sitemap_round_trips_through_json(tmp_path):
+    sitemap = _sitemap()
+    sitemap.save(tmp_path / 'sitemap.json')
+    loaded = SiteMap.load(tmp_path / 'sitemap.json')
+    assert loaded == sitemap
+
+
+class FakeBrowser:
+    """Stands in for browser_use.Browser; the crawler's page visits are stubbed below"""
+
+    def __init__(self, config=None):
+        pass
+
+    async def get_playwright_browser(self):
+        return self
+
+    async def new_context(self, **kwargs):
+        return self
+
+    async def new_page(self):
+        return self
+
+    async def close(self):
+        pass
+
+
+# every page links to two pages one level deeper, plus one excluded and one external page
+def _links(url: str) -> dict[str, str]:
+    return {f'{url}/{i}': str(i) for i in range(2)} | {f'{ORIGIN}/logout': 'Sign out', 'https://other.example/': 'Other'}
+
+
+def _crawl(monkeypatch, config: CrawlConfig) -> SiteMap:
+    visited = []
+
+    async def visit(page, url, depth, step):
+        visited.append(url)
+        if url.endswith('/1/1'):
+            raise RuntimeError('renderer crashed')
+        return PageInfo(url=url, depth=depth, title=url, links=_links(url.rstrip('/')))
+
+    monkeypatch.setattr(site_crawler, 'Browser', FakeBrowser)
+    crawler = SiteCrawler(config)
+    monkeypatch.setattr(crawler, '_visit', visit)
+    sitemap = asyncio.run(crawler.crawl(f'{ORIGIN}/'))
+    assert len(visited) == len(set(visited)) == len(sitemap.pages)
+    return sitemap
+
+
+def test_crawl_stops_at_max_depth(monkeypatch):
+    sitemap = _crawl(monkeypatch, CrawlConfig(max_depth=2, concurrency=3))
+    assert len(sitemap.pages) == 1 + 2 + 4
+    assert max(page.depth for page in sitemap.pages.values()) == 2
+    assert all(url.startswith(ORIGIN) and 'logout' not in url for url in sitemap.pages)
+    # a page that fails is recorded, and the crawl carries on
+    assert sitemap.pages[f'{ORIGIN}/1/1'].error == 'renderer crashed'
+
+
+def test_crawl_stops_at_max_pages(monkeypatch):
+    sitemap = _crawl(monkeypatch, CrawlConfig(max_pages=5, concurrency=4))
+    assert len(sitemap.pages) == 5
+    assert sorted(page.depth for page in sitemap.pages.values())[:3] == [0, 1, 1]
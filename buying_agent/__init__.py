@@ -0,0 +1,3 @@
+from buying_agent.buying_agent import BuyingAgent, Offer, Retailer, rank_offers
+
+__all__ = ['BuyingAgent', 'Offer', 'Retailer', 'rank_offers']
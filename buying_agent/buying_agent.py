@@ -1,90 +1,373 @@
-from browser_use import Agent, Browser, BrowserConfig
+from browser_use import Agent, Browser, Controller
+from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_openai import ChatOpenAI
+from pydantic import BaseModel
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from urllib.parse import urlparse
 import asyncio
 import dotenv
+import logging
 import os
+import sys
 from datetime import datetime
+
+# Repo root first, so `buying_agent` is the package even when this file runs as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.asset_cache import log_asset_stats
+from common.browser_pool import BrowserPool, PoolConfig
+from common.browser_profiles import BrowserProfile, get_profile
+from common.context_budget import PayloadStore, register_payload_actions, with_context_budget
+from common.llm_cache import with_llm_cache
+from common.macros import MacroLibrary, run_with_macro
+from common.model_router import with_model_router
+from common.screenshots import ScreenshotSink
+from common.session_store import SessionStore, attached, site_of
+from common.tracing import Tracer, trace_agent
+from buying_agent.utils.price_monitor import PriceCheck, fetch_price
+from buying_agent.utils.product_extraction import register_product_actions
+
 dotenv.load_dotenv()
 
-# Create output directory if it doesn't exist
+logger = logging.getLogger(__name__)
+
 docs_dir = "grocery_purchase_results"
-if not os.path.exists(docs_dir):
-    os.makedirs(docs_dir)
-
-# Configure the browser to connect to your Chrome instance
-browser = Browser(
-    config=BrowserConfig(
-        # Specify the path to your Chrome executable
-        chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',  # macOS path
-        # For Windows, typically: 'C:\\Program Files\\Google\\Chrome\\Application\\chrome.exe'
-        # For Linux, typically: '/usr/bin/google-chrome'
-    )
-)
-
-# Create the agent with your configured browser
-agent = Agent(
-    task="""
-    Help purchase Fortune Basmati Rice 5kg by comparing prices on Flipkart Minutes and Amazon Fresh.
-    
-    Follow these steps:
-    
-    1. Open a new tab and go to Flipkart Grocery/Minutes (flipkart.com):
-       - Search for "Fortune Basmati Rice 5kg"
-       - Take a screenshot of the search results
-       - Note the exact product name, price, and delivery fee/timeline
-       - Check if there are any ongoing discounts or offers
-       - Take a screenshot of the product details page
-    
-    2. Open another new tab and go to Amazon Fresh (amazon.in):
-       - Search for "Fortune Basmati Rice 5kg"
-       - Take a screenshot of the search results
-       - Note the exact product name, price, and delivery fee/timeline
-       - Check if there are any ongoing discounts or offers
-       - Take a screenshot of the product details page
-    
-    3. Compare the prices and offers between both platforms:
-       - Calculate the total price including delivery fees
-       - Consider delivery time and any membership benefits
-       - Determine which platform offers the better deal
-    
-    4. For the platform with the better price:
-       - Add the Fortune Basmati Rice 5kg to the cart
-       - Take a screenshot of the cart
-       - Proceed to checkout
-       - Take a screenshot of the checkout page
-       - Stop at the payment selection page (do not enter any payment details)
-    
-    5. Compile a brief report with:
-       - A comparison table showing prices on both platforms
-       - The decision on which platform offers the better deal and why
-       - Screenshots of the product pages, cart, and checkout process
-    
-    Save all screenshots to the 'grocery_purchase_results' folder with descriptive filenames.
-    
-    IMPORTANT: 
-    - Use new tabs in the existing browser window
-    - Do not actually complete any purchase
-    - For Flipkart, try to use Flipkart Grocery or Flipkart Minutes if available
-    - For Amazon, specifically look at Amazon Fresh products when available
-    - If the exact 5kg package is not available, find the closest alternative
-    """,
-    llm=ChatOpenAI(model='gpt-4o'),
-    browser=browser,
-)
+
+
+@dataclass
+class Retailer:
+    name: str
+    url: str
+    # Extra retailer specific guidance for the sub-agent
+    instructions: str = ""
+
+
+RETAILERS = [
+    Retailer("Flipkart Minutes", "https://www.flipkart.com", "Use Flipkart Grocery or Flipkart Minutes if available."),
+    Retailer("Amazon Fresh", "https://www.amazon.in", "Look specifically at Amazon Fresh products when available."),
+]
+
+
+class Offer(BaseModel):
+    retailer: str = ""
+    product_name: str
+    price: float
+    delivery_fee: float = 0.0
+    delivery_time: Optional[str] = None
+    offers: list[str] = []
+    url: str
+    in_stock: bool = True
+
+    @property
+    def total_price(self) -> float:
+        return self.price + self.delivery_fee
+
+
+OFFER_TASK = """
+Go to {url} ({retailer}) and search for "{product}".
+On the search results and on the product page, call extract_product first: it returns the products as JSON
+(name, pack size, price, MRP, discount, delivery fee and ETA), so you do not need to read the page.
+Open the best matching product (if the exact package is not available, pick the closest alternative)
+and note the exact product name, price, delivery fee, delivery timeline and any ongoing discounts or offers.
+Only look at the page for fields extract_product left empty.
+{instructions}
+Do not add anything to the cart. Finish with the done action, filling in the product details
+and the URL of the product page. Prices and fees are plain numbers without currency symbols.
+"""
+
+CHECKOUT_TASK = """
+Open {url} on {retailer}. Add "{product_name}" to the cart and proceed to checkout.
+Stop at the payment selection page. Do not enter any payment details and do not complete the purchase.
+"""
+
+PRICE_CHECK_TASK = """
+Open {url} and read the product name, the current price as a plain number and whether it is in stock
+(call extract_product first, it returns them as JSON).
+Finish with the done action. Do not add anything to the cart.
+"""
+
+
+def _label(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+def rank_offers(offers: list[Offer], max_price: Optional[float] = None) -> list[Offer]:
+    """In-stock offers within budget, cheapest total (price + delivery) first"""
+    candidates = [offer for offer in offers if offer.in_stock]
+    if max_price is not None:
+        candidates = [offer for offer in candidates if offer.total_price <= max_price]
+    return sorted(candidates, key=lambda offer: (offer.total_price, offer.price, offer.retailer))
+
+
+class BuyingAgent:
+    """
+    Compares a product across retailers with one sub-agent per retailer running
+    in parallel browser contexts, ranks the offers in Python and checks out the winner.
+
+    Use it as an async context manager to keep the browser warm across calls,
+    or call the synchronous search_product / monitor_price helpers.
+    """
+
+    def __init__(
+        self,
+        llm: Optional[BaseChatModel] = None,
+        retailers: Optional[list[Retailer]] = None,
+        headless: bool = False,
+        max_steps_per_retailer: int = 25,
+        retailer_timeout: float = 600.0,
+        screenshots: Optional[ScreenshotSink] = None,
+        tracer: Optional[Tracer] = None,
+        browser_pool: Optional[BrowserPool] = None,
+        macros: Optional[MacroLibrary] = None,
+        profile: Optional[BrowserProfile] = None,
+        sessions: Optional[SessionStore] = None,
+        fetch: Callable[[str], Optional[PriceCheck]] = fetch_price,
+        browser_check: Optional[Callable[[str], Awaitable[Optional[PriceCheck]]]] = None,
+    ):
+        self.retailers = list(retailers or RETAILERS)
+        self.headless = headless
+        # Headless runs block images, fonts and trackers unless AGENT_BROWSER_PROFILE_BUYING_AGENT says otherwise
+        self.profile = profile or get_profile("buying_agent", default="fast" if headless else "desktop")
+        self.max_steps_per_retailer = max_steps_per_retailer
+        self.retailer_timeout = retailer_timeout
+        self._llm = llm
+        # Optional sink storing every step's screenshot, deduplicated and compressed
+        self.screenshots = screenshots
+        # Optional tracer recording LLM, DOM, navigation and action spans of every step
+        self.tracer = tracer
+        # Large action results stored once and read back by handle
+        self.payloads = PayloadStore()
+        # Browser pool, opened per session: one Chrome with a context per retailer,
+        # unless a shared pool is passed in (it is then left open on exit)
+        self.browser: Optional[BrowserPool] = browser_pool
+        self._owns_browser = browser_pool is None
+        # Optional library of recorded runs, replayed without the LLM until the page diverges
+        self.macros = macros
+        # Optional store of retailer logins and dismissed consent dialogs, restored into every context
+        self.sessions = sessions
+        # Price checks read structured data over HTTP first, then run a browser agent (check_price by default)
+        self.fetch = fetch
+        self.browser_check = browser_check
+
+    @property
+    def llm(self) -> BaseChatModel:
+        # Created on first use so the agent can be built without API keys
+        if self._llm is None:
+            # GPT-4o plans and compares offers, Gemini Flash drives routine clicks when configured
+            self._llm = with_model_router(with_llm_cache(ChatOpenAI(model='gpt-4o')))
+        return self._llm
+
+    async def __aenter__(self):
+        self.llm  # fail fast on missing credentials before launching any browser
+        if self._owns_browser:
+            config = PoolConfig(size=1, contexts_per_browser=max(len(self.retailers), 1))
+            self.browser = BrowserPool(self._create_browser, config)
+        await self.browser.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._owns_browser and self.browser is not None:
+            await self.browser.close()
+            self.browser = None
+            log_asset_stats()
+
+    def _create_browser(self) -> Browser:
+        return self.profile.create_browser()
+
+    def _agent(self, task: str, controller: Controller, context, label: str) -> Agent:
+        register_payload_actions(controller, self.payloads)
+        register_product_actions(controller)
+        agent = Agent(
+            task=task,
+            llm=with_context_budget(self.llm, self.payloads),
+            controller=controller,
+            browser_context=context,
+            register_new_step_callback=self.screenshots.step_callback(label) if self.screenshots else None,
+        )
+        return trace_agent(agent, self.tracer, label) if self.tracer else agent
+
+    async def _run_agent(
+        self,
+        task: str,
+        controller: Controller,
+        max_steps: int,
+        label: str = "",
+        macro: Optional[str] = None,
+        params: Optional[dict] = None,
+        site: Optional[str] = None,
+    ):
+        async with self.browser.context() as context:
+            async with attached(self.sessions if site else None, context, site) as session:
+                agent = self._agent(task, controller, context, label)
+                if macro is None:
+                    history = await agent.run(max_steps=max_steps)
+                else:
+                    history = await run_with_macro(agent, self.macros, macro, params, max_steps=max_steps)
+                if session is not None and history.is_successful():
+                    await session.save()
+                return history
+
+    async def collect_offer(self, retailer: Retailer, product: str) -> Optional[Offer]:
+        """Run one sub-agent on a retailer and return its structured offer"""
+        task = OFFER_TASK.format(url=retailer.url, retailer=retailer.name, product=product, instructions=retailer.instructions)
+        history = await asyncio.wait_for(
+            self._run_agent(
+                task,
+                Controller(output_model=Offer),
+                self.max_steps_per_retailer,
+                _label(retailer.name),
+                macro=f"offer_{_label(retailer.name)}",
+                params={"product": product},
+                site=site_of(retailer.url),
+            ),
+            timeout=self.retailer_timeout,
+        )
+        result = history.final_result()
+        if not history.is_successful() or not result:
+            logger.warning(f"{retailer.name}: no offer found for {product!r}")
+            return None
+        offer = Offer.model_validate_json(result)
+        offer.retailer = retailer.name
+        return offer
+
+    async def compare_offers(self, product: str, max_price: Optional[float] = None) -> list[Offer]:
+        """Collect offers from all retailers concurrently and rank them"""
+        results = await asyncio.gather(
+            *(self.collect_offer(retailer, product) for retailer in self.retailers),
+            return_exceptions=True,
+        )
+        offers = []
+        for retailer, result in zip(self.retailers, results):
+            if isinstance(result, BaseException):
+                logger.error(f"{retailer.name}: price collection failed: {result!r}")
+            elif result is not None:
+                offers.append(result)
+        return rank_offers(offers, max_price)
+
+    async def checkout(self, offer: Offer, wait_for_user: bool = False):
+        """Add the offer to the cart and stop at the payment selection page"""
+        task = CHECKOUT_TASK.format(url=offer.url, retailer=offer.retailer, product_name=offer.product_name)
+        async with self.browser.context() as context:
+            async with attached(self.sessions, context, site_of(offer.url)) as session:
+                agent = self._agent(task, Controller(), context, f"checkout_{_label(offer.retailer)}")
+                history = await agent.run(max_steps=self.max_steps_per_retailer)
+                if session is not None and history.is_successful():
+                    await session.save()
+                if wait_for_user and sys.stdin.isatty():
+                    # Keep the checkout page open until the user is done with it
+                    await asyncio.to_thread(input, 'Press Enter to close the checkout page...')
+        return history
+
+    async def check_price(self, product_url: str) -> Optional[PriceCheck]:
+        """Read the current price on a product page with a browser agent"""
+        history = await self._run_agent(
+            PRICE_CHECK_TASK.format(url=product_url),
+            Controller(output_model=PriceCheck),
+            max_steps=10,
+            label="price_check",
+            macro=f"price_check_{urlparse(product_url).netloc}",
+            params={"url": product_url},
+            site=site_of(product_url),
+        )
+        result = history.final_result()
+        if not history.is_successful() or not result:
+            return None
+        return PriceCheck.model_validate_json(result)
+
+    async def _in_session(self, coro_factory):
+        if self.browser is not None:
+            return await coro_factory()
+        async with self:
+            return await coro_factory()
+
+    def search_product(self, product: str, max_price: Optional[float] = None) -> list[Offer]:
+        """Ranked offers for `product` across all retailers, empty if none could be collected"""
+        try:
+            return asyncio.run(self._in_session(lambda: self.compare_offers(product, max_price)))
+        except Exception as e:
+            logger.error(f"Product search failed: {e}")
+            return []
+
+    async def current_price(self, product_url: str) -> Optional[PriceCheck]:
+        """Price from the page's structured data over plain HTTP, falling back to a browser agent"""
+        try:
+            check = await asyncio.to_thread(self.fetch, product_url)
+        except Exception as e:
+            logger.debug(f"Fast price check failed for {product_url}: {e}")
+            check = None
+        if check is not None:
+            return check
+        if self.browser_check is not None:
+            return await self.browser_check(product_url)
+        return await self._in_session(lambda: self.check_price(product_url))
+
+    def monitor_price(self, product_url: str, target_price: float) -> bool:
+        """
+        True when the product is in stock at or below `target_price`.
+        For scheduled checks of many URLs use utils.price_monitor.PriceMonitor.
+        """
+        try:
+            check = asyncio.run(self.current_price(product_url))
+        except Exception as e:
+            logger.error(f"Price check failed: {e}")
+            return False
+        return check is not None and check.in_stock and check.price <= target_price
+
+
+def write_report(product: str, offers: list[Offer]) -> str:
+    lines = [
+        f"# {product} price comparison ({datetime.now().strftime('%Y-%m-%d %H:%M')})",
+        "",
+        "| Retailer | Product | Price | Delivery fee | Total | Delivery | Offers |",
+        "|---|---|---|---|---|---|---|",
+    ]
+    for offer in offers:
+        lines.append(
+            f"| {offer.retailer} | [{offer.product_name}]({offer.url}) | {offer.price:.2f} | {offer.delivery_fee:.2f} "
+            f"| {offer.total_price:.2f} | {offer.delivery_time or '-'} | {'; '.join(offer.offers) or '-'} |"
+        )
+    if offers:
+        lines += ["", f"Best deal: {offers[0].retailer} at {offers[0].total_price:.2f} including delivery."]
+
+    os.makedirs(docs_dir, exist_ok=True)
+    path = os.path.join(docs_dir, f"comparison_{datetime.now().strftime('%Y%m%d_%H%M%S')}.md")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    return path
+
 
 async def main():
+    product = "Fortune Basmati Rice 5kg"
     print(f"Starting grocery price comparison at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print("Agent is comparing Fortune Basmati Rice 5kg prices between Flipkart Minutes and Amazon Fresh...")
-    
-    result = await agent.run()
-    
-    print("\nGrocery comparison and cart process complete!")
-    print(f"Results saved to the '{docs_dir}' directory")
-    print("Summary of findings:")
-    print(result)
-    
-    input('Press Enter to close the browser...')
-    await browser.close()
+    print(f"Comparing {product} prices on {', '.join(r.name for r in RETAILERS)} in parallel...")
+
+    screenshots = ScreenshotSink(os.path.join(docs_dir, "screenshots"))
+    # Writes per-step spans when AGENT_TRACE_DIR is set
+    tracer = Tracer.from_env("buying_agent")
+    try:
+        async with BuyingAgent(
+            screenshots=screenshots, tracer=tracer, macros=MacroLibrary.from_env(), sessions=SessionStore.from_env()
+        ) as agent:
+            offers = await agent.compare_offers(product)
+            report = write_report(product, offers)
+            print(f"\nComparison saved to {report}")
+            if not offers:
+                print("No offers found.")
+                return
+
+            for offer in offers:
+                print(f"- {offer.retailer}: {offer.product_name} {offer.price:.2f} + {offer.delivery_fee:.2f} delivery")
+            best = offers[0]
+            print(f"\nBest deal: {best.retailer}. Proceeding to checkout...")
+            result = await agent.checkout(best, wait_for_user=True)
+            print("Summary of findings:")
+            print(result.final_result())
+    finally:
+        screenshots.close()
+        tracer.close()
+        print(f"Screenshots saved to {screenshots.output_dir} (index: {screenshots.manifest_path})")
+
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
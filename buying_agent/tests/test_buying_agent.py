@@ -1,9 +1,67 @@
+import json
+
 import pytest
-from buying_agent.buying_agent import BuyingAgent
+from browser_use.agent.views import ActionResult, AgentHistory, AgentHistoryList
+from browser_use.browser.views import BrowserStateHistory
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+from buying_agent.buying_agent import RETAILERS, BuyingAgent, Offer, rank_offers
+from buying_agent.utils.price_monitor import PriceCheck
+
+
+class FakePool:
+    """Stands in for the browser pool; the sub-agent runs are stubbed"""
+
+    async def start(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+def _history(result=None):
+    state = BrowserStateHistory(url="", title="", tabs=[], interacted_element=[None])
+    done = ActionResult(is_done=result is not None, success=result is not None, extracted_content=result)
+    return AgentHistoryList(history=[AgentHistory(model_output=None, result=[done], state=state)])
+
+
+@pytest.fixture
+def offers():
+    # what each retailer's sub-agent finishes with, None when it found nothing
+    return {
+        "Flipkart Minutes": {"product_name": "Fortune Basmati Rice 5kg", "price": 629, "delivery_fee": 25, "url": "https://www.flipkart.com/p/1"},
+        "Amazon Fresh": {"product_name": "Fortune Basmati Rice 5 kg", "price": 649, "url": "https://www.amazon.in/dp/B01"},
+    }
+
+
+@pytest.fixture
+def prices():
+    return {}
+
 
 @pytest.fixture
-def agent():
-    return BuyingAgent()
+def agent(offers, prices):
+    browser_checks = []
+
+    async def browser_check(url):
+        browser_checks.append(url)
+        return PriceCheck(product_name="Rice", price=48.0)
+
+    agent = BuyingAgent(
+        llm=FakeListChatModel(responses=[]),
+        browser_pool=FakePool(),
+        fetch=lambda url: prices.get(url),
+        browser_check=browser_check,
+    )
+    agent.browser_checks = browser_checks
+
+    async def run_agent(task, controller, max_steps, label="", **kwargs):
+        retailer = next(r for r in RETAILERS if r.url in task)
+        offer = offers[retailer.name]
+        return _history(json.dumps(offer) if offer else None)
+
+    agent._run_agent = run_agent
+    return agent
 
 def test_agent_initialization(agent):
     assert agent is not None
@@ -11,15 +69,31 @@ def test_agent_initialization(agent):
     assert hasattr(agent, 'search_product')
     assert hasattr(agent, 'monitor_price')
 
-def test_search_product(agent):
-    # Mock the search functionality
-    results = agent.search_product("test product", max_price=100)
-    assert isinstance(results, list)
+def test_search_product(agent, offers):
+    results = agent.search_product("Fortune Basmati Rice 5kg", max_price=700)
+    assert [(o.retailer, o.total_price) for o in results] == [("Amazon Fresh", 649.0), ("Flipkart Minutes", 654.0)]
 
-def test_monitor_price(agent):
-    # Mock the price monitoring
-    success = agent.monitor_price(
-        product_url="https://example.com/product",
-        target_price=50
-    )
-    assert isinstance(success, bool) 
\ No newline at end of file
+    offers["Amazon Fresh"] = None
+    assert [o.retailer for o in agent.search_product("Fortune Basmati Rice 5kg", max_price=650)] == []
+
+def test_monitor_price(agent, prices):
+    prices["https://shop.example/rice"] = PriceCheck(product_name="Rice", price=45.0)
+    assert agent.monitor_price(product_url="https://shop.example/rice", target_price=50)
+    assert not agent.monitor_price(product_url="https://shop.example/rice", target_price=40)
+    assert agent.browser_checks == []
+
+    # no structured data over HTTP: the browser check decides
+    assert agent.monitor_price(product_url="https://shop.example/sugar", target_price=50)
+    assert agent.browser_checks == ["https://shop.example/sugar"]
+
+def _offer(retailer, price, delivery_fee=0.0, in_stock=True):
+    return Offer(retailer=retailer, product_name="Rice 5kg", price=price, delivery_fee=delivery_fee,
+                 url=f"https://{retailer}.example/rice", in_stock=in_stock)
+
+def test_rank_offers_by_total_price():
+    offers = [_offer("a", 629, 25), _offer("b", 649), _offer("c", 600, 100)]
+    assert [o.retailer for o in rank_offers(offers)] == ["b", "a", "c"]
+
+def test_rank_offers_filters_out_of_stock_and_budget():
+    offers = [_offer("a", 500, in_stock=False), _offer("b", 649), _offer("c", 700)]
+    assert [o.retailer for o in rank_offers(offers, max_price=650)] == ["b"]
@@ -0,0 +1,149 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from buying_agent.utils.price_monitor import PriceCheck, PriceMonitor, extract_price, parse_price
+from common.rate_limit import DomainRateLimiter
+
+JSON_LD_PAGE = """
+<html><head><title>Rice</title>
+<script type="application/ld+json">
+{"@context": "https://schema.org", "@graph": [
+  {"@type": "BreadcrumbList"},
+  {"@type": "Product", "name": "Fortune Basmati Rice 5kg",
+   "offers": {"@type": "Offer", "price": "629.00", "priceCurrency": "INR",
+              "availability": "https://schema.org/InStock"}}
+]}
+</script></head><body></body></html>
+"""
+
+MICRODATA_PAGE = """
+<html><head><meta property="og:title" content="Rice 5kg"></head>
+<body><span itemprop="price" content="1,299.50">Rs. 1,299.50</span>
+<link itemprop="availability" href="https://schema.org/OutOfStock"></body></html>
+"""
+
+
+@pytest.mark.parametrize("value,expected", [
+    ("₹1,299.00", 1299.0), ("1.299,00 €", 1299.0), ("12,50", 12.5), (649, 649.0), ("free", None),
+])
+def test_parse_price(value, expected):
+    assert parse_price(value) == expected
+
+def test_extract_price_json_ld():
+    check = extract_price(JSON_LD_PAGE)
+    assert check == PriceCheck(product_name="Fortune Basmati Rice 5kg", price=629.0, currency="INR", in_stock=True)
+
+def test_extract_price_microdata():
+    check = extract_price(MICRODATA_PAGE)
+    assert check.price == 1299.5
+    assert check.product_name == "Rice 5kg"
+    assert not check.in_stock
+
+def test_extract_price_without_structured_data():
+    assert extract_price("<html><body>Price: 649</body></html>") is None
+
+def test_run_once_records_changes_backoff_and_alerts(tmp_path):
+    prices = {"https://shop.example/a": 700.0, "https://shop.example/b": None}
+    alerts = []
+
+    def fetch(url):
+        if prices[url] is None:
+            raise ConnectionError("down")
+        return PriceCheck(price=prices[url])
+
+    monitor = PriceMonitor(tmp_path / "watch.db", fetch=fetch, on_alert=lambda w, c: alerts.append(c.price),
+                           rate_limiter=DomainRateLimiter(min_interval=0, jitter=0), jitter=0)
+    monitor.add("https://shop.example/a", target_price=650, interval=60)
+    monitor.add("https://shop.example/b", interval=60)
+
+    stats = asyncio.run(monitor.run_once())
+    assert stats["http"] == 1 and stats["failed"] == 1 and stats["alerts"] == 0
+    failed = monitor.get("https://shop.example/b")
+    assert failed.failures == 1 and failed.next_check > time.time() + 50
+
+    prices["https://shop.example/a"] = 640.0
+    asyncio.run(monitor.run_once(now=time.time() + 61))
+    asyncio.run(monitor.run_once(now=time.time() + 122))
+    assert alerts == [640.0]
+    assert [entry["price"] for entry in monitor.history("https://shop.example/a")] == [640.0, 700.0]
+    monitor.close()
+
+def test_paced_domain_does_not_hold_the_shared_slots(tmp_path):
+    checked = {}
+
+    def fetch(url):
+        checked[url] = time.perf_counter()
+        return PriceCheck(price=100.0)
+
+    rate_limiter = DomainRateLimiter(min_interval=0, jitter=0, per_domain={"slow.example": 0.5})
+    monitor = PriceMonitor(tmp_path / "watch.db", fetch=fetch, rate_limiter=rate_limiter, concurrency=1, jitter=0)
+    for i in range(3):
+        monitor.add(f"https://slow.example/{i}", interval=60)
+    monitor.add("https://fast.example/rice", interval=60)
+
+    start = time.perf_counter()
+    stats = asyncio.run(monitor.run_once())
+    assert stats["http"] == 4
+    # the fast domain is not queued behind the slow domain's pacing
+    assert checked["https://fast.example/rice"] - start < 0.3
+    assert checked["https://slow.example/2"] - start >= 0.9
+    monitor.close()
+
+
+def _http_error(status):
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f"{status} error", response=response)
+
+
+def test_only_missing_data_and_bot_walls_fall_back_to_the_browser(tmp_path):
+    errors = {"https://down.example/a": _http_error(503), "https://slow.example/a": requests.Timeout("timed out"),
+              "https://walled.example/a": _http_error(403)}
+    browser_checks = []
+
+    def fetch(url):
+        if url in errors:
+            raise errors[url]
+        return None
+
+    async def browser_check(url):
+        browser_checks.append(url)
+        return PriceCheck(price=99.0)
+
+    monitor = PriceMonitor(tmp_path / "watch.db", fetch=fetch, browser_check=browser_check,
+                           rate_limiter=DomainRateLimiter(min_interval=0, jitter=0), jitter=0)
+    for url in [*errors, "https://plain.example/a"]:
+        monitor.add(url, interval=60)
+
+    stats = asyncio.run(monitor.run_once())
+    assert sorted(browser_checks) == ["https://plain.example/a", "https://walled.example/a"]
+    assert stats["browser"] == 2 and stats["failed"] == 2
+    # the site is down: the watch backs off instead of running a browser agent
+    down = monitor.get("https://down.example/a")
+    assert down.failures == 1 and down.next_check > time.time() + 50
+    monitor.close()
+
+
+def test_browser_checks_are_bounded_for_direct_callers(tmp_path):
+    in_flight, peak = 0, 0
+
+    async def browser_check(url):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.02)
+        in_flight -= 1
+        return PriceCheck(price=1.0)
+
+    monitor = PriceMonitor(tmp_path / "watch.db", fetch=lambda url: None, browser_check=browser_check, browser_concurrency=2,
+                           rate_limiter=DomainRateLimiter(min_interval=0, jitter=0))
+
+    async def main():
+        await asyncio.gather(*(monitor.check(f"https://shop{i}.example/a") for i in range(6)))
+
+    asyncio.run(main())
+    assert peak == 2
+    monitor.close()
@@ -0,0 +1,89 @@
+import pytest
+
+from buying_agent.utils.product_extraction import AMAZON, GENERIC, pack_for, pack_size, parse_delivery, parse_page
+
+JSON_LD = {
+    "@context": "https://schema.org",
+    "@type": "Product",
+    "name": "Fortune Basmati Rice",
+    "weight": {"value": "5", "unitText": "kg"},
+    "offers": {
+        "@type": "Offer",
+        "price": "629.00",
+        "priceCurrency": "INR",
+        "availability": "https://schema.org/InStock",
+        "priceSpecification": [
+            {"@type": "UnitPriceSpecification", "price": "629.00"},
+            {"@type": "UnitPriceSpecification", "priceType": "https://schema.org/ListPrice", "price": "749.00"},
+        ],
+    },
+}
+
+
+def _raw(url, **kwargs):
+    return {"url": url, "title": "", "jsonld": [], "meta": {}, "product": {}, "results": [], **kwargs}
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("FREE delivery Tuesday, 12 March", (0.0, "Tuesday, 12 March")),
+    ("Delivery fee: ₹25 · Arrives in 10 minutes", (25.0, "10 minutes")),
+    ("Get it by tomorrow 9 PM", (None, "tomorrow 9 PM")),
+    (None, (None, None)),
+])
+def test_parse_delivery(text, expected):
+    assert parse_delivery(text) == expected
+
+
+def test_pack_size_and_selector_packs():
+    assert pack_size("Fortune Basmati Rice 5 kg Pouch") == "5kg"
+    assert pack_size("Amul Taaza Milk 500ml x 2") == "500mlx2"
+    assert pack_size("Basmati Rice") is None
+    assert pack_for("https://www.amazon.in/dp/B01") is AMAZON
+    assert pack_for("https://shop.example/rice") is GENERIC
+
+
+def test_product_page_merges_json_ld_with_site_fields():
+    page = parse_page(_raw(
+        "https://www.amazon.in/dp/B01",
+        jsonld=[JSON_LD],
+        product={"name": "Fortune Basmati Rice, 5kg", "price": "₹629.00", "delivery": "FREE delivery Tuesday, 12 March"},
+    ))
+
+    assert page.kind == "product"
+    record = page.products[0]
+    assert (record.name, record.pack_size, record.price, record.mrp, record.currency) == ("Fortune Basmati Rice", "5kg", 629.0, 749.0, "INR")
+    assert record.discount_percent == 16.0
+    assert (record.delivery_fee, record.delivery_eta) == (0.0, "Tuesday, 12 March")
+    assert record.url == "https://www.amazon.in/dp/B01"
+    assert record.source == "json-ld+amazon"
+
+
+def test_generic_product_page_without_structured_data():
+    page = parse_page(_raw(
+        "http://127.0.0.1:8000/shop_a.html",
+        product={
+            "name": "Fortune Basmati Rice 5kg",
+            "price": "Price: ₹629",
+            "mrp": "MRP: ₹649",
+            "delivery": "Delivery fee: ₹25 · Arrives in 10 minutes",
+        },
+    ))
+
+    record = page.products[0]
+    assert (page.kind, record.source) == ("product", "generic")
+    assert (record.price, record.mrp, record.discount_percent, record.delivery_fee) == (629.0, 649.0, 3.1, 25.0)
+
+
+def test_search_page_returns_a_list():
+    results = [
+        {"name": f"Basmati Rice {size}kg", "price": f"₹{price}", "link": f"/p/{size}", "mrp": f"₹{price + 50}"}
+        for size, price in ((1, 149), (5, 629), (10, 1199))
+    ]
+    page = parse_page(_raw("https://www.flipkart.com/search?q=rice", results=results, product={"name": "Search results"}), limit=2)
+
+    assert page.kind == "search"
+    assert [(r.pack_size, r.price, r.url) for r in page.products] == [
+        ("1kg", 149.0, "https://www.flipkart.com/p/1"),
+        ("5kg", 629.0, "https://www.flipkart.com/p/5"),
+    ]
+    assert parse_page(_raw("https://shop.example/empty")).products == []
@@ -0,0 +1,531 @@
+"""
+Price monitoring for large watchlists.
+
+Product URLs live in a persistent SQLite watchlist. Due checks are scheduled
+with jittered intervals and per-domain rate limits. Each check first tries
+the cheap path, a plain HTTP fetch with the price read from JSON-LD or meta
+tags, and only falls back to a browser agent when that fails. Failing URLs
+back off exponentially, and every price or stock change is appended to a
+history table.
+
+    python -m buying_agent.utils.price_monitor add https://example.com/p/1 --target 499
+    python -m buying_agent.utils.price_monitor run
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import re
+import sqlite3
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Iterable, Optional
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+from pydantic import BaseModel
+
+from common.rate_limit import DomainRateLimiter
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = (
+    'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36'
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watchlist (
+    url TEXT PRIMARY KEY,
+    target_price REAL,
+    interval REAL NOT NULL,
+    next_check REAL NOT NULL,
+    failures INTEGER NOT NULL DEFAULT 0,
+    last_price REAL,
+    currency TEXT,
+    in_stock INTEGER,
+    last_checked REAL,
+    last_error TEXT,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS watchlist_next_check ON watchlist (next_check);
+CREATE TABLE IF NOT EXISTS price_history (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    price REAL NOT NULL,
+    currency TEXT,
+    in_stock INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    checked_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS price_history_url ON price_history (url, checked_at);
+"""
+
+_PRICE_NUMBER = re.compile(r'\d[\d.,]*')
+_OUT_OF_STOCK = ('outofstock', 'soldout', 'discontinued', 'out of stock', 'oos')
+
+
+class PriceCheck(BaseModel):
+    product_name: str = ''
+    price: float
+    currency: Optional[str] = None
+    in_stock: bool = True
+
+
+@dataclass
+class Watch:
+    url: str
+    target_price: Optional[float]
+    interval: float
+    next_check: float
+    failures: int = 0
+    last_price: Optional[float] = None
+    currency: Optional[str] = None
+    in_stock: Optional[bool] = None
+    last_checked: Optional[float] = None
+    last_error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> 'Watch':
+        in_stock = row['in_stock']
+        return cls(
+            url=row['url'],
+            target_price=row['target_price'],
+            interval=row['interval'],
+            next_check=row['next_check'],
+            failures=row['failures'],
+            last_price=row['last_price'],
+            currency=row['currency'],
+            in_stock=None if in_stock is None else bool(in_stock),
+            last_checked=row['last_checked'],
+            last_error=row['last_error'],
+        )
+
+
+def parse_price(value) -> Optional[float]:
+    """Number from a price string such as '₹1,299.00', '1.299,00 €' or 649"""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if not isinstance(value, str):
+        return None
+    match = _PRICE_NUMBER.search(value.replace('\xa0', '').replace(' ', ''))
+    if not match:
+        return None
+    text = match.group(0).rstrip('.,')
+    if ',' in text and '.' in text:
+        if text.rfind(',') > text.rfind('.'):
+            text = text.replace('.', '').replace(',', '.')
+        else:
+            text = text.replace(',', '')
+    elif ',' in text:
+        head, _, tail = text.rpartition(',')
+        # '1,299' groups thousands, '12,50' is a decimal comma
+        text = text.replace(',', '') if len(tail) == 3 else head.replace(',', '') + '.' + tail
+    elif text.count('.') > 1:
+        text = text.replace('.', '')
+    try:
+        return float(text)
+    except ValueError:
+        return None
+
+
+def _is_in_stock(availability) -> bool:
+    if not availability:
+        return True
+    return not any(marker in str(availability).lower().replace('_', '') for marker in _OUT_OF_STOCK)
+
+
+def _json_ld_nodes(data) -> Iterable[dict]:
+    if isinstance(data, list):
+        for item in data:
+            yield from _json_ld_nodes(item)
+    elif isinstance(data, dict):
+        yield data
+        if '@graph' in data:
+            yield from _json_ld_nodes(data['@graph'])
+
+
+def _is_product(node: dict) -> bool:
+    types = node.get('@type')
+    types = types if isinstance(types, list) else [types]
+    return any(t in ('Product', 'ProductGroup', 'IndividualProduct') for t in types)
+
+
+def _offer_price(offers) -> Optional[PriceCheck]:
+    for offer in offers if isinstance(offers, list) else [offers]:
+        if not isinstance(offer, dict):
+            continue
+        spec = offer.get('priceSpecification')
+        spec = spec[0] if isinstance(spec, list) and spec else spec
+        price = parse_price(offer.get('price', offer.get('lowPrice')))
+        if price is None and isinstance(spec, dict):
+            price = parse_price(spec.get('price'))
+        if price is not None:
+            currency = offer.get('priceCurrency') or (spec.get('priceCurrency') if isinstance(spec, dict) else None)
+            return PriceCheck(price=price, currency=currency, in_stock=_is_in_stock(offer.get('availability')))
+    return None
+
+
+def extract_price(html: str) -> Optional[PriceCheck]:
+    """Price from a product page's JSON-LD Product data, or failing that its price meta tags/microdata"""
+    # script, meta and title tags are all the fast path needs; skip building the full tree
+    soup = BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(['script', 'meta', 'title']))
+
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        for node in _json_ld_nodes(data):
+            if not _is_product(node) or 'offers' not in node:
+                continue
+            check = _offer_price(node['offers'])
+            if check is not None:
+                check.product_name = str(node.get('name') or '')
+                return check
+
+    full_soup = None
+
+    def meta(*names: str) -> Optional[str]:
+        for name in names:
+            tag = soup.find('meta', attrs={'property': name}) or soup.find('meta', attrs={'name': name})
+            if tag and tag.get('content'):
+                return tag['content']
+        return None
+
+    def itemprop(name: str):
+        nonlocal full_soup
+        tag = soup.find(attrs={'itemprop': name})
+        if tag is None:
+            # microdata on visible elements needs the whole document
+            if full_soup is None:
+                full_soup = BeautifulSoup(html, 'html.parser')
+            tag = full_soup.find(attrs={'itemprop': name})
+        return tag
+
+    price = parse_price(meta('product:price:amount', 'og:price:amount'))
+    if price is None:
+        tag = itemprop('price')
+        if tag is not None:
+            price = parse_price(tag.get('content') or tag.get_text())
+    if price is None:
+        return None
+
+    currency = meta('product:price:currency', 'og:price:currency')
+    if currency is None and (tag := itemprop('priceCurrency')) is not None:
+        currency = tag.get('content') or tag.get_text(strip=True)
+    availability = meta('product:availability', 'og:availability')
+    if availability is None and (tag := itemprop('availability')) is not None:
+        availability = tag.get('content') or tag.get('href')
+    title = soup.find('title')
+    name = meta('og:title') or (title.get_text(strip=True) if title else '')
+    return PriceCheck(product_name=name, price=price, currency=currency, in_stock=_is_in_stock(availability))
+
+
+# statuses of bot walls a real browser may get past; other errors mean the site is down
+BLOCKED_STATUSES = frozenset({403})
+
+
+class RateLimited(Exception):
+    def __init__(self, retry_after: float):
+        super().__init__(f'rate limited, retry after {retry_after:.0f}s')
+        self.retry_after = retry_after
+
+
+_sessions = threading.local()
+
+
+def fetch_price(url: str, timeout: float = 15.0) -> Optional[PriceCheck]:
+    """Fast path: fetch the page over HTTP and read its structured price data"""
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+        session.headers.update({'User-Agent': USER_AGENT, 'Accept-Language': 'en-IN,en;q=0.9'})
+    response = session.get(url, timeout=timeout)
+    if response.status_code == 429:
+        retry_after = response.headers.get('Retry-After', '')
+        raise RateLimited(float(retry_after) if retry_after.isdigit() else 60.0)
+    response.raise_for_status()
+    return extract_price(response.text)
+
+
+BrowserCheck = Callable[[str], Awaitable[Optional[PriceCheck]]]
+AlertCallback = Callable[[Watch, PriceCheck], None]
+
+
+def log_alert(watch: Watch, check: PriceCheck):
+    logger.info(f'Price alert: {check.product_name or watch.url} is {check.price} (target {watch.target_price})')
+
+
+class PriceMonitor:
+    """Persistent watchlist checked on a schedule, HTTP first and browser agent as fallback"""
+
+    def __init__(
+        self,
+        path: str | Path = 'price_watch.db',
+        browser_check: Optional[BrowserCheck] = None,
+        rate_limiter: Optional[DomainRateLimiter] = None,
+        on_alert: AlertCallback = log_alert,
+        concurrency: int = 32,
+        browser_concurrency: int = 2,
+        jitter: float = 0.1,
+        max_backoff: float = 24 * 3600.0,
+        fetch: Callable[[str], Optional[PriceCheck]] = fetch_price,
+    ):
+        self.path = Path(path)
+        self.browser_check = browser_check
+        self.rate_limiter = rate_limiter or DomainRateLimiter(min_interval=2.0, jitter=1.0)
+        self.on_alert = on_alert
+        self.concurrency = concurrency
+        self.browser_concurrency = browser_concurrency
+        # fraction of the interval every scheduled check is randomly shifted by
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.fetch = fetch
+        self._browser_slots: Optional[tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(_SCHEMA)
+
+    def add(self, url: str, target_price: Optional[float] = None, interval: float = 3600.0):
+        """Watch `url`; the first check is spread over the first part of the interval"""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                INSERT INTO watchlist (url, target_price, interval, next_check, added_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET target_price = excluded.target_price, interval = excluded.interval
+                """,
+                (url, target_price, interval, now + random.uniform(0, self.jitter * interval), now),
+            )
+
+    def remove(self, url: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute('DELETE FROM watchlist WHERE url = ?', (url,)).rowcount > 0
+
+    def get(self, url: str) -> Optional[Watch]:
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM watchlist WHERE url = ?', (url,)).fetchone()
+        return Watch.from_row(row) if row else None
+
+    def watches(self, limit: int = 100, offset: int = 0) -> list[Watch]:
+        with self._lock:
+            rows = self._conn.execute('SELECT * FROM watchlist ORDER BY url LIMIT ? OFFSET ?', (limit, offset)).fetchall()
+        return [Watch.from_row(row) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM watchlist').fetchone()[0]
+
+    def due(self, now: Optional[float] = None, limit: int = 1000) -> list[Watch]:
+        """Watches whose next check is due, most overdue first"""
+        now = time.time() if now is None else now
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT * FROM watchlist WHERE next_check <= ? ORDER BY next_check LIMIT ?', (now, limit)
+            ).fetchall()
+        return [Watch.from_row(row) for row in rows]
+
+    def history(self, url: str, limit: int = 100) -> list[dict]:
+        """Recorded price changes for `url`, newest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT price, currency, in_stock, source, checked_at FROM price_history '
+                'WHERE url = ? ORDER BY checked_at DESC LIMIT ?',
+                (url, limit),
+            ).fetchall()
+        return [dict(row, in_stock=bool(row['in_stock'])) for row in rows]
+
+    def _browser_semaphore(self) -> asyncio.Semaphore:
+        # one bound for every caller; semaphores belong to the loop they were created on
+        loop = asyncio.get_running_loop()
+        if self._browser_slots is None or self._browser_slots[0] is not loop:
+            self._browser_slots = (loop, asyncio.Semaphore(self.browser_concurrency))
+        return self._browser_slots[1]
+
+    async def check(self, url: str, slots: Optional[asyncio.Semaphore] = None) -> tuple[Optional[PriceCheck], str]:
+        """
+        Current price of `url` and where it came from ('http' or 'browser').
+        Only pages without price data or behind a bot wall go to the browser;
+        network errors and server errors are raised, so the watch backs off.
+        """
+        # the domain's pacing is waited out before taking a shared slot, never while holding one
+        await self.rate_limiter.wait(url)
+        try:
+            async with slots or nullcontext():
+                check = await asyncio.to_thread(self.fetch, url)
+            if check is not None:
+                return check, 'http'
+            error = 'no structured price data'
+        except RateLimited as e:
+            self.rate_limiter.penalize(url, e.retry_after)
+            raise
+        except requests.HTTPError as e:
+            if e.response is None or e.response.status_code not in BLOCKED_STATUSES:
+                raise
+            error = repr(e)
+
+        if self.browser_check is None:
+            raise LookupError(f'fast path failed: {error}')
+        logger.debug(f'Fast path failed for {url} ({error}), falling back to the browser')
+        await self.rate_limiter.wait(url)
+        async with self._browser_semaphore():
+            check = await self.browser_check(url)
+        if check is None:
+            raise LookupError(f'no price found ({error})')
+        return check, 'browser'
+
+    async def run_once(self, now: Optional[float] = None, limit: int = 1000) -> dict:
+        """Check every due watch (up to `limit`) and return counts per outcome"""
+        watches = self.due(now, limit)
+        stats = {'checked': len(watches), 'http': 0, 'browser': 0, 'failed': 0, 'changed': 0, 'alerts': 0}
+        slots = asyncio.Semaphore(self.concurrency)
+
+        async def run(watch: Watch):
+            try:
+                check, source = await self.check(watch.url, slots)
+            except Exception as e:
+                logger.warning(f'Price check failed for {watch.url}: {e}')
+                self._record_failure(watch, e)
+                stats['failed'] += 1
+                return
+            stats[source] += 1
+            changed, alert = self._record(watch, check, source)
+            stats['changed'] += changed
+            if alert:
+                stats['alerts'] += 1
+                try:
+                    self.on_alert(watch, check)
+                except Exception as e:
+                    logger.error(f'Price alert callback failed: {e}')
+
+        await asyncio.gather(*(run(watch) for watch in watches))
+        return stats
+
+    async def run_forever(self, poll_interval: float = 30.0):
+        while True:
+            stats = await self.run_once()
+            if stats['checked']:
+                logger.info(f'Price checks: {stats}')
+            await asyncio.sleep(poll_interval)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _next_check(self, interval: float) -> float:
+        return time.time() + interval * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def _record(self, watch: Watch, check: PriceCheck, source: str) -> tuple[bool, bool]:
+        now = time.time()
+        changed = watch.last_price != check.price or watch.in_stock != check.in_stock
+        target = watch.target_price
+        # alert once when the price crosses the target (or the item comes back in stock below it)
+        alert = (
+            target is not None
+            and check.in_stock
+            and check.price <= target
+            and (watch.last_price is None or watch.last_price > target or not watch.in_stock)
+        )
+        with self._lock, self._conn:
+            if changed:
+                self._conn.execute(
+                    'INSERT INTO price_history (url, price, currency, in_stock, source, checked_at) VALUES (?, ?, ?, ?, ?, ?)',
+                    (watch.url, check.price, check.currency, int(check.in_stock), source, now),
+                )
+            self._conn.execute(
+                """
+                UPDATE watchlist SET failures = 0, last_error = NULL, last_price = ?, currency = ?, in_stock = ?,
+                    last_checked = ?, next_check = ?
+                WHERE url = ?
+                """,
+                (check.price, check.currency, int(check.in_stock), now, self._next_check(watch.interval), watch.url),
+            )
+        return changed, alert
+
+    def _record_failure(self, watch: Watch, error: Exception):
+        failures = watch.failures + 1
+        delay = min(watch.interval * 2 ** (failures - 1), self.max_backoff)
+        if isinstance(error, RateLimited):
+            delay = max(delay, error.retry_after)
+        with self._lock, self._conn:
+            self._conn.execute(
+                'UPDATE watchlist SET failures = ?, last_error = ?, last_checked = ?, next_check = ? WHERE url = ?',
+                (failures, str(error)[:500], time.time(), self._next_check(delay), watch.url),
+            )
+
+
+async def _run(args):
+    monitor = PriceMonitor(args.db)
+
+    async def run():
+        if args.forever:
+            await monitor.run_forever(args.poll)
+        else:
+            print(await monitor.run_once())
+
+    try:
+        if not args.browser:
+            await run()
+            return
+        # imported lazily: the browser fallback needs the agent stack and an API key
+        from buying_agent.buying_agent import BuyingAgent
+
+        async with BuyingAgent(headless=True) as agent:
+            monitor.browser_check = agent.check_price
+            await run()
+    finally:
+        monitor.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Price monitoring watchlist')
+    parser.add_argument('--db', default='price_watch.db', help='watchlist database')
+    commands = parser.add_subparsers(dest='command', required=True)
+    add = commands.add_parser('add', help='watch a product URL')
+    add.add_argument('url')
+    add.add_argument('--target', type=float, help='alert when the price drops to this')
+    add.add_argument('--interval', type=float, default=3600.0, help='seconds between checks')
+    remove = commands.add_parser('remove', help='stop watching a product URL')
+    remove.add_argument('url')
+    commands.add_parser('list', help='show the watchlist')
+    history = commands.add_parser('history', help='show price changes of a URL')
+    history.add_argument('url')
+    run = commands.add_parser('run', help='check due watches')
+    run.add_argument('--forever', action='store_true', help='keep polling for due watches')
+    run.add_argument('--poll', type=float, default=30.0, help='seconds between polls with --forever')
+    run.add_argument('--browser', action='store_true', help='fall back to a browser agent when the fast path fails')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == 'run':
+        asyncio.run(_run(args))
+        return
+
+    monitor = PriceMonitor(args.db)
+    try:
+        if args.command == 'add':
+            monitor.add(args.url, args.target, args.interval)
+        elif args.command == 'remove':
+            monitor.remove(args.url)
+        elif args.command == 'list':
+            for watch in monitor.watches(limit=monitor.count()):
+                print(f'{watch.url}\t{watch.last_price}\ttarget={watch.target_price}\tfailures={watch.failures}')
+        elif args.command == 'history':
+            for entry in monitor.history(args.url):
+                print(f"{time.strftime('%Y-%m-%d %H:%M', time.localtime(entry['checked_at']))}\t{entry['price']}\t"
+                      f"{'in stock' if entry['in_stock'] else 'out of stock'}\t{entry['source']}")
+    finally:
+        monitor.close()
+
+
+if __name__ == '__main__':
+    main()
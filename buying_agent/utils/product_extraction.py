@@ -0,0 +1,359 @@
+"""
+Structured product data straight from the page, for the buying agent.
+
+One script call collects everything a retail page says about its products in
+machine-readable form: schema.org JSON-LD (Product, Offer, ItemList), Open
+Graph and product meta tags, microdata, and the fields behind a per-site
+selector pack (Amazon, Flipkart, or a generic one). The result is one small
+typed record per product, or a list for search results:
+
+    page_data = await extract_products(page)
+    page_data.model_dump_json(exclude_none=True)
+
+so the LLM compares a few hundred tokens of JSON instead of reading the page.
+Fields a source does not provide are left empty for the agent to look up.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from typing import Optional
+from urllib.parse import urljoin, urlparse
+
+from browser_use import ActionResult, Controller
+from browser_use.browser.context import BrowserContext
+from pydantic import BaseModel
+
+from buying_agent.utils.price_monitor import _is_in_stock, _is_product, _json_ld_nodes, parse_price
+
+logger = logging.getLogger(__name__)
+
+
+class ProductRecord(BaseModel):
+    name: str
+    pack_size: Optional[str] = None
+    price: Optional[float] = None
+    mrp: Optional[float] = None
+    discount_percent: Optional[float] = None
+    currency: Optional[str] = None
+    delivery_fee: Optional[float] = None
+    delivery_eta: Optional[str] = None
+    in_stock: bool = True
+    url: Optional[str] = None
+    # where the record came from: json-ld, amazon, flipkart, generic, open-graph
+    source: str = ''
+
+
+class ProductPage(BaseModel):
+    kind: str  # 'product' or 'search'
+    url: str
+    products: list[ProductRecord] = []
+
+
+@dataclass(frozen=True)
+class SelectorPack:
+    # field -> CSS selectors tried in order on a product page
+    product: dict[str, tuple[str, ...]]
+    # one search result; its fields are looked up inside it
+    card: str = ''
+    result: dict[str, tuple[str, ...]] = field(default_factory=dict)
+
+
+AMAZON = SelectorPack(
+    product={
+        'name': ('#productTitle', '#title'),
+        'price': (
+            '#corePriceDisplay_desktop_feature_div .priceToPay .a-offscreen', '#corePrice_feature_div .a-price .a-offscreen',
+            '#apex_desktop .a-price .a-offscreen', '#priceblock_dealprice', '#priceblock_ourprice',
+        ),
+        'mrp': ('#corePriceDisplay_desktop_feature_div .basisPrice .a-offscreen', '.a-price.a-text-price[data-a-strike] .a-offscreen', '#priceblock_listprice'),
+        'discount': ('#corePriceDisplay_desktop_feature_div .savingsPercentage', '.savingsPercentage'),
+        'delivery': ('#mir-layout-DELIVERY_BLOCK-slot-PRIMARY_DELIVERY_MESSAGE_LARGE', '#deliveryBlockMessage', '#delivery-message'),
+        'pack_size': ('#variation_size_name .selection', '#inline-twister-expanded-dimension-text-size_name', '#variation_weight .selection'),
+        'availability': ('#availability',),
+    },
+    card='[data-component-type="s-search-result"]',
+    result={
+        'name': ('h2',),
+        'link': ('h2 a', 'a.a-link-normal[href*="/dp/"]'),
+        'price': ('.a-price:not(.a-text-price) .a-offscreen',),
+        'mrp': ('.a-price.a-text-price .a-offscreen',),
+        'delivery': ('[data-cy="delivery-recipe"]', '.s-delivery-message'),
+    },
+)
+
+# Flipkart's class names are generated; both the current and the previous generation are listed
+FLIPKART = SelectorPack(
+    product={
+        'name': ('h1 span.VU-ZEz', 'span.B_NuCI', 'h1'),
+        'price': ('div.Nx9bqj.CxhGGd', 'div._30jeq3._16Jk6d', 'div.Nx9bqj'),
+        'mrp': ('div.yRaY8j.A6\\+E6v', 'div._3I9_wc._2p6lqe', 'div.yRaY8j'),
+        'discount': ('div.UkUFwK span', 'div._3Ay6Sb span'),
+        'delivery': ('div.hVvnXm', 'div._3XINqE', 'div.Y8v7Fl'),
+        'pack_size': ('div.zSUVcY', 'a.CDDksN.zmLe5G'),
+        'availability': ('div.Z8JjpR', 'div._16FRp0'),
+    },
+    card='div[data-id]',
+    result={
+        'name': ('a.wjcEIp', 'div.KzDlHZ', 'a.s1Q9rs', 'div._4rR01T', 'a[title]'),
+        'link': ('a[href*="/p/"]',),
+        'price': ('div.Nx9bqj', 'div._30jeq3'),
+        'mrp': ('div.yRaY8j', 'div._3I9_wc'),
+        'discount': ('div.UkUFwK span', 'div._3Ay6Sb span'),
+        'pack_size': ('div.NqpwHC', 'div._3Djpdu'),
+    },
+)
+
+# Class-name conventions most storefronts follow
+GENERIC = SelectorPack(
+    product={
+        'name': ('[itemprop="name"]', '[class*="product-name"]', '[class*="product-title"]', 'h1'),
+        'price': ('[itemprop="price"]', '[class*="sale-price"]', '[class*="selling-price"]', '[class~="price"]', '[class*="price"]:not([class*="mrp"]):not([class*="list"])'),
+        'mrp': ('[class*="mrp"]', '[class*="list-price"]', '[class*="original-price"]', '[class*="price"] s', '[class*="price"] del'),
+        'discount': ('[class*="discount"]', '[class*="savings"]'),
+        'delivery': ('[class*="delivery"]', '[class*="shipping"]'),
+        'pack_size': ('[class*="pack-size"]', '[class*="weight"]', '[class*="variant"] [class*="selected"]'),
+        'availability': ('[itemprop="availability"]', '[class*="stock"]'),
+    },
+    card='[class*="search-result"], [class*="product-card"], [class*="product-tile"], #results > li',
+    result={
+        'name': ('[class*="name"]', '[class*="title"]', 'h2', 'h3', 'a'),
+        'link': ('a[href]',),
+        'price': ('[class*="sale-price"]', '[class~="price"]', '[class*="price"]:not([class*="mrp"])'),
+        'mrp': ('[class*="mrp"]', '[class*="list-price"]', 's', 'del'),
+        'delivery': ('[class*="delivery"]',),
+    },
+)
+
+SELECTOR_PACKS = {'amazon': AMAZON, 'flipkart': FLIPKART}
+
+EXTRACT_JS = """(pack) => {
+    const clean = s => (s || '').trim().replace(/\\s+/g, ' ').slice(0, 300);
+    const find = (root, selectors) => {
+        for (const selector of selectors || []) {
+            let el;
+            try { el = root.querySelector(selector); } catch (e) { continue; }
+            if (el) return el;
+        }
+        return null;
+    };
+    const textOf = el => el ? clean(el.getAttribute('content') || el.innerText || el.textContent) : null;
+    const fields = (root, selectors) => {
+        const out = {};
+        for (const [name, list] of Object.entries(selectors)) {
+            const el = find(root, list);
+            if (!el) continue;
+            out[name] = name === 'link' ? el.getAttribute('href') : textOf(el);
+        }
+        return out;
+    };
+    const jsonld = [];
+    for (const script of document.querySelectorAll('script[type="application/ld+json"]')) {
+        try { jsonld.push(JSON.parse(script.textContent)); } catch (e) {}
+    }
+    const meta = {};
+    for (const el of document.querySelectorAll('meta[property], meta[name]')) {
+        const key = el.getAttribute('property') || el.getAttribute('name');
+        if (/^(og|product):/.test(key) && el.content) meta[key] = el.content;
+    }
+    const results = [];
+    if (pack.card) {
+        for (const card of [...document.querySelectorAll(pack.card)].slice(0, 50)) {
+            const item = fields(card, pack.result);
+            if (item.name && item.price) results.push(item);
+        }
+    }
+    return {url: location.href, title: document.title, jsonld, meta, product: fields(document, pack.product), results};
+}"""
+
+_PACK_SIZE = re.compile(
+    r'\b\d+(?:\.\d+)?\s*(?:kg|g|gm|gms|grams?|mg|l|ltrs?|litres?|liters?|ml|pcs|pieces|units)\b(?:\s*[x×]\s*\d+)?|\bpack of \d+\b',
+    re.IGNORECASE,
+)
+_PERCENT = re.compile(r'(\d+(?:\.\d+)?)\s*%')
+_AMOUNT = re.compile(r'(?:₹|rs\.?|inr|\$|€|£)\s*\d[\d,.]*', re.IGNORECASE)
+_ETA = re.compile(
+    r'\b(?:arrives?|get it|delivered|delivery)\b\s*(?:by|on|in|within)?\s*'
+    r'(\d+\s*(?:-\s*\d+\s*)?(?:min(?:ute)?s?|hours?|hrs?|days?)\b'
+    r'|(?:today|tomorrow)\b[^|·,.]*'
+    r'|(?:mon|tue|wed|thu|fri|sat|sun)[a-z]*,?\s*\d{1,2}\s+[a-z]+'
+    r'|\d{1,2}\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*)',
+    re.IGNORECASE,
+)
+
+
+def pack_for(url: str) -> SelectorPack:
+    host = urlparse(url).netloc.lower()
+    return next((pack for name, pack in SELECTOR_PACKS.items() if name in host.split('.')), GENERIC)
+
+
+def pack_size(name: str) -> Optional[str]:
+    match = _PACK_SIZE.search(name or '')
+    return match.group().replace(' ', '') if match else None
+
+
+def parse_delivery(text: Optional[str]) -> tuple[Optional[float], Optional[str]]:
+    """(fee, eta) from a delivery line such as 'FREE delivery Tuesday, 12 March' or 'Delivery fee: ₹25 · Arrives in 10 minutes'"""
+    if not text:
+        return None, None
+    fee = None
+    if re.search(r'\bfree\b', text, re.IGNORECASE):
+        fee = 0.0
+    elif (amount := _AMOUNT.search(text)) is not None:
+        fee = parse_price(amount.group())
+    eta = _ETA.search(text)
+    return fee, eta.group(1).strip() if eta else None
+
+
+def _discount(text: Optional[str], price: Optional[float], mrp: Optional[float]) -> Optional[float]:
+    match = _PERCENT.search(text or '')
+    if match:
+        return float(match.group(1))
+    if price and mrp and mrp > price:
+        return round((mrp - price) / mrp * 100, 1)
+    return None
+
+
+def _from_fields(fields: dict, source: str, base_url: str) -> Optional[ProductRecord]:
+    name = fields.get('name')
+    if not name:
+        return None
+    price = parse_price(fields.get('price'))
+    mrp = parse_price(fields.get('mrp'))
+    fee, eta = parse_delivery(fields.get('delivery'))
+    return ProductRecord(
+        name=name,
+        pack_size=pack_size(fields.get('pack_size') or '') or pack_size(name),
+        price=price,
+        # the MRP is only worth reporting when it differs from the price
+        mrp=mrp if mrp != price else None,
+        discount_percent=_discount(fields.get('discount'), price, mrp),
+        delivery_fee=fee,
+        delivery_eta=eta,
+        in_stock=_is_in_stock(fields.get('availability')),
+        url=urljoin(base_url, fields['link']) if fields.get('link') else None,
+        source=source,
+    )
+
+
+def _from_json_ld(node: dict, base_url: str) -> ProductRecord:
+    offers = node.get('offers')
+    offer = next((o for o in (offers if isinstance(offers, list) else [offers]) if isinstance(o, dict)), {})
+    specs = offer.get('priceSpecification') or []
+    specs = [spec for spec in (specs if isinstance(specs, list) else [specs]) if isinstance(spec, dict)]
+    # Google's strike-through price: a ListPrice/StrikethroughPrice specification next to the sale price
+    list_prices = [spec for spec in specs if re.search(r'ListPrice|Strikethrough', str(spec.get('priceType', '')))]
+    sale = next((spec for spec in specs if spec not in list_prices), {})
+    price = parse_price(offer.get('price', offer.get('lowPrice', sale.get('price'))))
+    mrp = parse_price(list_prices[0].get('price')) if list_prices else None
+    shipping = offer.get('shippingDetails')
+    shipping = shipping[0] if isinstance(shipping, list) and shipping else shipping if isinstance(shipping, dict) else {}
+    rate = shipping.get('shippingRate')
+    weight = node.get('weight')
+    size = f"{weight.get('value', '')}{weight.get('unitText', '')}" if isinstance(weight, dict) else ''
+    name = str(node.get('name') or '')
+    link = node.get('url') or offer.get('url')
+    return ProductRecord(
+        name=name,
+        pack_size=pack_size(size) or pack_size(name),
+        price=price,
+        mrp=mrp if mrp != price else None,
+        discount_percent=_discount(None, price, mrp),
+        currency=offer.get('priceCurrency') or sale.get('priceCurrency'),
+        delivery_fee=parse_price(rate.get('value')) if isinstance(rate, dict) else None,
+        in_stock=_is_in_stock(offer.get('availability')),
+        url=urljoin(base_url, str(link)) if link else None,
+        source='json-ld',
+    )
+
+
+def _merge(primary: ProductRecord, extra: Optional[ProductRecord]) -> ProductRecord:
+    """Fill the fields `primary` is missing from `extra`"""
+    if extra is None:
+        return primary
+    missing = {key: value for key, value in extra.model_dump().items() if getattr(primary, key) in (None, '') and value is not None}
+    if not missing:
+        return primary
+    return primary.model_copy(update={**missing, 'source': f'{primary.source}+{extra.source}'})
+
+
+def parse_page(raw: dict, limit: int = 10) -> ProductPage:
+    """Records from what EXTRACT_JS collected: one product, or a list for search results"""
+    url = raw['url']
+    pack = pack_for(url)
+    source = next((name for name, candidate in SELECTOR_PACKS.items() if candidate is pack), 'generic')
+    nodes = [node for data in raw.get('jsonld', []) for node in _json_ld_nodes(data)]
+
+    listed = [
+        item.get('item', item)
+        for node in nodes
+        if node.get('@type') == 'ItemList'
+        for item in node.get('itemListElement', [])
+        if isinstance(item, dict)
+    ]
+    listed = [_from_json_ld(node, url) for node in listed if isinstance(node, dict) and _is_product(node)]
+    products = [_from_json_ld(node, url) for node in nodes if _is_product(node) and 'offers' in node]
+    from_pack = _from_fields(raw.get('product', {}), source, url)
+    results = [record for record in (_from_fields(item, source, url) for item in raw.get('results', [])) if record]
+
+    meta = raw.get('meta', {})
+    open_graph = None
+    if meta.get('og:title') and (meta.get('product:price:amount') or meta.get('og:price:amount')):
+        open_graph = ProductRecord(
+            name=meta['og:title'],
+            pack_size=pack_size(meta['og:title']),
+            price=parse_price(meta.get('product:price:amount') or meta.get('og:price:amount')),
+            currency=meta.get('product:price:currency') or meta.get('og:price:currency'),
+            in_stock=_is_in_stock(meta.get('product:availability') or meta.get('og:availability')),
+            url=meta.get('og:url'),
+            source='open-graph',
+        )
+
+    # a product page describes one product; search pages list several
+    if listed:
+        return ProductPage(kind='search', url=url, products=listed[:limit])
+    if len(products) != 1 and len(results) >= 2:
+        return ProductPage(kind='search', url=url, products=results[:limit])
+    if len(products) > 1:
+        return ProductPage(kind='search', url=url, products=products[:limit])
+    record = products[0] if products else from_pack or open_graph
+    if record is None:
+        return ProductPage(kind='search', url=url, products=results[:limit])
+    if record is not from_pack and from_pack is not None and from_pack.price is not None:
+        record = _merge(record, from_pack)
+    if record is not open_graph:
+        record = _merge(record, open_graph)
+    return ProductPage(kind='product', url=url, products=[record.model_copy(update={'url': record.url or url})])
+
+
+async def extract_products(page, limit: int = 10) -> ProductPage:
+    """Structured products of a Playwright page, from one script call"""
+    raw = await page.evaluate(EXTRACT_JS, _pack_arg(pack_for(page.url)))
+    return parse_page(raw, limit)
+
+
+def _pack_arg(pack: SelectorPack) -> dict:
+    return {'product': pack.product, 'card': pack.card, 'result': pack.result}
+
+
+class ExtractQuery(BaseModel):
+    limit: int = 10
+
+
+def register_product_actions(controller: Controller):
+    """Add the extract_product action the buying agent's tasks point to"""
+
+    @controller.action(
+        'Extract the products of the current product or search results page as JSON (name, pack size, price, MRP, '
+        'discount, delivery fee and ETA) - use this instead of reading the page text or screenshots',
+        param_model=ExtractQuery,
+    )
+    async def extract_product(query: ExtractQuery, browser: BrowserContext):
+        page = await browser.get_current_page()
+        result = await extract_products(page, limit=max(1, min(query.limit, 25)))
+        if not result.products:
+            return ActionResult(error='No structured product data on this page, read the page instead')
+        logger.info(f'Extracted {len(result.products)} products from the {result.kind} page {result.url}')
+        return ActionResult(extracted_content=result.model_dump_json(exclude_none=True), include_in_memory=True)
+
+    return extract_product
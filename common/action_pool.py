@@ -0,0 +1,260 @@
+"""
+Controller actions that never hold up the event loop.
+
+Every agent of a process shares one event loop, so an action doing blocking
+work (parsing a PDF, SQLite or file I/O, NumPy) stalls all the others while it
+runs. PooledController registers actions like Controller, but runs
+synchronous ones on its own bounded thread pool, CPU-heavy ones
+(cpu_bound=True) on a process pool when AGENT_ACTION_PROCESSES is set, and
+times every action:
+
+    controller = PooledController()
+
+    @controller.action('Read my cv', cpu_bound=True)
+    def read_cv(): ...
+
+    # blocking calls inside async actions
+    cv = await controller.run_blocking(load_cv, path)
+
+Writes from concurrent agents go through a BatchWriter: one consumer task
+collects them for a few milliseconds and commits each batch in one call on
+the pool, so agents never wait on each other's locks.
+"""
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from inspect import iscoroutinefunction
+from typing import Any, Awaitable, Callable, Generic, Optional, TypeVar
+
+from browser_use import Controller
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+# latencies kept per action for the percentiles
+_WINDOW = 512
+
+
+class ActionStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.latencies: deque[float] = deque(maxlen=_WINDOW)
+
+    def summary(self) -> dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else 0.0
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'in_flight': self.in_flight,
+            'p50_ms': round(percentile(0.5) * 1000, 1),
+            'p95_ms': round(percentile(0.95) * 1000, 1),
+            'max_ms': round(latencies[-1] * 1000, 1) if latencies else 0.0,
+        }
+
+
+class PooledController(Controller):
+    """Controller running blocking actions off the event loop, with per-action latency stats"""
+
+    def __init__(self, *args, threads: Optional[int] = None, processes: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = threads or int(os.getenv('AGENT_ACTION_THREADS', '8'))
+        self.processes = processes if processes is not None else int(os.getenv('AGENT_ACTION_PROCESSES', '0'))
+        self.action_stats: dict[str, ActionStats] = {}
+        self.writers: dict[str, 'BatchWriter'] = {}
+        # submitted to the pools but not started yet
+        self._queued = 0
+        self._queued_lock = threading.Lock()
+        self._thread_pool: Optional[ThreadPoolExecutor] = None
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+
+    def action(self, description: str, cpu_bound: bool = False, **kwargs):
+        """Register an action like Controller.action; synchronous ones run on the pool"""
+        register = super().action(description, **kwargs)
+
+        def decorator(func: Callable):
+            if iscoroutinefunction(func):
+
+                @functools.wraps(func)
+                async def timed(*args, **kwargs):
+                    with self._timed(func.__name__):
+                        return await func(*args, **kwargs)
+
+            else:
+
+                @functools.wraps(func)
+                async def timed(*args, **kwargs):
+                    # the latency includes the wait for a free worker
+                    with self._timed(func.__name__):
+                        return await self.run_blocking(func, *args, cpu_bound=cpu_bound, **kwargs)
+
+            register(timed)
+            return func
+
+        return decorator
+
+    async def run_blocking(self, func: Callable[..., T], *args, cpu_bound: bool = False, **kwargs) -> T:
+        """Run `func` on the thread pool, or the process pool when cpu_bound and AGENT_ACTION_PROCESSES is set"""
+        executor = self._executor(cpu_bound)
+        call = functools.partial(func, *args, **kwargs)
+        if isinstance(executor, ProcessPoolExecutor):
+            # arguments and the result are pickled; queue depth is only tracked for threads
+            return await asyncio.get_running_loop().run_in_executor(executor, call)
+        with self._queued_lock:
+            self._queued += 1
+        return await asyncio.get_running_loop().run_in_executor(executor, self._started, call)
+
+    def _started(self, call: Callable[[], T]) -> T:
+        with self._queued_lock:
+            self._queued -= 1
+        return call()
+
+    def _executor(self, cpu_bound: bool) -> Executor:
+        if cpu_bound and self.processes > 0:
+            if self._process_pool is None:
+                self._process_pool = ProcessPoolExecutor(max_workers=self.processes)
+            return self._process_pool
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='action')
+        return self._thread_pool
+
+    @contextmanager
+    def _timed(self, name: str):
+        stats = self.action_stats.setdefault(name, ActionStats())
+        stats.calls += 1
+        stats.in_flight += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            stats.in_flight -= 1
+            stats.latencies.append(time.perf_counter() - start)
+
+    def writer(self, name: str, write_batch: Callable[[list], Any], **options) -> 'BatchWriter':
+        """The batch writer `name`, created on first use; its batches are written on this controller's pool"""
+        if name not in self.writers:
+            self.writers[name] = BatchWriter(write_batch, run=self.run_blocking, **options)
+        return self.writers[name]
+
+    def stats(self) -> dict:
+        return {
+            'queued': self._queued,
+            'actions': {name: stats.summary() for name, stats in sorted(self.action_stats.items())},
+            'writers': {name: writer.stats() for name, writer in self.writers.items()},
+        }
+
+    def log_stats(self):
+        if self.action_stats:
+            logger.info(f'Actions: {json.dumps(self.stats())}')
+
+    def shutdown(self):
+        for pool in (self._thread_pool, self._process_pool):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._thread_pool = self._process_pool = None
+
+
+class BatchWriter(Generic[T]):
+    """
+    Serializes writes from concurrent agents: put() queues an item and returns
+    once the batch holding it was written (or raises what the write raised).
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[list[T]], Any],
+        run: Optional[Callable[..., Awaitable]] = None,
+        max_batch: int = 100,
+        max_delay: float = 0.05,
+    ):
+        self.write_batch = write_batch
+        # how the blocking write is run, asyncio.to_thread unless a pool is given
+        self.run = run or asyncio.to_thread
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.written = 0
+        self.batches = 0
+        self.max_depth = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def put(self, item: T):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            # queues belong to one loop; a new asyncio.run gets a new consumer
+            self._loop, self._queue = loop, asyncio.Queue()
+            self._task = loop.create_task(self._consume())
+        future = loop.create_future()
+        self._queue.put_nowait((item, future))
+        self.max_depth = max(self.max_depth, self._queue.qsize())
+        await future
+
+    async def _consume(self):
+        loop = asyncio.get_running_loop()
+        batch: list[tuple[T, asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                deadline = loop.time() + self.max_delay
+                while len(batch) < self.max_batch:
+                    if self._queue.empty():
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                        except asyncio.TimeoutError:
+                            break
+                    else:
+                        batch.append(self._queue.get_nowait())
+                try:
+                    await self.run(self.write_batch, [item for item, _ in batch])
+                except Exception as e:
+                    logger.error(f'Batch write of {len(batch)} items failed: {e}')
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                else:
+                    self.written += len(batch)
+                    self.batches += 1
+                    for _, future in batch:
+                        if not future.done():
+                            future.set_result(None)
+        finally:
+            # cancelled (or the loop is closing): no put() may wait for a write that never comes
+            while not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            for _, future in batch:
+                if not future.done():
+                    future.cancel()
+
+    def stats(self) -> dict:
+        return {
+            'written': self.written,
+            'batches': self.batches,
+            'mean_batch': round(self.written / self.batches, 1) if self.batches else 0.0,
+            'depth': self.depth,
+            'max_depth': self.max_depth,
+        }
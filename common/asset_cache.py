@@ -0,0 +1,379 @@
+"""
+On-disk cache of static assets shared by every browser context and run.
+
+Browser contexts start with an empty HTTP cache, and Playwright request
+routing turns Chrome's cache off altogether, so every agent downloads the
+same script bundles, stylesheets and images again. Profiled browsers
+(common.browser_profiles) route those requests through this cache instead:
+
+    async def route_request(route):
+        if not await cache.handle(route):
+            await route.continue_()
+
+    await playwright_context.route('**/*', route_request)
+
+Bodies are stored content-addressed (sha256) under AGENT_ASSET_CACHE_DIR
+(default .cache/assets), so the same bundle served from several URLs is kept
+once. Responses are stored and reused as a shared HTTP cache would: GET 200
+responses without Set-Cookie, `private` or `no-store` (and, for requests
+carrying Authorization, only `public` or s-maxage ones), fresh for s-maxage,
+max-age, Expires or 10% of their Last-Modified age. Stale entries with an
+ETag or Last-Modified are revalidated with a conditional request. The least
+recently used entries are evicted past AGENT_ASSET_CACHE_MB (default 512).
+Concurrent misses for one URL wait for a single download. AGENT_ASSET_CACHE=off
+disables the cache.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# media is left out: video and audio are fetched with range requests
+CACHEABLE_TYPES = frozenset({'script', 'stylesheet', 'image', 'font'})
+# larger bodies are passed through without being stored
+MAX_ASSET_BYTES = 8 * 1024 * 1024
+# cap on the heuristic lifetime of responses that only have Last-Modified
+MAX_HEURISTIC_LIFETIME = 24 * 3600
+# headers that describe the stored transfer, not the asset; the body is kept decoded
+_TRANSFER_HEADERS = frozenset({'content-encoding', 'content-length', 'transfer-encoding', 'connection', 'keep-alive', 'date', 'age'})
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    url TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    headers TEXT NOT NULL,
+    vary TEXT NOT NULL,
+    expires REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_accessed ON assets (accessed);
+CREATE INDEX IF NOT EXISTS assets_digest ON assets (digest);
+CREATE TABLE IF NOT EXISTS blobs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL
+);
+"""
+
+
+def parse_cache_control(value: str) -> dict[str, Optional[str]]:
+    directives = {}
+    for part in value.split(','):
+        name, _, argument = part.strip().partition('=')
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+def _http_time(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def freshness_lifetime(headers: dict[str, str], now: Optional[float] = None, authorized: bool = False) -> Optional[float]:
+    """
+    Seconds a response stays fresh in a shared cache, None when it must not be
+    stored. `authorized` is set when the request carried Authorization.
+    """
+    cache_control = parse_cache_control(headers.get('cache-control', ''))
+    if 'no-store' in cache_control or 'private' in cache_control or 'set-cookie' in headers:
+        return None
+    # contexts signed in to different accounts share this cache (RFC 9111 section 3.5)
+    if authorized and 'public' not in cache_control and 's-maxage' not in cache_control:
+        return None
+    if headers.get('vary', '').strip() == '*':
+        return None
+    validated = 'etag' in headers or 'last-modified' in headers
+    if 'no-cache' in cache_control:
+        return 0.0 if validated else None
+    for directive in ('s-maxage', 'max-age'):
+        if directive in cache_control:
+            try:
+                return max(float(cache_control[directive]), 0.0)
+            except (TypeError, ValueError):
+                return 0.0 if validated else None
+    date = _http_time(headers.get('date')) or now or time.time()
+    if 'expires' in headers:
+        expires = _http_time(headers['expires'])
+        return max(expires - date, 0.0) if expires else 0.0
+    last_modified = _http_time(headers.get('last-modified'))
+    if last_modified is not None:
+        return min(max(date - last_modified, 0.0) * 0.1, MAX_HEURISTIC_LIFETIME)
+    return 0.0 if validated else None
+
+
+def _vary_values(vary: str, request_headers: dict[str, str]) -> dict[str, str]:
+    # the body is stored decoded, so the encoding a request accepts does not matter
+    names = [name.strip().lower() for name in vary.split(',') if name.strip()]
+    return {name: request_headers.get(name, '') for name in names if name != 'accept-encoding'}
+
+
+@dataclass
+class CachedAsset:
+    url: str
+    digest: str
+    headers: dict[str, str]
+    vary: dict[str, str]
+    expires: float
+
+    @property
+    def fresh(self) -> bool:
+        return self.expires > time.time()
+
+    def conditional_headers(self) -> dict[str, str]:
+        headers = {}
+        if 'etag' in self.headers:
+            headers['if-none-match'] = self.headers['etag']
+        if 'last-modified' in self.headers:
+            headers['if-modified-since'] = self.headers['last-modified']
+        return headers
+
+
+class AssetCache:
+    def __init__(self, directory: str | Path, max_bytes: int = 512 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.blobs = self.directory / 'blobs'
+        self.blobs.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.counts = {'hits': 0, 'revalidated': 0, 'misses': 0, 'stored': 0, 'errors': 0}
+        self.bytes_served = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / 'index.db', check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM blobs').fetchone()[0]
+        # downloads in flight per URL, so concurrent misses fetch once
+        self._pending: dict[str, asyncio.Future] = {}
+
+    @classmethod
+    def from_env(cls) -> Optional['AssetCache']:
+        if os.getenv('AGENT_ASSET_CACHE', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(
+            os.getenv('AGENT_ASSET_CACHE_DIR', '.cache/assets'),
+            max_bytes=int(float(os.getenv('AGENT_ASSET_CACHE_MB', '512')) * 1024 * 1024),
+        )
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blobs / digest[:2] / digest
+
+    def lookup(self, url: str, request_headers: dict[str, str]) -> Optional[CachedAsset]:
+        """The stored response for the URL matching the request's Vary headers"""
+        with self._lock:
+            row = self._conn.execute('SELECT digest, headers, vary, expires FROM assets WHERE url = ?', (url,)).fetchone()
+            if row is None:
+                return None
+            asset = CachedAsset(url, row[0], json.loads(row[1]), json.loads(row[2]), row[3])
+            if any(request_headers.get(name, '') != value for name, value in asset.vary.items()):
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE assets SET accessed = ? WHERE url = ?', (time.time(), url))
+        return asset
+
+    def read(self, asset: CachedAsset) -> Optional[bytes]:
+        try:
+            return self._blob_path(asset.digest).read_bytes()
+        except FileNotFoundError:
+            self._forget(asset.url)
+            return None
+
+    def store(self, url: str, request_headers: dict[str, str], headers: dict[str, str], body: bytes) -> bool:
+        """Store a 200 response when its headers allow it; False when it is not cacheable"""
+        lifetime = freshness_lifetime(headers, authorized='authorization' in request_headers)
+        if lifetime is None or len(body) > MAX_ASSET_BYTES:
+            return False
+        digest = hashlib.sha256(body).hexdigest()
+        path = self._blob_path(digest)
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            tmp = path.with_name(f'{digest}.{threading.get_ident()}.tmp')
+            tmp.write_bytes(body)
+            tmp.replace(path)
+        kept = {name: value for name, value in headers.items() if name not in _TRANSFER_HEADERS}
+        vary = _vary_values(headers.get('vary', ''), request_headers)
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                if self._conn.execute('INSERT OR IGNORE INTO blobs (digest, size) VALUES (?, ?)', (digest, len(body))).rowcount:
+                    self._size += len(body)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO assets (url, digest, headers, vary, expires, accessed) VALUES (?, ?, ?, ?, ?, ?)',
+                    (url, digest, json.dumps(kept), json.dumps(vary), now + lifetime, now),
+                )
+            self._evict()
+        return True
+
+    def refresh(self, asset: CachedAsset, headers: dict[str, str]):
+        """Extend a stored response after a 304, taking the new caching headers"""
+        merged = {**asset.headers, **{name: value for name, value in headers.items() if name not in _TRANSFER_HEADERS}}
+        lifetime = freshness_lifetime(merged)
+        if lifetime is None:
+            self._forget(asset.url)
+            return
+        asset.headers, asset.expires = merged, time.time() + lifetime
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    'UPDATE assets SET headers = ?, expires = ? WHERE url = ?', (json.dumps(merged), asset.expires, asset.url)
+                )
+
+    def _forget(self, url: str):
+        with self._lock:
+            with self._conn:
+                self._conn.execute('DELETE FROM assets WHERE url = ?', (url,))
+            self._drop_unused_blobs()
+
+    def _evict(self):
+        evicted = 0
+        while self._size > self.max_bytes:
+            rows = self._conn.execute('SELECT url, digest FROM assets ORDER BY accessed LIMIT 64').fetchall()
+            if not rows:
+                break
+            # one entry at a time, a body shared by several URLs only frees space with the last of them
+            for url, digest in rows:
+                with self._conn:
+                    self._conn.execute('DELETE FROM assets WHERE url = ?', (url,))
+                evicted += 1
+                if self._conn.execute('SELECT 1 FROM assets WHERE digest = ? LIMIT 1', (digest,)).fetchone() is None:
+                    self._drop_blob(digest)
+                if self._size <= self.max_bytes:
+                    break
+        if evicted:
+            logger.debug(f'Evicted {evicted} assets from {self.directory}')
+
+    def _drop_blob(self, digest: str):
+        row = self._conn.execute('SELECT size FROM blobs WHERE digest = ?', (digest,)).fetchone()
+        if row is None:
+            return
+        with self._conn:
+            self._conn.execute('DELETE FROM blobs WHERE digest = ?', (digest,))
+        self._blob_path(digest).unlink(missing_ok=True)
+        self._size -= row[0]
+
+    def _drop_unused_blobs(self):
+        unused = self._conn.execute('SELECT digest, size FROM blobs WHERE digest NOT IN (SELECT digest FROM assets)').fetchall()
+        if not unused:
+            return
+        with self._conn:
+            self._conn.executemany('DELETE FROM blobs WHERE digest = ?', [(digest,) for digest, _ in unused])
+        for digest, size in unused:
+            self._blob_path(digest).unlink(missing_ok=True)
+            self._size -= size
+
+    async def handle(self, route) -> bool:
+        """
+        Answer a routed request from the cache or the network, storing what
+        may be reused. Returns False, leaving the route alone, for requests
+        the cache does not deal with.
+        """
+        request = route.request
+        if (
+            request.method != 'GET'
+            or request.resource_type not in CACHEABLE_TYPES
+            or not request.url.startswith(('http://', 'https://'))
+            or 'range' in request.headers
+        ):
+            return False
+        url = request.url.split('#')[0]
+        # request.headers leaves out credentials such as Authorization
+        request_headers = await request.all_headers()
+        while (pending := self._pending.get(url)) is not None:
+            # another context is looking it up or downloading it right now
+            await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[url] = future
+        try:
+            asset = await asyncio.to_thread(self.lookup, url, request_headers)
+            if asset is not None and asset.fresh and await self._fulfill(route, asset):
+                self.counts['hits'] += 1
+            else:
+                await self._fetch(route, url, asset, request_headers)
+        finally:
+            self._pending.pop(url, None)
+            future.set_result(None)
+        return True
+
+    async def _fulfill(self, route, asset: CachedAsset) -> bool:
+        body = await asyncio.to_thread(self.read, asset)
+        if body is None:
+            return False
+        self.bytes_served += len(body)
+        await route.fulfill(status=200, headers=asset.headers, body=body)
+        return True
+
+    async def _fetch(self, route, url: str, asset: Optional[CachedAsset], request_headers: dict[str, str]):
+        conditional = asset.conditional_headers() if asset is not None else {}
+        try:
+            response = await route.fetch(headers={**route.request.headers, **conditional} if conditional else None)
+        except Exception as e:
+            # the page gets the network error the way it would without the cache
+            self.counts['errors'] += 1
+            logger.debug(f'Asset fetch for {url} failed: {e}')
+            await route.continue_()
+            return
+        if response.status == 304 and asset is not None:
+            await asyncio.to_thread(self.refresh, asset, response.headers)
+            if await self._fulfill(route, asset):
+                self.counts['revalidated'] += 1
+                return
+            response = await route.fetch()
+        self.counts['misses'] += 1
+        if response.status == 200 and response.url.split('#')[0] == url:
+            body = await response.body()
+            if await asyncio.to_thread(self.store, url, request_headers, response.headers, body):
+                self.counts['stored'] += 1
+        await route.fulfill(response=response)
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._conn.execute('SELECT COUNT(*) FROM assets').fetchone()[0]
+        served = self.counts['hits'] + self.counts['revalidated']
+        lookups = served + self.counts['misses']
+        return {
+            **self.counts,
+            'hit_rate': served / lookups if lookups else 0.0,
+            'bytes_served': self.bytes_served,
+            'entries': entries,
+            'bytes': self._size,
+        }
+
+    def log_stats(self):
+        stats = self.stats()
+        logger.info(
+            f"Asset cache: {stats['hit_rate']:.0%} hit rate ({stats['hits']} hits, {stats['revalidated']} revalidated, "
+            f"{stats['misses']} misses), {stats['bytes_served'] / 1e6:.1f} MB served from disk, "
+            f"{stats['entries']} assets in {stats['bytes'] / 1e6:.1f} MB"
+        )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_shared: dict[str, Optional[AssetCache]] = {}
+
+
+def shared_asset_cache() -> Optional[AssetCache]:
+    """The process-wide cache configured by the environment, None when it is off"""
+    if 'cache' not in _shared:
+        _shared['cache'] = AssetCache.from_env()
+    return _shared['cache']
+
+
+def log_asset_stats():
+    """Log the hit rate of the shared cache when this process used it"""
+    cache = _shared.get('cache')
+    if cache is not None and sum(cache.counts.values()):
+        cache.log_stats()
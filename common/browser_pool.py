@@ -0,0 +1,220 @@
+"""
+Pool of long-lived browsers that hand out isolated contexts to concurrent agents.
+
+Each pooled browser is its own Chrome process. Agents borrow a fresh
+BrowserContext (separate cookies, storage and tabs) and give it back when
+they are done, so many agents can share one host without stepping on each
+other's tabs. Browsers stay warm between tasks and are recycled when they
+crash or start leaking contexts/pages.
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import AsyncIterator, Callable, Optional
+
+from browser_use.browser.browser import Browser
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class PoolConfig:
+    # Number of Chrome processes kept alive by the pool
+    size: int = 2
+    # Concurrent contexts allowed per Chrome process
+    contexts_per_browser: int = 3
+    # Recycle a browser after it has served this many contexts
+    max_contexts_served: int = 50
+    # Recycle a browser when it holds more pages than this (leaked tabs)
+    max_open_pages: int = 20
+    # Seconds between background health checks, 0 disables the checker
+    health_check_interval: float = 30.0
+
+
+class _PooledBrowser:
+    def __init__(self, slot: int, browser: Browser):
+        self.slot = slot
+        self.browser = browser
+        self.active: set[BrowserContext] = set()
+        # contexts handed to borrowers and still being opened
+        self.pending = 0
+        self.served = 0
+        self.draining = False
+
+    def load(self) -> int:
+        return len(self.active) + self.pending
+
+    def is_connected(self) -> bool:
+        playwright_browser = self.browser.playwright_browser
+        return playwright_browser is not None and playwright_browser.is_connected()
+
+    def open_pages(self) -> int:
+        playwright_browser = self.browser.playwright_browser
+        if playwright_browser is None:
+            return 0
+        return sum(len(context.pages) for context in playwright_browser.contexts)
+
+    def open_contexts(self) -> int:
+        playwright_browser = self.browser.playwright_browser
+        if playwright_browser is None:
+            return 0
+        return len(playwright_browser.contexts)
+
+
+class BrowserPool:
+    """Fixed set of warm browsers handing out isolated contexts with a concurrency limit"""
+
+    def __init__(
+        self,
+        browser_factory: Callable[[], Browser],
+        config: Optional[PoolConfig] = None,
+        context_config: Optional[BrowserContextConfig] = None,
+    ):
+        self.browser_factory = browser_factory
+        self.config = config or PoolConfig()
+        self.context_config = context_config
+        self._browsers: list[_PooledBrowser] = []
+        self._capacity = asyncio.Semaphore(self.config.size * self.config.contexts_per_browser)
+        self._lock = asyncio.Lock()
+        # notified whenever a context is released or a browser replaced
+        self._available = asyncio.Condition(self._lock)
+        self._health_task: Optional[asyncio.Task] = None
+        self._started = False
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def start(self):
+        """Launch all browsers up front so the first tasks do not pay the startup cost"""
+        if self._started:
+            return
+        self._started = True
+        self._browsers = [await self._launch(slot) for slot in range(self.config.size)]
+        if self.config.health_check_interval > 0:
+            self._health_task = asyncio.create_task(self._health_loop())
+        logger.info(f'Browser pool started with {self.config.size} browsers')
+
+    async def close(self):
+        """Close every browser in the pool"""
+        if self._health_task:
+            self._health_task.cancel()
+            self._health_task = None
+        for entry in self._browsers:
+            await self._close_browser(entry)
+        self._browsers = []
+        self._started = False
+
+    @asynccontextmanager
+    async def context(self, config: Optional[BrowserContextConfig] = None) -> AsyncIterator[BrowserContext]:
+        """Borrow an isolated browser context; it is closed and its slot released on exit"""
+        if not self._started:
+            await self.start()
+
+        async with self._capacity:
+            entry = await self._acquire()
+            try:
+                context = await entry.browser.new_context(config or self.context_config or entry.browser.config.new_context_config)
+                entry.active.add(context)
+            except BaseException:
+                entry.pending -= 1
+                await self._recycle_if_idle(entry)
+                raise
+            entry.pending -= 1
+            entry.served += 1
+            try:
+                yield context
+            finally:
+                entry.active.discard(context)
+                try:
+                    await context.close()
+                except Exception as e:
+                    logger.debug(f'Failed to close pooled context: {e}')
+                if entry.served >= self.config.max_contexts_served:
+                    entry.draining = True
+                await self._recycle_if_idle(entry)
+
+    async def check_health(self):
+        """Mark crashed or leaking browsers for recycling and replace idle ones"""
+        for entry in list(self._browsers):
+            if entry.browser.playwright_browser is None:
+                # not launched yet or already closed
+                continue
+            if not entry.is_connected():
+                logger.warning(f'Browser {entry.slot} disconnected, recycling')
+                entry.draining = True
+            elif entry.open_pages() > self.config.max_open_pages:
+                logger.warning(f'Browser {entry.slot} has {entry.open_pages()} open pages, recycling')
+                entry.draining = True
+            elif entry.open_contexts() > len(entry.active):
+                logger.warning(f'Browser {entry.slot} has leaked contexts, recycling')
+                entry.draining = True
+            await self._recycle_if_idle(entry)
+
+    def stats(self) -> dict:
+        return {
+            'browsers': len(self._browsers),
+            'active_contexts': sum(len(entry.active) for entry in self._browsers),
+            'served': sum(entry.served for entry in self._browsers),
+            'draining': sum(1 for entry in self._browsers if entry.draining),
+        }
+
+    async def _launch(self, slot: int) -> _PooledBrowser:
+        browser = self.browser_factory()
+        await browser.get_playwright_browser()
+        return _PooledBrowser(slot, browser)
+
+    async def _acquire(self) -> _PooledBrowser:
+        """Least busy browser with a free slot, reserved for one context"""
+        async with self._available:
+            while True:
+                for entry in list(self._browsers):
+                    if entry.draining and not entry.load():
+                        await self._replace(entry)
+                candidates = [
+                    entry
+                    for entry in self._browsers
+                    if not entry.draining and entry.load() < self.config.contexts_per_browser
+                ]
+                if candidates:
+                    break
+                # draining browsers still serve their last contexts, wait for one to be recycled
+                await self._available.wait()
+            entry = min(candidates, key=lambda e: e.load())
+            if not entry.is_connected():
+                entry = await self._replace(entry)
+            entry.pending += 1
+            return entry
+
+    async def _recycle_if_idle(self, entry: _PooledBrowser):
+        async with self._available:
+            if entry.draining and not entry.load() and entry in self._browsers:
+                await self._replace(entry)
+            self._available.notify_all()
+
+    async def _replace(self, entry: _PooledBrowser) -> _PooledBrowser:
+        await self._close_browser(entry)
+        fresh = await self._launch(entry.slot)
+        self._browsers[self._browsers.index(entry)] = fresh
+        logger.info(f'Recycled browser {entry.slot} after serving {entry.served} contexts')
+        return fresh
+
+    async def _close_browser(self, entry: _PooledBrowser):
+        try:
+            await entry.browser.close()
+        except Exception as e:
+            logger.debug(f'Failed to close pooled browser {entry.slot}: {e}')
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.config.health_check_interval)
+            try:
+                await self.check_health()
+            except Exception as e:
+                logger.error(f'Browser pool health check failed: {e}')
@@ -0,0 +1,221 @@
+"""
+Browser profiles: how Chrome is launched and what its pages may load.
+
+    desktop  the visible browser the scripts always used (headless on Linux
+             without a display), nothing blocked; uses CHROME_PATH when set
+    fast     headless bundled Chromium that aborts images, media, fonts and
+             tracker requests, turns off animations, caps the viewport at
+             1280x800 with a device scale factor of 1 and keeps the number of
+             renderer processes per browser low
+
+The agents only read the DOM, so the fast profile cuts page-load and
+DOM-ready times and the memory each Chrome process needs. Sites that break
+without their assets go on the safe list (AGENT_PROFILE_SAFE_DOMAINS), where
+nothing is blocked. Blocking uses Playwright request routing, which turns off
+the HTTP cache of the context; scripts, stylesheets, images and fonts that get
+through are served from the on-disk cache shared by all browsers
+(common.asset_cache) instead.
+
+The profile is picked per workflow: AGENT_BROWSER_PROFILE_<WORKFLOW> (for
+example AGENT_BROWSER_PROFILE_JIRA=desktop), then AGENT_BROWSER_PROFILE,
+then the workflow's default.
+"""
+
+import logging
+import os
+import sys
+from dataclasses import dataclass, replace
+from typing import Optional
+from urllib.parse import urlparse
+
+from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use.browser.context import BrowserContext, BrowserContextConfig
+
+from common.asset_cache import AssetCache, shared_asset_cache
+
+logger = logging.getLogger(__name__)
+
+MACOS_CHROME = '/Applications/Google Chrome.app/Contents/MacOS/Google Chrome'
+
+TRACKER_DOMAINS = (
+    'google-analytics.com', 'googletagmanager.com', 'googleadservices.com', 'doubleclick.net', 'adservice.google.com',
+    'connect.facebook.net', 'hotjar.com', 'segment.com', 'segment.io', 'mixpanel.com', 'optimizely.com', 'fullstory.com',
+    'clarity.ms', 'bat.bing.com', 'nr-data.net', 'js-agent.newrelic.com', 'scorecardresearch.com', 'quantserve.com',
+    'criteo.com', 'criteo.net', 'taboola.com', 'outbrain.com', 'amazon-adsystem.com', 'adnxs.com', 'branch.io',
+)
+
+# Pages that break without their assets: nothing is blocked on them
+SAFE_DOMAINS = ('recaptcha.net', 'hcaptcha.com', 'challenges.cloudflare.com')
+
+NO_ANIMATIONS_JS = """
+(() => {
+    const style = document.createElement('style');
+    style.textContent = '*, *::before, *::after { animation: none !important; transition: none !important; scroll-behavior: auto !important; caret-color: auto !important; }';
+    const add = () => (document.head || document.documentElement).appendChild(style);
+    if (document.readyState === 'loading') document.addEventListener('DOMContentLoaded', add); else add();
+})();
+"""
+
+# Chrome features an agent never needs; each one is a background process or a network round trip
+LEAN_ARGS = [
+    '--disable-extensions',
+    '--disable-background-networking',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--disable-sync',
+    '--no-first-run',
+    '--mute-audio',
+    '--disable-features=Translate,MediaRouter,OptimizationHints,site-per-process,IsolateOrigins',
+]
+
+
+def _matches(host: str, domains) -> bool:
+    return any(host == domain or host.endswith('.' + domain) for domain in domains)
+
+
+def _env_list(name: str) -> tuple[str, ...]:
+    return tuple(item.strip().lower() for item in os.getenv(name, '').split(',') if item.strip())
+
+
+@dataclass(frozen=True)
+class BrowserProfile:
+    name: str
+    headless: bool = False
+    # Playwright resource types aborted on every page (image, media, font, stylesheet, ...)
+    block_resource_types: frozenset[str] = frozenset()
+    block_domains: tuple[str, ...] = ()
+    safe_domains: tuple[str, ...] = SAFE_DOMAINS
+    disable_animations: bool = False
+    viewport: tuple[int, int] = (1280, 800)
+    device_scale_factor: Optional[float] = None
+    # Renderer processes per Chrome, 0 leaves it to Chrome
+    renderer_process_limit: int = 0
+    extra_args: tuple[str, ...] = ('--disable-dev-shm-usage',)
+    chrome_path: Optional[str] = None
+
+    @property
+    def blocks(self) -> bool:
+        return bool(self.block_resource_types or self.block_domains)
+
+    def should_block(self, resource_type: str, url: str, page_url: str = '') -> bool:
+        if resource_type == 'document' or not self.blocks:
+            return False
+        if page_url and _matches(urlparse(page_url).netloc.lower(), self.safe_domains):
+            return False
+        host = urlparse(url).netloc.lower()
+        if _matches(host, self.safe_domains):
+            return False
+        return resource_type in self.block_resource_types or _matches(host, self.block_domains)
+
+    def chromium_args(self) -> list[str]:
+        width, height = self.viewport
+        args = [f'--window-size={width},{height}', *self.extra_args]
+        if self.device_scale_factor:
+            args.append(f'--force-device-scale-factor={self.device_scale_factor:g}')
+        if self.disable_animations:
+            args.append('--force-prefers-reduced-motion')
+        if self.renderer_process_limit:
+            args.append(f'--renderer-process-limit={self.renderer_process_limit}')
+        if self.headless:
+            args += LEAN_ARGS
+        return args
+
+    def context_config(self, **overrides) -> BrowserContextConfig:
+        width, height = self.viewport
+        return BrowserContextConfig(browser_window_size={'width': width, 'height': height}, **overrides)
+
+    def browser_config(self) -> BrowserConfig:
+        return BrowserConfig(
+            headless=self.headless,
+            chrome_instance_path=self.chrome_path,
+            extra_chromium_args=self.chromium_args(),
+            new_context_config=self.context_config(),
+        )
+
+    def create_browser(self, *extra_args: str) -> 'ProfiledBrowser':
+        """A new Chrome process with this profile; extra_args are appended to its command line"""
+        profile = replace(self, extra_args=(*self.extra_args, *extra_args)) if extra_args else self
+        return ProfiledBrowser(profile)
+
+
+def _desktop_chrome() -> Optional[str]:
+    path = os.getenv('CHROME_PATH')
+    if path:
+        return path
+    return MACOS_CHROME if sys.platform == 'darwin' and os.path.exists(MACOS_CHROME) else None
+
+
+def _has_display() -> bool:
+    return not sys.platform.startswith('linux') or bool(os.getenv('DISPLAY') or os.getenv('WAYLAND_DISPLAY'))
+
+
+def _profiles() -> dict[str, BrowserProfile]:
+    # Built on each lookup so the environment is read when a workflow starts
+    safe = SAFE_DOMAINS + _env_list('AGENT_PROFILE_SAFE_DOMAINS')
+    return {
+        'desktop': BrowserProfile('desktop', headless=not _has_display(), safe_domains=safe, chrome_path=_desktop_chrome()),
+        'fast': BrowserProfile(
+            'fast',
+            headless=True,
+            block_resource_types=frozenset(_env_list('AGENT_BLOCK_RESOURCES') or ('image', 'media', 'font')),
+            block_domains=TRACKER_DOMAINS + _env_list('AGENT_BLOCK_DOMAINS'),
+            safe_domains=safe,
+            disable_animations=True,
+            device_scale_factor=1,
+            renderer_process_limit=4,
+        ),
+    }
+
+
+def get_profile(workflow: Optional[str] = None, default: str = 'desktop') -> BrowserProfile:
+    """The profile for `workflow`, from AGENT_BROWSER_PROFILE_<WORKFLOW>, AGENT_BROWSER_PROFILE or `default`"""
+    name = (workflow and os.getenv(f'AGENT_BROWSER_PROFILE_{workflow.upper()}')) or os.getenv('AGENT_BROWSER_PROFILE') or default
+    profiles = _profiles()
+    if name not in profiles:
+        raise ValueError(f'Unknown browser profile {name!r}, expected one of {", ".join(profiles)}')
+    return profiles[name]
+
+
+class ProfiledBrowser(Browser):
+    """browser-use Browser whose contexts apply the profile's blocking and page tweaks"""
+
+    def __init__(self, profile: BrowserProfile):
+        super().__init__(config=profile.browser_config())
+        self.profile = profile
+        self.assets = shared_asset_cache()
+
+    async def new_context(self, config: Optional[BrowserContextConfig] = None) -> BrowserContext:
+        return ProfiledBrowserContext(
+            browser=self, config=config or self.config.new_context_config, profile=self.profile, assets=self.assets
+        )
+
+
+class ProfiledBrowserContext(BrowserContext):
+    def __init__(
+        self, browser: Browser, config: BrowserContextConfig, profile: BrowserProfile, assets: Optional[AssetCache] = None
+    ):
+        super().__init__(browser=browser, config=config)
+        self.profile = profile
+        self.assets = assets
+        self.blocked_requests = 0
+
+    async def _create_context(self, browser):
+        context = await super()._create_context(browser)
+        if self.profile.disable_animations:
+            await context.add_init_script(NO_ANIMATIONS_JS)
+        if self.profile.blocks or self.assets is not None:
+            await context.route('**/*', self._route)
+        return context
+
+    async def _route(self, route):
+        request = route.request
+        try:
+            page_url = request.frame.page.url
+        except Exception:
+            # service worker requests have no frame
+            page_url = ''
+        if self.profile.should_block(request.resource_type, request.url, page_url):
+            self.blocked_requests += 1
+            await route.abort('blockedbyclient')
+        elif self.assets is None or not await self.assets.handle(route):
+            await route.continue_()
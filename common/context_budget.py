@@ -0,0 +1,251 @@
+"""
+Token-budgeted context compaction in front of any LangChain chat model.
+
+browser-use resends the whole message history on every step, so each action
+result kept in memory is paid for again on every later step. The compactor
+rewrites each request before it reaches the model:
+
+    1. structured data (JSON blocks and JSON messages) is minified
+    2. large action results are stored once in a PayloadStore and replaced by
+       a short preview plus a handle the agent can open with `read_payload`
+    3. while the history is over the budget, the oldest action results are
+       cut down to a preview and then the oldest steps are evicted
+
+The system prompt, the task and the current browser state are never touched.
+Tokens before and after are logged per step and totaled in `stats`.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Optional
+
+from browser_use import ActionResult, Controller
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, Field
+
+from common.llm_wrappers import ChatModelWrapper
+from common.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# browser-use puts this marker between the fixed prompt and the step history
+HISTORY_MARKER = '[Your task history memory starts here]'
+RESULT_PREFIXES = ('Action result: ', 'Action error: ')
+# browser-use's own estimate for one screenshot
+IMAGE_TOKENS = 800
+
+_JSON_BLOCK = re.compile(r'```json\s*\n(.*?)\n\s*```', re.DOTALL)
+
+
+@lru_cache(maxsize=4096)
+def _text_tokens(text: str) -> int:
+    return count_tokens(text)
+
+
+def message_tokens(message: BaseMessage) -> int:
+    """Prompt tokens of one message: text, tool call arguments and images"""
+    content = message.content
+    if isinstance(content, str):
+        tokens = _text_tokens(content)
+    else:
+        tokens = 0
+        for part in content:
+            if isinstance(part, dict) and part.get('type') == 'image_url':
+                tokens += IMAGE_TOKENS
+            elif isinstance(part, dict):
+                tokens += _text_tokens(part.get('text', ''))
+            else:
+                tokens += _text_tokens(str(part))
+    if isinstance(message, AIMessage) and message.tool_calls:
+        tokens += sum(_text_tokens(json.dumps(call['args'], separators=(',', ':'))) for call in message.tool_calls)
+    return tokens + 4
+
+
+def compact_json(data: Any) -> str:
+    """JSON without indentation or spaces, for prompts"""
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+
+
+def minify_text(text: str) -> str:
+    """Minify fenced JSON blocks, or the whole text when it is JSON"""
+
+    def minify_block(match: re.Match) -> str:
+        try:
+            return f'```json\n{compact_json(json.loads(match.group(1)))}\n```'
+        except ValueError:
+            return match.group(0)
+
+    text = _JSON_BLOCK.sub(minify_block, text)
+    stripped = text.strip()
+    if stripped[:1] in '{[' and stripped[-1:] in '}]':
+        try:
+            return compact_json(json.loads(stripped))
+        except ValueError:
+            pass
+    return text
+
+
+class PayloadStore:
+    """Large action results stored once and referenced by handle"""
+
+    def __init__(self):
+        self._payloads: dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def put(self, text: str) -> str:
+        handle = 'p' + hashlib.sha1(text.encode()).hexdigest()[:8]
+        with self._lock:
+            self._payloads[handle] = text
+        return handle
+
+    def get(self, handle: str) -> Optional[str]:
+        return self._payloads.get(handle)
+
+    def __len__(self) -> int:
+        return len(self._payloads)
+
+
+def register_payload_actions(controller: Controller, payloads: PayloadStore, page_size: int = 6000):
+    """Add the read_payload action the compacted prompts point the agent to"""
+
+    @controller.action('Read a stored payload by its handle (from an earlier shortened action result), page by page')
+    def read_payload(handle: str, offset: int = 0):
+        text = payloads.get(handle)
+        if text is None:
+            return ActionResult(error=f'Unknown payload handle {handle}')
+        chunk = text[offset:offset + page_size]
+        more = f' (more from offset {offset + page_size})' if offset + page_size < len(text) else ''
+        # shown for the next step only, so reading a payload does not grow the history again
+        return ActionResult(extracted_content=f'Payload {handle}[{offset}:]{more}:\n{chunk}', include_in_memory=False)
+
+    return read_payload
+
+
+class BudgetedChatModel(ChatModelWrapper):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    payloads: PayloadStore
+    # Token budget for the whole request, the current browser state and its screenshot included
+    budget: int = 16000
+    # Action results larger than this are stored as payloads
+    payload_threshold: int = 1000
+    preview_chars: int = 300
+    # Most recent history messages that are never shortened or evicted
+    keep_recent: int = 6
+    # running totals over every compacted request
+    stats: dict[str, int] = Field(default_factory=lambda: {'steps': 0, 'tokens_before': 0, 'tokens_after': 0, 'saved': 0, 'evicted': 0})
+
+    @property
+    def _llm_type(self) -> str:
+        return f'budgeted-{self.inner._llm_type}'
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return self.call_model_sync(self.inner, self.compact(messages), stop=stop, **kwargs)
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        return await self.call_model(self.inner, self.compact(messages), stop=stop, **kwargs)
+
+    def compact(self, messages: list[BaseMessage]) -> list[BaseMessage]:
+        before = sum(message_tokens(m) for m in messages)
+        start = _history_start(messages)
+        # the last message is the current browser state
+        prefix, history, current = messages[:start], messages[start:-1], messages[-1:]
+        prefix = [_with_content(m, minify_text(m.content)) if isinstance(m.content, str) else m for m in prefix]
+        history = [self._store_large(m) for m in history]
+
+        total = sum(message_tokens(m) for m in prefix + history + current)
+        # oldest first: shorten action results, then evict whole steps
+        shortenable = len(history) - self.keep_recent
+        for i in range(max(shortenable, 0)):
+            if total <= self.budget:
+                break
+            shortened = self._shorten(history[i])
+            if shortened is not history[i]:
+                total -= message_tokens(history[i]) - message_tokens(shortened)
+                history[i] = shortened
+
+        evicted = 0
+        while total > self.budget and len(history) > self.keep_recent:
+            for message in _first_unit(history):
+                total -= message_tokens(message)
+                history.remove(message)
+                evicted += 1
+        if evicted:
+            history.insert(0, HumanMessage(content=f'[{evicted} earlier history messages omitted to stay within the context budget]'))
+            total += message_tokens(history[0])
+
+        after = total
+        for key, value in (('steps', 1), ('tokens_before', before), ('tokens_after', after), ('saved', before - after), ('evicted', evicted)):
+            self.stats[key] += value
+        if before != after:
+            logger.info(f'Context budget: {before} -> {after} tokens ({before - after} saved, {evicted} messages evicted)')
+        return prefix + history + current
+
+    def _store_large(self, message: BaseMessage) -> BaseMessage:
+        if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+            return message
+        prefix = next((p for p in RESULT_PREFIXES if message.content.startswith(p)), None)
+        if prefix is None:
+            return message
+        body = minify_text(message.content[len(prefix):])
+        if _text_tokens(body) <= self.payload_threshold:
+            return _with_content(message, prefix + body)
+        handle = self.payloads.put(body)
+        preview = body[:self.preview_chars].rstrip()
+        return _with_content(
+            message,
+            f'{prefix}{preview}… [payload {handle}: {_text_tokens(body)} tokens stored, use read_payload with handle "{handle}" to read it]',
+        )
+
+    def _shorten(self, message: BaseMessage) -> BaseMessage:
+        if not isinstance(message, HumanMessage) or not isinstance(message.content, str):
+            return message
+        if not message.content.startswith(RESULT_PREFIXES) or len(message.content) <= self.preview_chars // 2:
+            return message
+        return _with_content(message, message.content[:self.preview_chars // 2].rstrip() + '… [shortened]')
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.stats['saved']
+
+
+def _history_start(messages: list[BaseMessage]) -> int:
+    for i, message in enumerate(messages):
+        if isinstance(message.content, str) and message.content == HISTORY_MARKER:
+            return i + 1
+    # not a browser-use prompt: keep the system message and the first request intact
+    return min(2 if messages and isinstance(messages[0], SystemMessage) else 1, max(len(messages) - 1, 0))
+
+
+def _first_unit(history: list[BaseMessage]) -> list[BaseMessage]:
+    """Oldest message, together with the tool messages answering it when it is a tool call"""
+    unit = [history[0]]
+    if isinstance(history[0], AIMessage) and history[0].tool_calls:
+        for message in history[1:]:
+            if not isinstance(message, ToolMessage):
+                break
+            unit.append(message)
+    return unit
+
+
+def _with_content(message: BaseMessage, content: str) -> BaseMessage:
+    return message if content == message.content else message.model_copy(update={'content': content})
+
+
+def with_context_budget(
+    llm: BaseChatModel,
+    payloads: Optional[PayloadStore] = None,
+    budget: Optional[int] = None,
+) -> BaseChatModel:
+    """Wrap `llm` for one agent; AGENT_CONTEXT_BUDGET sets the token budget, 0 disables compaction"""
+    budget = budget if budget is not None else int(os.getenv('AGENT_CONTEXT_BUDGET', '16000'))
+    if budget <= 0:
+        return llm
+    return BudgetedChatModel(inner=llm, payloads=payloads or PayloadStore(), budget=budget)
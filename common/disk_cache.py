@@ -0,0 +1,132 @@
+"""
+Small persistent key/value cache on SQLite with size and age limits.
+
+Values are stored zlib-compressed. Entries older than `max_age` are dropped on
+read, and the least recently used entries are evicted once the total stored
+size exceeds `max_bytes`.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created REAL NOT NULL,
+    accessed REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+CREATE INDEX IF NOT EXISTS entries_created ON entries (created);
+"""
+
+
+class DiskCache:
+    def __init__(self, path: str | Path, max_bytes: int = 512 * 1024 * 1024, max_age: Optional[float] = None):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+    def get(self, key: str) -> Optional[bytes]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute('SELECT value, size, created FROM entries WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, size, created = row
+            if self.max_age is not None and now - created > self.max_age:
+                with self._conn:
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._size -= size
+                self.misses += 1
+                return None
+            with self._conn:
+                self._conn.execute('UPDATE entries SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return zlib.decompress(value)
+
+    def set(self, key: str, value: bytes):
+        compressed = zlib.compress(value)
+        now = time.time()
+        with self._lock:
+            previous = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)',
+                    (key, compressed, len(compressed), now, now),
+                )
+            self._size += len(compressed) - (previous[0] if previous else 0)
+            self._evict()
+
+    def delete(self, key: str):
+        with self._lock:
+            row = self._conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+            if row:
+                with self._conn:
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._size -= row[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return self._conn.execute('SELECT 1 FROM entries WHERE key = ?', (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self),
+            'bytes': self._size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _evict(self):
+        if self.max_age is not None:
+            with self._conn:
+                expired = self._conn.execute('DELETE FROM entries WHERE created < ?', (time.time() - self.max_age,)).rowcount
+            if expired:
+                self._size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+
+        evicted = 0
+        while self._size > self.max_bytes:
+            rows = self._conn.execute('SELECT key, size FROM entries ORDER BY accessed LIMIT 32').fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._size <= self.max_bytes:
+                    break
+                with self._conn:
+                    self._conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                self._size -= size
+                evicted += 1
+        if evicted:
+            logger.debug(f'Evicted {evicted} entries from {self.path}')
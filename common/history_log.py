@@ -0,0 +1,362 @@
+"""
+Bounded agent history that spills older steps to disk.
+
+browser-use keeps every step of a run (model output, action results, the
+page's tabs and interacted elements, the screenshot) in agent.state.history,
+so a site documentation run or a long sweep grows with every step. Attached
+to an agent, the history log keeps only the last `window` steps in memory and
+streams every step to an append-only, zlib-compressed log on disk, indexed in
+SQLite by run, step, URL and action:
+
+    history_log = HistoryLog.from_env()
+    run = history_log.attach(agent, label='document_site')
+    history = await agent.run()  # the last steps, enough for final_result()
+    for step in history_log.steps(run.id, action='click_element'):
+        ...
+    full = history_log.history(run.id, agent.AgentOutput)
+
+Steps are compressed and written on a background thread and read back one at
+a time. Each run has its own log file under AGENT_HISTORY_DIR (default
+.cache/history); whenever a run is attached, finished runs beyond the latest
+AGENT_HISTORY_RUNS (default 50) are pruned. AGENT_HISTORY_WINDOW (default 10) sets the in-memory window,
+AGENT_HISTORY=off disables the log.
+
+    python -m common.history_log runs
+    python -m common.history_log steps <run> --action go_to_url
+"""
+
+import argparse
+import functools
+import json
+import logging
+import os
+import re
+import secrets
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional, Type
+
+from browser_use import Agent
+from browser_use.agent.views import AgentHistory, AgentHistoryList, AgentOutput
+
+logger = logging.getLogger(__name__)
+
+# every frame in a run's log is its compressed length followed by the zlib data
+_FRAME = struct.Struct('>I')
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id TEXT PRIMARY KEY,
+    label TEXT NOT NULL,
+    started_at REAL NOT NULL,
+    steps INTEGER NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS steps (
+    run TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    url TEXT,
+    title TEXT,
+    actions TEXT NOT NULL,
+    error TEXT,
+    done INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (run, step)
+);
+CREATE INDEX IF NOT EXISTS steps_url ON steps (url);
+CREATE TABLE IF NOT EXISTS step_actions (
+    run TEXT NOT NULL,
+    step INTEGER NOT NULL,
+    action TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS step_actions_action ON step_actions (action, run);
+"""
+
+
+@dataclass
+class StepEntry:
+    """Index row of one spilled step, readable without decompressing it"""
+
+    run: str
+    step: int
+    url: Optional[str]
+    title: Optional[str]
+    actions: list[str]
+    error: Optional[str]
+    done: bool
+
+
+def _slug(label: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '-', label).strip('-').lower()[:40] or 'agent'
+
+
+def _entry(item: AgentHistory) -> tuple[Optional[str], Optional[str], list[str], Optional[str], bool]:
+    actions = []
+    if item.model_output is not None:
+        actions = [next(iter(a.model_dump(exclude_unset=True)), None) or 'unknown' for a in item.model_output.action]
+    error = next((r.error for r in item.result if r.error), None)
+    done = bool(item.result and item.result[-1].is_done)
+    return item.state.url, item.state.title, actions, error, done
+
+
+class SpilledRun:
+    """One agent's run: its steps beyond the window are only kept in the log"""
+
+    def __init__(self, log: 'HistoryLog', agent: Agent, run_id: str, window: int):
+        self.log = log
+        self.agent = agent
+        self.id = run_id
+        self.window = window
+        self.steps = 0
+        # items at the head of agent.state.history.history that are already logged
+        self._logged = 0
+        make_history_item, run = agent._make_history_item, agent.run
+
+        def spill(*args, **kwargs):
+            make_history_item(*args, **kwargs)
+            self.sync()
+
+        @functools.wraps(run)
+        async def run_and_sync(*args, **kwargs):
+            try:
+                return await run(*args, **kwargs)
+            finally:
+                # steps appended after the last history item (a macro replay cut off by max_steps)
+                self.sync()
+                self.log.finished(self.id)
+
+        agent._make_history_item, agent.run = spill, run_and_sync
+
+    def sync(self):
+        """Log the history items added since the last sync and trim the in-memory window"""
+        items = self.agent.state.history.history
+        # macros hand their replayed steps over by appending to the history directly
+        self._logged = min(self._logged, len(items))
+        for item in items[self._logged :]:
+            self.steps += 1
+            self.log.append(self.id, self.steps, item)
+        overflow = len(items) - self.window
+        if overflow > 0:
+            del items[:overflow]
+        self._logged = len(items)
+
+
+class HistoryLog:
+    def __init__(self, directory: str | Path, window: int = 10, max_runs: int = 50, screenshots: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.window = max(window, 1)
+        self.max_runs = max_runs
+        self.screenshots = screenshots
+        self.runs_attached = 0
+        self.steps_logged = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.directory / 'index.db', check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(_SCHEMA)
+        # one writer keeps every run's frames in step order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='history')
+        self._pending: set[Future] = set()
+        # runs of this process still going, never pruned
+        self._active: set[str] = set()
+        self._prune()
+
+    @classmethod
+    def from_env(cls) -> Optional['HistoryLog']:
+        if os.getenv('AGENT_HISTORY', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(
+            os.getenv('AGENT_HISTORY_DIR', '.cache/history'),
+            window=int(os.getenv('AGENT_HISTORY_WINDOW', '10')),
+            max_runs=int(os.getenv('AGENT_HISTORY_RUNS', '50')),
+        )
+
+    def attach(self, agent: Agent, label: str = 'agent', window: Optional[int] = None) -> SpilledRun:
+        """Bound `agent`'s in-memory history to the window and log every step of its run"""
+        run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{_slug(label)}-{secrets.token_hex(2)}"
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO runs (id, label, started_at) VALUES (?, ?, ?)', (run_id, label, time.time()))
+            self._active.add(run_id)
+        self.runs_attached += 1
+        # a long sweep attaches thousands of runs to one log; on the writer thread, after the queued steps
+        self._submit(self._prune)
+        return SpilledRun(self, agent, run_id, window or self.window)
+
+    def finished(self, run: str):
+        """`run` ended, it may be pruned once newer runs push it out"""
+        with self._lock:
+            self._active.discard(run)
+
+    def append(self, run: str, step: int, item: AgentHistory):
+        """Queue `item` for the log; it is serialized now, compressed and written on the writer thread"""
+        data = item.model_dump()
+        if not self.screenshots:
+            data['state']['screenshot'] = None
+        self._submit(self._write, run, step, data, _entry(item))
+
+    def _submit(self, func, *args):
+        future = self._executor.submit(func, *args)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        if future.exception() is not None:
+            logger.error(f'Writing to the history log failed: {future.exception()}')
+
+    def _write(self, run: str, step: int, data: dict, entry: tuple):
+        raw = json.dumps(data).encode()
+        compressed = zlib.compress(raw, 6)
+        url, title, actions, error, done = entry
+        with self._lock:
+            with open(self._path(run), 'ab') as f:
+                offset = f.tell() + _FRAME.size
+                f.write(_FRAME.pack(len(compressed)) + compressed)
+            with self._conn:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO steps (run, step, url, title, actions, error, done, offset, length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                    (run, step, url, title, json.dumps(actions), error, int(done), offset, len(compressed)),
+                )
+                self._conn.executemany('INSERT INTO step_actions (run, step, action) VALUES (?, ?, ?)', [(run, step, a) for a in actions])
+                self._conn.execute('UPDATE runs SET steps = steps + 1, size = size + ? WHERE id = ?', (_FRAME.size + len(compressed), run))
+            self.steps_logged += 1
+            self.bytes_in += len(raw)
+            self.bytes_out += len(compressed)
+
+    def _path(self, run: str) -> Path:
+        return self.directory / f'{run}.log'
+
+    def flush(self):
+        """Wait until every queued step is on disk"""
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending)
+
+    def _prune(self):
+        with self._lock:
+            old = [
+                row[0]
+                for row in self._conn.execute('SELECT id FROM runs ORDER BY started_at DESC LIMIT -1 OFFSET ?', (self.max_runs,))
+                if row[0] not in self._active
+            ]
+            if not old:
+                return
+            with self._conn:
+                for run in old:
+                    for table, column in (('steps', 'run'), ('step_actions', 'run'), ('runs', 'id')):
+                        self._conn.execute(f'DELETE FROM {table} WHERE {column} = ?', (run,))
+            for run in old:
+                self._path(run).unlink(missing_ok=True)
+        logger.debug(f'Pruned {len(old)} old runs from the history log')
+
+    # Reading -----------------------------------------------------------------
+
+    def runs(self) -> list[dict]:
+        self.flush()
+        with self._lock:
+            rows = self._conn.execute('SELECT id, label, started_at, steps, size FROM runs ORDER BY started_at DESC').fetchall()
+        return [dict(zip(('id', 'label', 'started_at', 'steps', 'size'), row)) for row in rows]
+
+    def index(self, run: str, url: Optional[str] = None, action: Optional[str] = None) -> list[StepEntry]:
+        """Index rows of `run`'s steps, optionally only those on `url` or running `action`"""
+        return [entry for entry, _, _ in self._rows(run, url, action)]
+
+    def _rows(self, run: str, url: Optional[str], action: Optional[str]) -> list[tuple[StepEntry, int, int]]:
+        self.flush()
+        query = 'SELECT step, url, title, actions, error, done, offset, length FROM steps WHERE run = ?'
+        args: list = [run]
+        if url is not None:
+            query += ' AND url = ?'
+            args.append(url)
+        if action is not None:
+            query += ' AND step IN (SELECT step FROM step_actions WHERE run = ? AND action = ?)'
+            args += [run, action]
+        with self._lock:
+            rows = self._conn.execute(query + ' ORDER BY step', args).fetchall()
+        return [
+            (StepEntry(run, step, step_url, title, json.loads(actions), error, bool(done)), offset, length)
+            for step, step_url, title, actions, error, done, offset, length in rows
+        ]
+
+    def steps(self, run: str, url: Optional[str] = None, action: Optional[str] = None) -> Iterator[dict]:
+        """Logged steps of `run` as AgentHistory dumps, decompressed one at a time"""
+        rows = self._rows(run, url, action)
+        if not rows:
+            return
+        with open(self._path(run), 'rb') as f:
+            for _, offset, length in rows:
+                f.seek(offset)
+                yield json.loads(zlib.decompress(f.read(length)))
+
+    def history(self, run: str, output_model: Type[AgentOutput]) -> AgentHistoryList:
+        """The whole run as an AgentHistoryList; `output_model` is the agent's AgentOutput, as for load_from_file"""
+        items = []
+        for data in self.steps(run):
+            if data['model_output']:
+                data['model_output'] = output_model.model_validate(data['model_output'])
+            items.append(AgentHistory.model_validate(data))
+        return AgentHistoryList(history=items)
+
+    def stats(self) -> dict:
+        return {
+            'runs': self.runs_attached,
+            'steps': self.steps_logged,
+            'pending': len(self._pending),
+            'bytes_in': self.bytes_in,
+            'bytes_out': self.bytes_out,
+            'ratio': round(self.bytes_out / self.bytes_in, 3) if self.bytes_in else 0.0,
+        }
+
+    def log_stats(self):
+        if self.steps_logged:
+            logger.info(f'History log: {json.dumps(self.stats())}')
+
+    def close(self):
+        self.flush()
+        self._executor.shutdown(wait=True)
+        with self._lock:
+            self._conn.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Inspect the step logs of past agent runs')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('runs', help='list logged runs')
+    steps = commands.add_parser('steps', help="list a run's steps")
+    steps.add_argument('run')
+    steps.add_argument('--url')
+    steps.add_argument('--action')
+    args = parser.parse_args(argv)
+
+    log = HistoryLog.from_env()
+    if log is None:
+        print('The history log is disabled (AGENT_HISTORY=off)')
+        return 1
+    try:
+        if args.command == 'runs':
+            for run in log.runs():
+                started = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(run['started_at']))
+                print(f"{run['id']:<50} {started}  {run['steps']:4d} steps  {run['size'] / 1024:8.1f} KB")
+        else:
+            for entry in log.index(args.run, args.url, args.action):
+                status = 'done' if entry.done else f'error: {entry.error}' if entry.error else ''
+                print(f"{entry.step:4d}  {', '.join(entry.actions) or '-':<40} {entry.url or ''}  {status}")
+    finally:
+        log.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,176 @@
+"""
+Record/replay cache in front of any LangChain chat model.
+
+Requests are keyed on the normalized messages, the model and its parameters,
+and the bound tools. Modes:
+
+    record       always call the model and (over)write the cache
+    replay       answer only from the cache, a miss raises LLMCacheMiss
+    passthrough  answer from the cache when possible, otherwise call and store
+
+Wrap a model with `with_llm_cache(ChatOpenAI(...))`; the mode and cache
+location come from LLM_CACHE_MODE / LLM_CACHE_DIR, and an unset mode leaves
+the model unwrapped.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import re
+from pathlib import Path
+from typing import Any, Literal, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.utils.function_calling import convert_to_openai_tool
+from pydantic import ConfigDict
+
+from common.disk_cache import DiskCache
+from common.llm_wrappers import TOOL_KWARGS_KWARG, TOOLS_KWARG, ChatModelWrapper
+
+logger = logging.getLogger(__name__)
+
+CacheMode = Literal['record', 'replay', 'passthrough']
+
+# Parts of browser-use prompts that change between otherwise identical requests
+_VOLATILE_PATTERNS = [
+    (re.compile(r'Current date and time: [\d\- :]+'), 'Current date and time: <now>'),
+]
+
+
+class LLMCacheMiss(LookupError):
+    pass
+
+
+class CachedChatModel(ChatModelWrapper):
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    response_cache: DiskCache
+    mode: CacheMode = 'passthrough'
+    # screenshots differ pixel by pixel between runs of the same page, so by
+    # default requests are keyed on their text only
+    key_images: bool = False
+
+    @property
+    def _llm_type(self) -> str:
+        return f'cached-{self.inner._llm_type}'
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self.cache_key(messages, stop, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = await self.call_model(self.inner, messages, stop=stop, **kwargs)
+        self.response_cache.set(key, _dump_result(result))
+        return result
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        key = self.cache_key(messages, stop, kwargs)
+        cached = self._lookup(key)
+        if cached is not None:
+            return cached
+        result = self.call_model_sync(self.inner, messages, stop=stop, **kwargs)
+        self.response_cache.set(key, _dump_result(result))
+        return result
+
+    def _lookup(self, key: str) -> Optional[ChatResult]:
+        if self.mode == 'record':
+            return None
+        cached = self.response_cache.get(key)
+        if cached is not None:
+            logger.debug(f'LLM cache hit {key[:12]}')
+            return _load_result(cached)
+        if self.mode == 'replay':
+            raise LLMCacheMiss(f'No recorded response for request {key[:12]} ({self.model_name})')
+        return None
+
+    def cache_key(self, messages: list[BaseMessage], stop: Optional[list[str]], kwargs: dict) -> str:
+        tool_kwargs = {k: v for k, v in kwargs.get(TOOL_KWARGS_KWARG, {}).items() if not k.startswith('ls_')}
+        payload = {
+            'llm': self.inner._llm_type,
+            'params': self.inner._identifying_params,
+            'messages': [self._normalize_message(message) for message in messages],
+            'tools': [convert_to_openai_tool(tool) for tool in kwargs.get(TOOLS_KWARG) or []],
+            'tool_kwargs': tool_kwargs,
+            'kwargs': {k: v for k, v in kwargs.items() if k not in (TOOLS_KWARG, TOOL_KWARGS_KWARG)},
+            'stop': stop,
+        }
+        encoded = json.dumps(payload, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+
+    def _normalize_message(self, message: BaseMessage) -> dict:
+        normalized: dict[str, Any] = {'type': message.type, 'content': self._normalize_content(message.content)}
+        tool_calls = getattr(message, 'tool_calls', None)
+        if tool_calls:
+            # ids are per-run counters, only the calls themselves matter
+            normalized['tool_calls'] = [{'name': call['name'], 'args': call['args']} for call in tool_calls]
+        return normalized
+
+    def _normalize_content(self, content: Any) -> Any:
+        if isinstance(content, str):
+            for pattern, replacement in _VOLATILE_PATTERNS:
+                content = pattern.sub(replacement, content)
+            return content.strip()
+        parts = []
+        for part in content:
+            if isinstance(part, dict) and part.get('type') == 'image_url':
+                if self.key_images:
+                    url = part['image_url']['url'] if isinstance(part['image_url'], dict) else part['image_url']
+                    parts.append({'image': hashlib.sha256(url.encode()).hexdigest()})
+            elif isinstance(part, dict) and part.get('type') == 'text':
+                parts.append(self._normalize_content(part['text']))
+            else:
+                parts.append(self._normalize_content(part) if isinstance(part, str) else part)
+        return parts
+
+
+def _dump_result(result: ChatResult) -> bytes:
+    messages = [message_to_dict(generation.message) for generation in result.generations]
+    return json.dumps({'messages': messages, 'llm_output': result.llm_output}, default=str).encode()
+
+
+def _load_result(data: bytes) -> ChatResult:
+    payload = json.loads(data)
+    generations = [ChatGeneration(message=message) for message in messages_from_dict(payload['messages'])]
+    return ChatResult(generations=generations, llm_output=payload.get('llm_output'))
+
+
+_caches: dict[Path, DiskCache] = {}
+
+
+def open_llm_cache(cache_dir: Optional[str | Path] = None) -> DiskCache:
+    """Shared on-disk cache, one per directory per process"""
+    path = Path(cache_dir or os.getenv('LLM_CACHE_DIR', '.cache/llm')) / 'responses.sqlite'
+    if path not in _caches:
+        max_mb = float(os.getenv('LLM_CACHE_MAX_MB', '512'))
+        max_age_days = os.getenv('LLM_CACHE_MAX_AGE_DAYS')
+        _caches[path] = DiskCache(
+            path,
+            max_bytes=int(max_mb * 1024 * 1024),
+            max_age=float(max_age_days) * 86400 if max_age_days else None,
+        )
+    return _caches[path]
+
+
+def with_llm_cache(llm: BaseChatModel, mode: Optional[str] = None, cache_dir: Optional[str | Path] = None) -> BaseChatModel:
+    """Wrap `llm` in the record/replay cache unless caching is turned off"""
+    mode = (mode or os.getenv('LLM_CACHE_MODE', 'off')).lower()
+    if mode in ('', 'off', 'none'):
+        return llm
+    if mode not in ('record', 'replay', 'passthrough'):
+        raise ValueError(f'Unknown LLM_CACHE_MODE {mode!r}, expected record, replay, passthrough or off')
+    return CachedChatModel(inner=llm, response_cache=open_llm_cache(cache_dir), mode=mode)
@@ -0,0 +1,84 @@
+"""
+Base class for chat models that wrap another chat model.
+
+Agents use the wrapper exactly like the model it wraps (including
+with_structured_output, which browser-use relies on). Tools bound to the
+wrapper are kept in their original form and bound on the wrapped model at call
+time, so wrappers can sit in front of any provider and can be stacked.
+"""
+
+from typing import Any, Optional, Sequence
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+TOOLS_KWARG = 'wrapped_tools'
+TOOL_KWARGS_KWARG = 'wrapped_tool_kwargs'
+
+
+class ChatModelWrapper(BaseChatModel):
+    inner: BaseChatModel
+
+    @property
+    def _llm_type(self) -> str:
+        return f'wrapped-{self.inner._llm_type}'
+
+    @property
+    def model_name(self) -> str:
+        # browser-use reads this for telemetry and to pick a tool calling method
+        return getattr(self.inner, 'model_name', None) or getattr(self.inner, 'model', None) or 'Unknown'
+
+    def bind_tools(self, tools: Sequence[Any], *, tool_choice: Optional[str] = None, **kwargs: Any):
+        tool_kwargs = dict(kwargs)
+        if tool_choice is not None:
+            tool_kwargs['tool_choice'] = tool_choice
+        return self.bind(**{TOOLS_KWARG: list(tools), TOOL_KWARGS_KWARG: tool_kwargs})
+
+    def _generate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return self.call_model_sync(self.inner, messages, stop=stop, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        run_manager=None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        return await self.call_model(self.inner, messages, stop=stop, **kwargs)
+
+    @staticmethod
+    async def call_model(
+        model: BaseChatModel,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        """Invoke `model`, binding tools captured by bind_tools in its own provider format"""
+        runnable, kwargs = _bind(model, kwargs)
+        message = await runnable.ainvoke(messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    @staticmethod
+    def call_model_sync(
+        model: BaseChatModel,
+        messages: list[BaseMessage],
+        stop: Optional[list[str]] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        runnable, kwargs = _bind(model, kwargs)
+        message = runnable.invoke(messages, stop=stop, **kwargs)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def _bind(model: BaseChatModel, kwargs: dict):
+    kwargs = dict(kwargs)
+    tools = kwargs.pop(TOOLS_KWARG, None)
+    tool_kwargs = kwargs.pop(TOOL_KWARGS_KWARG, {})
+    return (model.bind_tools(tools, **tool_kwargs) if tools else model), kwargs
@@ -0,0 +1,346 @@
+"""
+Record successful agent runs as macros and replay them without the LLM.
+
+A macro is the action sequence of a successful run, with every element the
+agent touched stored by tag, stable attributes, text and xpath rather than by
+its highlight index. The next run of the same workflow replays it directly:
+
+    library = MacroLibrary.from_env()
+    history = await run_with_macro(agent, library, 'offer_amazon', {'product': product})
+
+Before each recorded step the page is checked (same site, every element found
+again). At the first step that does not match, or whose action fails, the
+replayed steps are handed to the agent as its own history and the LLM carries
+on from the current page. A successful run that needed the LLM is recorded
+again, so the macro follows the site as it changes.
+
+Values passed in `params` are stored as {{name}} placeholders where they
+appear as whole words in action parameters (typed text, URLs), so a macro
+recorded for one product or Jira issue replays for another; element
+descriptors are kept literal. Macros live in
+AGENT_MACRO_DIR (default .cache/macros); AGENT_MACROS=off disables them.
+"""
+
+import json
+import logging
+import os
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+from urllib.parse import urlparse
+
+from browser_use import Agent
+from browser_use.agent.views import ActionResult, AgentBrain, AgentHistory, AgentHistoryList
+from browser_use.browser.views import BrowserStateHistory
+
+from common.model_router import READ_ACTIONS
+
+logger = logging.getLogger(__name__)
+
+# actions that only feed the LLM or end the run, never replayed
+SKIP_ACTIONS = READ_ACTIONS | {'done'}
+# attributes that identify an element across page loads
+STABLE_ATTRIBUTES = ('id', 'name', 'type', 'role', 'aria-label', 'placeholder', 'title', 'href', 'data-testid', 'for')
+# generated ids (react-123, :r5:, ember42) change on every load
+_VOLATILE_ID = re.compile(r'\d{3,}|^:r|^ember\d')
+_PLACEHOLDER = re.compile(r'\{\{(\w+)\}\}')
+# action parameters that locate an element, stored as recorded like the element descriptors
+LITERAL_PARAMS = {'index', 'xpath'}
+# failed replays of a complete macro before it is dropped and learned again
+MAX_FAILURES = 2
+
+
+@dataclass
+class MacroStep:
+    # {action_name: params}, as browser-use dumps an action
+    actions: list[dict]
+    # element each action targets (None for actions without an index)
+    elements: list[Optional[dict]]
+    url: str = ''
+    goal: str = ''
+    memory: str = ''
+
+
+@dataclass
+class Macro:
+    name: str
+    steps: list[MacroStep]
+    params: list[str] = field(default_factory=list)
+    runs: int = 0
+    failures: int = 0
+    updated: float = field(default_factory=time.time)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Macro':
+        data = dict(data)
+        data['steps'] = [MacroStep(**step) for step in data['steps']]
+        return cls(**data)
+
+
+class MacroLibrary:
+    """One JSON file per macro"""
+
+    def __init__(self, directory: str | Path):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional['MacroLibrary']:
+        if os.getenv('AGENT_MACROS', 'on').lower() in ('off', '0', 'false'):
+            return None
+        return cls(os.getenv('AGENT_MACRO_DIR', '.cache/macros'))
+
+    def _path(self, name: str) -> Path:
+        return self.directory / (re.sub(r'[^\w.-]+', '_', name) + '.json')
+
+    def get(self, name: str) -> Optional[Macro]:
+        path = self._path(name)
+        if not path.exists():
+            return None
+        try:
+            return Macro.from_dict(json.loads(path.read_text()))
+        except (ValueError, TypeError, KeyError) as e:
+            logger.warning(f'Ignoring unreadable macro {path}: {e}')
+            return None
+
+    def save(self, macro: Macro):
+        macro.updated = time.time()
+        path = self._path(macro.name)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_text(json.dumps(asdict(macro), indent=2))
+        tmp.replace(path)
+
+    def remove(self, name: str):
+        self._path(name).unlink(missing_ok=True)
+
+
+def _stable_attributes(attributes: dict[str, str]) -> dict[str, str]:
+    stable = {}
+    for key in STABLE_ATTRIBUTES:
+        value = attributes.get(key)
+        if not value or (key == 'id' and _VOLATILE_ID.search(value)):
+            continue
+        # tracking parameters change between visits of the same link
+        stable[key] = value.split('?')[0] if key == 'href' else value
+    return stable
+
+
+def _element_text(node) -> str:
+    return ' '.join(node.get_all_text_till_next_clickable_element().split())[:100]
+
+
+def describe_element(node) -> dict:
+    """What a macro stores about an element to find it again"""
+    return {
+        'tag': node.tag_name,
+        'xpath': node.xpath,
+        'attributes': _stable_attributes(node.attributes),
+        'text': _element_text(node),
+    }
+
+
+def find_element(element: dict, selector_map: dict) -> Optional[int]:
+    """Highlight index of the recorded element on the current page, None when it is gone or ambiguous"""
+    candidates = [node for node in selector_map.values() if node.tag_name == element['tag']]
+    wanted = element['attributes']
+    if wanted:
+        matches = [n for n in candidates if wanted.items() <= _stable_attributes(n.attributes).items()]
+    else:
+        matches = candidates
+    if not matches and element['text']:
+        # attributes changed, the visible text may not have
+        matches = [n for n in candidates if _element_text(n) == element['text']]
+    if len(matches) > 1 and element['text']:
+        matches = [n for n in matches if _element_text(n) == element['text']]
+    if len(matches) > 1:
+        matches = [n for n in matches if n.xpath == element['xpath']]
+    return matches[0].highlight_index if len(matches) == 1 else None
+
+
+def _templatize(action: dict, params: dict[str, str]) -> dict:
+    """Recorded action with whole-word occurrences of the run's values in its parameters replaced by {{name}}"""
+    # longest first, so a value containing another one is replaced whole
+    patterns = [
+        (name, re.compile(rf'(?<!\w){re.escape(text)}(?!\w)'))
+        for name, text in sorted(params.items(), key=lambda item: -len(item[1]))
+        if len(text) >= 3
+    ]
+
+    def replace(value: Any) -> Any:
+        if isinstance(value, str):
+            for name, pattern in patterns:
+                value = pattern.sub(lambda _: f'{{{{{name}}}}}', value)
+            return value
+        if isinstance(value, dict):
+            return {key: replace(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [replace(item) for item in value]
+        return value
+
+    return {
+        name: {key: value if key in LITERAL_PARAMS else replace(value) for key, value in args.items()} if isinstance(args, dict) else args
+        for name, args in action.items()
+    }
+
+
+def _fill(value: Any, params: dict[str, str]) -> Any:
+    if isinstance(value, str):
+        return _PLACEHOLDER.sub(lambda m: params[m.group(1)], value)
+    if isinstance(value, dict):
+        return {key: _fill(item, params) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, params) for item in value]
+    return value
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc
+
+
+class MacroRecorder:
+    """Collects the replayable steps of the agent's LLM-driven steps as they happen"""
+
+    def __init__(self, agent: Agent, params: dict[str, str]):
+        self.params = params
+        self.steps: list[MacroStep] = []
+        make_history_item = agent._make_history_item
+
+        def record(model_output, state, result, metadata=None):
+            make_history_item(model_output, state, result, metadata)
+            if model_output is not None:
+                self._record(model_output, state, result)
+
+        agent._make_history_item = record
+
+    def _record(self, model_output, state, result: list[ActionResult]):
+        if any(r.error for r in result):
+            return
+        actions, elements = [], []
+        # multi_act stops early when the page changes, later actions never ran
+        executed = [r for r in result if not (r.extracted_content or '').startswith('Something new appeared')]
+        for action in model_output.action[: len(executed)]:
+            dumped = action.model_dump(exclude_unset=True)
+            if not dumped or next(iter(dumped)) in SKIP_ACTIONS:
+                continue
+            index = action.get_index()
+            node = state.selector_map.get(index) if index is not None else None
+            if index is not None and node is None:
+                return
+            actions.append(_templatize(dumped, self.params))
+            # element text, attributes and xpath stay literal, a value inside them is not a parameter
+            elements.append(describe_element(node) if node else None)
+        if actions:
+            brain = model_output.current_state
+            self.steps.append(MacroStep(actions, elements, state.url, brain.next_goal, brain.memory))
+
+
+async def replay_macro(agent: Agent, macro: Macro, params: dict[str, str]) -> tuple[int, Optional[str]]:
+    """
+    Replay the macro's steps on the agent's browser. Returns how many steps
+    ran and why replay stopped (None when the whole macro ran).
+    """
+    if agent.initial_actions:
+        agent.state.last_result = await agent.multi_act(agent.initial_actions, check_for_new_elements=False)
+        agent.initial_actions = None
+
+    for number, step in enumerate(macro.steps):
+        state = await agent.browser_context.get_state()
+        if _host(step.url) and _host(state.url) != _host(step.url):
+            return number, f'expected a page on {_host(step.url)}, got {state.url}'
+
+        actions, results = [], []
+        for i, (recorded, element) in enumerate(zip(step.actions, step.elements)):
+            try:
+                action = agent.ActionModel.model_validate(_fill(recorded, params))
+            except KeyError as e:
+                return number, f'no value for parameter {e}'
+            if element is not None:
+                if i > 0:
+                    state = await agent.browser_context.get_state()
+                index = find_element(element, state.selector_map)
+                if index is None:
+                    return number, f"recorded <{element['tag']}> {element['text'] or element['attributes']} is not on the page"
+                action.set_index(index)
+            result = await agent.multi_act([action], check_for_new_elements=False)
+            actions.append(action)
+            results.extend(result)
+            if any(r.error for r in result):
+                _add_step(agent, step, actions, results, state)
+                return number, f'replayed action failed: {result[-1].error}'
+        _add_step(agent, step, actions, results, state)
+        logger.info(f'Macro {macro.name}: replayed step {number + 1}/{len(macro.steps)} ({step.goal})')
+    return len(macro.steps), None
+
+
+def _add_step(agent: Agent, step: MacroStep, actions: list, results: list[ActionResult], state):
+    """Add a replayed step to the agent's messages and history as if the LLM had chosen it"""
+    brain = AgentBrain(evaluation_previous_goal='Success - replayed from a recorded run', memory=step.memory, next_goal=step.goal)
+    output = agent.AgentOutput(current_state=brain, action=actions)
+    agent._message_manager.add_model_output(output)
+    agent.state.last_result = results
+    agent.state.n_steps += 1
+    state_history = BrowserStateHistory(
+        url=state.url,
+        title=state.title,
+        tabs=state.tabs,
+        interacted_element=AgentHistory.get_interacted_element(output, state.selector_map),
+    )
+    agent.state.history.history.append(AgentHistory(model_output=output, result=results, state=state_history))
+
+
+async def run_with_macro(
+    agent: Agent,
+    library: Optional[MacroLibrary],
+    name: str,
+    params: Optional[dict[str, str]] = None,
+    max_steps: int = 100,
+) -> AgentHistoryList:
+    """
+    Run the agent, replaying the macro `name` first when there is one, and
+    record the run as the macro when it succeeds. Without a library this is
+    just `agent.run(max_steps)`.
+    """
+    if library is None:
+        return await agent.run(max_steps=max_steps)
+    params = {key: str(value) for key, value in (params or {}).items()}
+    macro = library.get(name)
+    if macro is not None and set(macro.params) - set(params):
+        logger.info(f'Macro {name} needs parameters {sorted(set(macro.params) - set(params))}, running with the LLM')
+        macro = None
+
+    replayed, diverged = 0, None
+    if macro is not None:
+        start = time.perf_counter()
+        replayed, diverged = await replay_macro(agent, macro, params)
+        elapsed = time.perf_counter() - start
+        if diverged:
+            logger.info(f'Macro {name}: diverged at step {replayed + 1} after {elapsed:.1f}s ({diverged}), handing over to the LLM')
+            message = f'Replayed {replayed} recorded steps, then the page differed from the recording: {diverged}. Continue the task from the current page.'
+        else:
+            logger.info(f'Macro {name}: replayed all {replayed} steps in {elapsed:.1f}s')
+            message = f'Replayed all {replayed} recorded steps of this workflow. Check the current page and finish the task.'
+        agent.state.last_result = [*(agent.state.last_result or []), ActionResult(error=message if diverged else None, extracted_content=None if diverged else message, include_in_memory=True)]
+
+    recorder = MacroRecorder(agent, params)
+    history = await agent.run(max_steps=max(max_steps - replayed, 1))
+
+    if history.is_successful():
+        if macro is None or diverged:
+            steps = (macro.steps[:replayed] if macro else []) + recorder.steps
+            if steps:
+                library.save(Macro(name, steps, params=sorted(params), runs=macro.runs if macro else 0))
+                logger.info(f'Macro {name}: recorded {len(steps)} steps')
+        else:
+            macro.runs += 1
+            macro.failures = 0
+            library.save(macro)
+    elif macro is not None and not diverged:
+        macro.failures += 1
+        if macro.failures >= MAX_FAILURES:
+            logger.info(f'Macro {name}: failed {macro.failures} times after a full replay, dropping it')
+            library.remove(name)
+        else:
+            library.save(macro)
+    return history
@@ -0,0 +1,287 @@
+"""
+Latency-aware router between a fast and a strong chat model.
+
+Every agent step is classified from the prompt browser-use sends:
+
+    plan     first step of a task, and every `replan_every` steps
+    recover  the last action failed (an "Action error" in the current state)
+    compare  the last step read data to reason about (extract_content, read_*)
+    finish   browser-use asks for the final `done` answer
+    navigate anything else: clicks, typing known data, scrolling, going to URLs
+
+plan / recover / compare / finish go to the strong model, navigate to the fast
+one. Each call has a per-model timeout; when a call runs past the model's
+recent p95 latency a hedged request goes to the other model and the first
+answer wins, and an error or timeout falls back to the other model. The last
+`decision_window` decisions are kept in `decisions`; `stats()` counts every
+step of the router's lifetime.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+from collections import Counter, deque
+from typing import Any, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatResult
+from pydantic import ConfigDict, PrivateAttr
+
+from common.context_budget import HISTORY_MARKER
+from common.llm_wrappers import ChatModelWrapper
+
+logger = logging.getLogger(__name__)
+
+STRONG_REASONS = ('plan', 'recover', 'compare', 'finish')
+# actions whose results the next step has to reason about
+READ_ACTIONS = frozenset({'extract_content', 'read_jobs', 'read_cv', 'read_payload', 'rank_jobs', 'extract_product'})
+
+_ACTION_ERROR = re.compile(r'Action error \d+/\d+')
+_LAST_STEP = 'Now comes your last step'
+
+
+def _text(message: BaseMessage) -> str:
+    if isinstance(message.content, str):
+        return message.content
+    return ' '.join(part.get('text', '') for part in message.content if isinstance(part, dict))
+
+
+def _last_actions(messages: list[BaseMessage]) -> list[str]:
+    """Action names of the previous step, from browser-use's AgentOutput tool call"""
+    for message in reversed(messages):
+        if isinstance(message, AIMessage) and message.tool_calls:
+            actions = message.tool_calls[0]['args'].get('action', [])
+            return [name for action in actions if isinstance(action, dict) for name in action]
+    return []
+
+
+def classify_step(messages: list[BaseMessage], replan_every: int = 0, read_actions: frozenset = READ_ACTIONS) -> str:
+    """Reason for the step this prompt asks for, one of STRONG_REASONS or 'navigate'"""
+    marker = next((i for i, m in enumerate(messages) if isinstance(m, HumanMessage) and m.content == HISTORY_MARKER), None)
+    if marker is None:
+        # not an agent step (planner, page extraction, summaries): treat as reasoning
+        return 'plan'
+    steps = sum(1 for m in messages[marker + 1:] if isinstance(m, AIMessage) and m.tool_calls)
+    if steps == 0 or (replan_every and steps % replan_every == 0):
+        return 'plan'
+    state = _text(messages[-1])
+    if any(_LAST_STEP in _text(m) for m in messages[-2:]):
+        return 'finish'
+    if _ACTION_ERROR.search(state):
+        return 'recover'
+    if read_actions.intersection(_last_actions(messages)):
+        return 'compare'
+    return 'navigate'
+
+
+class _Latency:
+    def __init__(self, window: int):
+        self.samples: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+
+    def p95(self, min_samples: int) -> Optional[float]:
+        if len(self.samples) < min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[int(round(0.95 * (len(ordered) - 1)))]
+
+
+class RoutedChatModel(ChatModelWrapper):
+    """`inner` is the strong model; browser-use sees its name and tool calling method"""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    fast: BaseChatModel
+    # seconds before a call is abandoned and the other model takes over
+    fast_timeout: float = 30.0
+    strong_timeout: float = 90.0
+    # hedge once a call runs past the model's p95, after this many samples
+    hedge: bool = True
+    hedge_min_samples: int = 5
+    latency_window: int = 50
+    # force a strong planning step every N steps, 0 disables
+    replan_every: int = 0
+    # recent decisions kept for inspection; a long sweep routes thousands of steps
+    decision_window: int = 200
+
+    _latency: dict[str, _Latency] = PrivateAttr(default_factory=dict)
+    _recent: Optional[deque] = PrivateAttr(default=None)
+    _counts: Counter = PrivateAttr(default_factory=Counter)
+    _reasons: Counter = PrivateAttr(default_factory=Counter)
+    _answered_by: Counter = PrivateAttr(default_factory=Counter)
+    _latency_total: float = PrivateAttr(default=0.0)
+
+    @property
+    def _llm_type(self) -> str:
+        return f'routed-{self.inner._llm_type}'
+
+    def route(self, messages: list[BaseMessage]) -> tuple[str, str]:
+        reason = classify_step(messages, self.replan_every)
+        return ('strong' if reason in STRONG_REASONS else 'fast'), reason
+
+    def _model(self, tier: str) -> BaseChatModel:
+        return self.inner if tier == 'strong' else self.fast
+
+    def _timeout(self, tier: str) -> float:
+        return self.strong_timeout if tier == 'strong' else self.fast_timeout
+
+    @property
+    def decisions(self) -> list[dict]:
+        """The last `decision_window` routing decisions, oldest first"""
+        return list(self._recent or ())
+
+    def _decide(self, tier: str, reason: str) -> dict:
+        self._counts['steps'] += 1
+        return {'step': self._counts['steps'], 'reason': reason, 'routed_to': tier, 'hedged': False, 'fallback': False}
+
+    def _record(self, decision: dict):
+        if self._recent is None:
+            self._recent = deque(maxlen=self.decision_window)
+        self._recent.append(decision)
+        self._reasons[decision['reason']] += 1
+        self._counts['hedged'] += decision['hedged']
+        self._counts['fallbacks'] += decision['fallback']
+        if 'latency' in decision:
+            self._answered_by[decision['answered_by']] += 1
+            self._latency_total += decision['latency']
+
+    def _stats_for(self, tier: str) -> _Latency:
+        if tier not in self._latency:
+            self._latency[tier] = _Latency(self.latency_window)
+        return self._latency[tier]
+
+    async def _call(self, tier: str, messages, stop, kwargs) -> tuple[str, ChatResult, float]:
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(self.call_model(self._model(tier), messages, stop=stop, **kwargs), self._timeout(tier))
+        except asyncio.TimeoutError:
+            self._stats_for(tier).timeouts += 1
+            raise
+        except Exception:
+            self._stats_for(tier).errors += 1
+            raise
+        elapsed = time.perf_counter() - start
+        self._stats_for(tier).samples.append(elapsed)
+        self._stats_for(tier).calls += 1
+        return tier, result, elapsed
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tier, reason = self.route(messages)
+        decision = self._decide(tier, reason)
+        start = time.perf_counter()
+        try:
+            answered_by, result = await self._race(tier, decision, messages, stop, kwargs)
+            decision.update(answered_by=answered_by, latency=time.perf_counter() - start)
+            return result
+        finally:
+            self._record(decision)
+
+    async def _race(self, tier: str, decision: dict, messages, stop, kwargs) -> tuple[str, ChatResult]:
+        """Answer from `tier`, hedged with and falling back to the other model"""
+        other = 'fast' if tier == 'strong' else 'strong'
+        tiers = {asyncio.ensure_future(self._call(tier, messages, stop, kwargs)): tier}
+        done, pending = set(), set(tiers)
+        error: Optional[BaseException] = None
+        try:
+            hedge_after = self._stats_for(tier).p95(self.hedge_min_samples) if self.hedge else None
+            if hedge_after is not None:
+                done, pending = await asyncio.wait(pending, timeout=hedge_after)
+                if not done:
+                    decision['hedged'] = True
+                    hedged = asyncio.ensure_future(self._call(other, messages, stop, kwargs))
+                    tiers[hedged] = other
+                    pending.add(hedged)
+            while True:
+                for task in done:
+                    if task.exception() is None:
+                        answered_by, result, _ = task.result()
+                        return answered_by, result
+                    error = task.exception()
+                    logger.warning(f"{tiers[task]} model failed ({decision['reason']} step): {error!r}")
+                if not pending:
+                    break
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if decision['hedged']:
+            # both models were tried
+            raise error
+        decision['fallback'] = True
+        answered_by, result, _ = await self._call(other, messages, stop, kwargs)
+        return answered_by, result
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        # sync calls (raw tool calling mode) get routing and fallback, without hedging or timeouts
+        tier, reason = self.route(messages)
+        decision = self._decide(tier, reason)
+        start = time.perf_counter()
+        try:
+            try:
+                result = self.call_model_sync(self._model(tier), messages, stop=stop, **kwargs)
+            except Exception as e:
+                logger.warning(f'{tier} model failed ({reason} step): {e!r}')
+                tier = 'fast' if tier == 'strong' else 'strong'
+                decision['fallback'] = True
+                result = self.call_model_sync(self._model(tier), messages, stop=stop, **kwargs)
+            decision.update(answered_by=tier, latency=time.perf_counter() - start)
+            return result
+        finally:
+            self._record(decision)
+
+    def stats(self) -> dict:
+        """Routing counts and latency per model"""
+        answered = sum(self._answered_by.values())
+        summary = {
+            'steps': self._counts['steps'],
+            'reasons': dict(self._reasons),
+            'answered_by': dict(self._answered_by),
+            'hedged': self._counts['hedged'],
+            'fallbacks': self._counts['fallbacks'],
+            'mean_step_latency_s': self._latency_total / answered if answered else None,
+        }
+        for tier in ('fast', 'strong'):
+            latency = self._stats_for(tier)
+            samples = sorted(latency.samples)
+            summary[tier] = {
+                'model': getattr(self._model(tier), 'model_name', None) or getattr(self._model(tier), 'model', None),
+                'calls': latency.calls,
+                'p50_s': samples[len(samples) // 2] if samples else None,
+                'p95_s': latency.p95(1),
+                'errors': latency.errors,
+                'timeouts': latency.timeouts,
+            }
+        return summary
+
+    def log_stats(self):
+        logger.info(f'Model router: {json.dumps(self.stats(), default=str)}')
+
+
+def with_model_router(strong: BaseChatModel, fast: Optional[BaseChatModel] = None, **options: Any) -> BaseChatModel:
+    """
+    Route between `strong` and a fast model. Without `fast`, AGENT_FAST_MODEL
+    (a Gemini model name, default gemini-2.0-flash-exp) is used when
+    GEMINI_API_KEY is set; otherwise `strong` is returned unchanged.
+    """
+    if fast is None:
+        if os.getenv('AGENT_MODEL_ROUTER', 'on').lower() in ('off', '0', 'false') or not os.getenv('GEMINI_API_KEY'):
+            return strong
+        from langchain_google_genai import ChatGoogleGenerativeAI
+        from pydantic import SecretStr
+
+        from common.llm_cache import with_llm_cache
+
+        fast = with_llm_cache(
+            ChatGoogleGenerativeAI(
+                model=os.getenv('AGENT_FAST_MODEL', 'gemini-2.0-flash-exp'),
+                api_key=SecretStr(os.getenv('GEMINI_API_KEY')),
+            )
+        )
+    return RoutedChatModel(inner=strong, fast=fast, **options)
@@ -0,0 +1,44 @@
+"""
+Per-domain request pacing for crawlers and monitors.
+
+Requests to the same domain are spaced by a minimum interval plus random
+jitter; different domains never wait on each other.
+"""
+
+import asyncio
+import random
+import time
+from typing import Optional
+from urllib.parse import urlsplit
+
+
+def domain_of(url: str) -> str:
+    return (urlsplit(url).hostname or '').lower()
+
+
+class DomainRateLimiter:
+    def __init__(self, min_interval: float = 1.0, jitter: float = 0.5, per_domain: Optional[dict[str, float]] = None):
+        self.min_interval = min_interval
+        self.jitter = jitter
+        # interval overrides for specific domains, e.g. {'www.amazon.in': 5.0}
+        self.per_domain = per_domain or {}
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._next_allowed: dict[str, float] = {}
+
+    def interval(self, domain: str) -> float:
+        return self.per_domain.get(domain, self.min_interval)
+
+    async def wait(self, url: str):
+        """Sleep until `url`'s domain may be hit again and reserve that slot"""
+        domain = domain_of(url)
+        lock = self._locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            delay = self._next_allowed.get(domain, 0.0) - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_allowed[domain] = time.monotonic() + self.interval(domain) + random.uniform(0, self.jitter)
+
+    def penalize(self, url: str, seconds: float):
+        """Push the next request to `url`'s domain back, e.g. after a 429"""
+        domain = domain_of(url)
+        self._next_allowed[domain] = max(self._next_allowed.get(domain, 0.0), time.monotonic() + seconds)
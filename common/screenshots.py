@@ -0,0 +1,171 @@
+"""
+Asynchronous screenshot sink for agent runs.
+
+The agent already captures a screenshot of every step for the model; the
+sink takes those frames from the step callback and hands them to a small
+thread pool, so the event loop never waits on decoding, hashing, encoding or
+disk writes. Frames that are perceptually identical to a recent one (dHash
+within a few bits) are not written again. Kept frames are stored as
+compressed WebP or JPEG. A JSONL manifest maps every URL and step to the
+file that shows it.
+"""
+
+import base64
+import hashlib
+import io
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {'webp': ('WEBP', 'webp'), 'jpeg': ('JPEG', 'jpg'), 'jpg': ('JPEG', 'jpg')}
+
+
+def dhash(image: Image.Image, size: int = 8) -> int:
+    """64-bit difference hash: robust to re-encoding, sensitive to layout changes"""
+    pixels = image.convert('L').resize((size + 1, size), Image.Resampling.LANCZOS).tobytes()
+    bits = 0
+    for row in range(size):
+        for col in range(size):
+            left = pixels[row * (size + 1) + col]
+            right = pixels[row * (size + 1) + col + 1]
+            bits = (bits << 1) | (left > right)
+    return bits
+
+
+def _slug(url: str, limit: int = 60) -> str:
+    slug = re.sub(r'^https?://', '', url or 'blank')
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', slug).strip('-').lower()
+    return slug[:limit] or 'page'
+
+
+class ScreenshotSink:
+    def __init__(
+        self,
+        output_dir: str | Path,
+        format: str = 'webp',
+        quality: int = 70,
+        max_width: Optional[int] = 1280,
+        dedupe_distance: int = 4,
+        recent: int = 32,
+        workers: int = 2,
+        max_pending: int = 64,
+    ):
+        if format.lower() not in _FORMATS:
+            raise ValueError(f'Unsupported screenshot format {format!r}, use webp or jpeg')
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.pil_format, self.extension = _FORMATS[format.lower()]
+        self.quality = quality
+        self.max_width = max_width
+        # frames whose hash differs from a recent frame in at most this many bits are skipped
+        self.dedupe_distance = dedupe_distance
+        self.max_pending = max_pending
+        self.manifest_path = self.output_dir / 'manifest.jsonl'
+        self._recent: deque[tuple[int, str]] = deque(maxlen=recent)
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='screenshots')
+        self.stats = {'submitted': 0, 'saved': 0, 'duplicates': 0, 'dropped': 0, 'failed': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def submit(self, screenshot: bytes | str, url: str, step: int, label: str = '') -> Optional[Future]:
+        """Queue a PNG frame (raw or base64) without blocking; dropped when the queue is full"""
+        with self._lock:
+            self.stats['submitted'] += 1
+            if self._pending >= self.max_pending:
+                self.stats['dropped'] += 1
+                return None
+            self._pending += 1
+        future = self._executor.submit(self._process, screenshot, url, step, label)
+        future.add_done_callback(self._done)
+        return future
+
+    def step_callback(self, label: str = ''):
+        """Callback for Agent(register_new_step_callback=...); `label` tells concurrent agents apart"""
+
+        async def on_step(state, model_output, step: int):
+            if state.screenshot:
+                self.submit(state.screenshot, state.url, step, label)
+
+        return on_step
+
+    def close(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+        if self.stats['bytes_in']:
+            logger.info(
+                f"Screenshots: {self.stats['saved']} saved, {self.stats['duplicates']} duplicates skipped, "
+                f"{self.stats['bytes_out'] / 2**20:.1f} MB written for {self.stats['bytes_in'] / 2**20:.1f} MB of PNG"
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _done(self, future: Future):
+        failed = future.exception() is not None
+        with self._lock:
+            self._pending -= 1
+            if failed:
+                self.stats['failed'] += 1
+        if failed:
+            logger.warning(f'Failed to store screenshot: {future.exception()}')
+
+    def _process(self, screenshot: bytes | str, url: str, step: int, label: str):
+        png = base64.b64decode(screenshot) if isinstance(screenshot, str) else screenshot
+        image = Image.open(io.BytesIO(png))
+        image.load()
+        frame_hash = dhash(image)
+
+        with self._lock:
+            self.stats['bytes_in'] += len(png)
+            duplicate_of = next(
+                (file for seen, file in self._recent if bin(seen ^ frame_hash).count('1') <= self.dedupe_distance),
+                None,
+            )
+            if duplicate_of is None:
+                name = f"{label + '_' if label else ''}{step:04d}_{_slug(url)}_{hashlib.sha1(png).hexdigest()[:6]}.{self.extension}"
+                # claim the hash before encoding so a concurrent near-identical frame is skipped
+                self._recent.append((frame_hash, name))
+
+        if duplicate_of is not None:
+            with self._lock:
+                self.stats['duplicates'] += 1
+            self._write_manifest(url, step, label, duplicate_of, frame_hash, duplicate=True)
+            return
+
+        if self.max_width and image.width > self.max_width:
+            image = image.resize((self.max_width, round(image.height * self.max_width / image.width)), Image.Resampling.LANCZOS)
+        if self.pil_format == 'JPEG' and image.mode != 'RGB':
+            image = image.convert('RGB')
+        options = {'method': 4} if self.pil_format == 'WEBP' else {'optimize': True}
+        buffer = io.BytesIO()
+        image.save(buffer, self.pil_format, quality=self.quality, **options)
+        (self.output_dir / name).write_bytes(buffer.getvalue())
+        with self._lock:
+            self.stats['saved'] += 1
+            self.stats['bytes_out'] += buffer.tell()
+        self._write_manifest(url, step, label, name, frame_hash, duplicate=False)
+
+    def _write_manifest(self, url: str, step: int, label: str, file: str, frame_hash: int, duplicate: bool):
+        entry = {
+            'url': url,
+            'step': step,
+            'agent': label or None,
+            'file': file,
+            'duplicate': duplicate,
+            'dhash': f'{frame_hash:016x}',
+            'time': time.time(),
+        }
+        with self._lock, open(self.manifest_path, 'a') as f:
+            f.write(json.dumps(entry) + '\n')
@@ -0,0 +1,276 @@
+"""
+Encrypted per-site, per-account cache of browser storage state.
+
+After a run that got past the login (or the consent dialogs), the context's
+cookies and localStorage are saved with Fernet encryption. New contexts for
+the same site and account start with that state restored, so the agent lands
+on pages already signed in:
+
+    sessions = SessionStore.from_env()
+    async with sessions.attach(context, 'knowledge-gain-ai.atlassian.net', account) as session:
+        history = await agent.run()
+        if history.is_successful():
+            await session.save()
+
+While a restored or saved session is attached it is re-saved in the
+background, so rotated tokens are kept. On exit it is saved once more only
+when the caller confirmed it with `session.save()` and the block did not raise. States older than
+AGENT_SESSION_MAX_AGE_HOURS (default 168) and expired cookies are dropped on
+load. The key comes from AGENT_SESSION_KEY (a Fernet key); without it one is
+generated next to the states with owner-only permissions.
+
+Sign in by hand once to seed a site:
+
+    python -m common.session_store login https://knowledge-gain-ai.atlassian.net --account you@example.com
+    python -m common.session_store list
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import time
+from contextlib import asynccontextmanager, nullcontext
+from pathlib import Path
+from typing import AsyncIterator, Optional
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCOUNT = 'default'
+
+# sets saved localStorage entries on the first load of their origin, without clobbering newer values
+_LOCAL_STORAGE_JS = """(origins => {
+    const items = origins[location.origin];
+    if (!items) return;
+    for (const [name, value] of items) {
+        if (localStorage.getItem(name) === null) localStorage.setItem(name, value);
+    }
+})(%s)"""
+
+
+def site_of(url: str) -> str:
+    """Host a URL's session is stored under"""
+    return (urlparse(url).netloc or url).lower()
+
+
+class SessionStore:
+    def __init__(self, directory: str | Path, key: Optional[bytes] = None, max_age_hours: float = 168):
+        try:
+            from cryptography.fernet import Fernet
+        except ImportError:
+            raise RuntimeError('The session store needs cryptography: pip install cryptography') from None
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age_hours * 3600
+        self._fernet = Fernet(key or self._local_key())
+
+    @classmethod
+    def from_env(cls) -> Optional['SessionStore']:
+        if os.getenv('AGENT_SESSIONS', 'on').lower() in ('off', '0', 'false'):
+            return None
+        key = os.getenv('AGENT_SESSION_KEY')
+        return cls(
+            os.getenv('AGENT_SESSION_DIR', '.cache/sessions'),
+            key=key.encode() if key else None,
+            max_age_hours=float(os.getenv('AGENT_SESSION_MAX_AGE_HOURS', '168')),
+        )
+
+    def _local_key(self) -> bytes:
+        from cryptography.fernet import Fernet
+
+        path = self.directory / '.key'
+        if not path.exists():
+            logger.warning(f'AGENT_SESSION_KEY is not set, generating a key in {path}')
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(Fernet.generate_key())
+        return path.read_bytes().strip()
+
+    def _path(self, site: str, account: str) -> Path:
+        # account names (often emails) are not written to disk in the clear
+        digest = hashlib.sha256(account.encode()).hexdigest()[:16]
+        return self.directory / (re.sub(r'[^\w.-]+', '_', site) + f'__{digest}.session')
+
+    def save(self, site: str, account: str, storage_state: dict):
+        record = {'site': site, 'account': account, 'saved_at': time.time(), 'storage_state': storage_state}
+        path = self._path(site, account)
+        tmp = path.with_name(path.name + '.tmp')
+        tmp.write_bytes(self._fernet.encrypt(json.dumps(record).encode()))
+        tmp.replace(path)
+        logger.debug(f"Saved session for {site} ({len(storage_state.get('cookies', []))} cookies)")
+
+    def _read(self, path: Path) -> Optional[dict]:
+        from cryptography.fernet import InvalidToken
+
+        try:
+            return json.loads(self._fernet.decrypt(path.read_bytes()))
+        except (InvalidToken, ValueError) as e:
+            logger.warning(f'Ignoring unreadable session {path.name}: {type(e).__name__}')
+            return None
+
+    def load(self, site: str, account: str = DEFAULT_ACCOUNT) -> Optional[dict]:
+        """Storage state for the site and account without expired cookies, None when there is none or it expired"""
+        path = self._path(site, account)
+        if not path.exists():
+            return None
+        record = self._read(path)
+        if record is None:
+            return None
+        now = time.time()
+        if now - record['saved_at'] > self.max_age:
+            logger.info(f'Session for {site} is older than {self.max_age / 3600:g}h, dropping it')
+            path.unlink(missing_ok=True)
+            return None
+        state = record['storage_state']
+        cookies = [c for c in state.get('cookies', []) if c.get('expires', -1) <= 0 or c['expires'] > now]
+        if state.get('cookies') and not cookies:
+            logger.info(f'All cookies of the {site} session expired, dropping it')
+            path.unlink(missing_ok=True)
+            return None
+        return {**state, 'cookies': cookies}
+
+    def remove(self, site: str, account: str = DEFAULT_ACCOUNT):
+        self._path(site, account).unlink(missing_ok=True)
+
+    def sessions(self) -> list[dict]:
+        """Site, account, age and cookie count of every stored session"""
+        entries = []
+        for path in sorted(self.directory.glob('*.session')):
+            record = self._read(path)
+            if record is None:
+                continue
+            state = record['storage_state']
+            entries.append({
+                'site': record['site'],
+                'account': record['account'],
+                'age_hours': (time.time() - record['saved_at']) / 3600,
+                'cookies': len(state.get('cookies', [])),
+                'origins': len(state.get('origins', [])),
+            })
+        return entries
+
+    async def restore(self, context, site: str, account: str = DEFAULT_ACCOUNT) -> bool:
+        """Load the saved state into a browser-use BrowserContext before its first navigation"""
+        state = self.load(site, account)
+        if state is None:
+            return False
+        playwright_context = (await context.get_session()).context
+        if state.get('cookies'):
+            await playwright_context.add_cookies(state['cookies'])
+        origins = {o['origin']: [(i['name'], i['value']) for i in o.get('localStorage', [])] for o in state.get('origins', [])}
+        if any(origins.values()):
+            await playwright_context.add_init_script(_LOCAL_STORAGE_JS % json.dumps(origins))
+        logger.info(f"Restored session for {site} ({len(state.get('cookies', []))} cookies, {len(origins)} origins)")
+        return True
+
+    async def capture(self, context, site: str, account: str = DEFAULT_ACCOUNT):
+        """Save the context's current cookies and localStorage"""
+        playwright_context = (await context.get_session()).context
+        self.save(site, account, await playwright_context.storage_state())
+
+    @asynccontextmanager
+    async def attach(
+        self, context, site: str, account: str = DEFAULT_ACCOUNT, refresh_interval: float = 300.0
+    ) -> AsyncIterator['AttachedSession']:
+        """Restore the session into `context`, keep it fresh while in use and save it on exit once it is known good"""
+        session = AttachedSession(self, context, site, account)
+        session.restored = await self.restore(context, site, account)
+        refresher = asyncio.create_task(session._refresh_loop(refresh_interval)) if refresh_interval else None
+        failed = True
+        try:
+            yield session
+            failed = False
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+            # a restored session is not known good until the run confirms it, a failed run may have signed out
+            if session.authenticated and not failed:
+                try:
+                    await session.save()
+                except Exception as e:
+                    logger.debug(f'Could not save the {site} session on exit: {e}')
+
+
+class AttachedSession:
+    def __init__(self, store: SessionStore, context, site: str, account: str):
+        self.store = store
+        self.context = context
+        self.site = site
+        self.account = account
+        # a stored session was loaded into the context
+        self.restored = False
+        # the caller confirmed the login with save()
+        self.authenticated = False
+
+    async def save(self):
+        """Mark the session as signed in and store its current state"""
+        self.authenticated = True
+        await self.store.capture(self.context, self.site, self.account)
+
+    async def _refresh_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            if not (self.restored or self.authenticated):
+                continue
+            try:
+                await self.store.capture(self.context, self.site, self.account)
+            except Exception as e:
+                logger.debug(f'Background refresh of the {self.site} session failed: {e}')
+
+
+def attached(store: Optional[SessionStore], context, site: str, account: str = DEFAULT_ACCOUNT):
+    """`store.attach(...)`, or a context yielding None when sessions are off"""
+    return store.attach(context, site, account) if store is not None else nullcontext()
+
+
+async def login(url: str, account: str, store: SessionStore):
+    """Open a visible browser on `url`, wait for a manual sign-in and save the session"""
+    from common.browser_profiles import BrowserProfile
+
+    browser = BrowserProfile('login', headless=False).create_browser()
+    context = await browser.new_context()
+    try:
+        page = await context.get_current_page()
+        await page.goto(url)
+        await asyncio.to_thread(input, f'Sign in to {site_of(url)} in the browser window, then press Enter here...')
+        await store.capture(context, site_of(url), account)
+        print(f'Saved session for {site_of(url)} ({account})')
+    finally:
+        await context.close()
+        await browser.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Manage saved browser sessions')
+    commands = parser.add_subparsers(dest='command', required=True)
+    login_parser = commands.add_parser('login', help='sign in by hand and save the session')
+    login_parser.add_argument('url')
+    login_parser.add_argument('--account', default=DEFAULT_ACCOUNT)
+    commands.add_parser('list', help='show stored sessions')
+    forget = commands.add_parser('forget', help='delete a stored session')
+    forget.add_argument('site')
+    forget.add_argument('--account', default=DEFAULT_ACCOUNT)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    store = SessionStore.from_env()
+    if store is None:
+        print('Sessions are disabled (AGENT_SESSIONS=off)')
+        return 1
+    if args.command == 'login':
+        asyncio.run(login(args.url, args.account, store))
+    elif args.command == 'list':
+        for entry in store.sessions():
+            print(f"{entry['site']:<40} {entry['account']:<30} {entry['age_hours']:6.1f}h  {entry['cookies']} cookies, {entry['origins']} origins")
+    else:
+        store.remove(site_of(args.site), args.account)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+from common.action_pool import BatchWriter, PooledController
+
+
+def test_concurrent_puts_are_written_in_one_batch():
+    batches = []
+    writer = BatchWriter(batches.append, max_delay=0.05)
+
+    async def main():
+        await asyncio.gather(*(writer.put(i) for i in range(40)))
+
+    asyncio.run(main())
+    assert batches == [list(range(40))]
+    assert writer.stats()['written'] == 40 and writer.stats()['batches'] == 1
+
+
+def test_put_returns_once_its_batch_is_written():
+    written = []
+
+    def write(batch):
+        time.sleep(0.1)
+        written.extend(batch)
+
+    writer = BatchWriter(write, max_delay=0)
+
+    async def main():
+        await writer.put('job')
+        return list(written)
+
+    assert asyncio.run(main()) == ['job']
+
+
+def test_write_errors_reach_every_waiter():
+    def write(batch):
+        raise ValueError('disk full')
+
+    writer = BatchWriter(write)
+
+    async def main():
+        return await asyncio.gather(*(writer.put(i) for i in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [type(r) for r in results] == [ValueError] * 3
+
+
+def test_cancelled_write_does_not_leave_waiters_hanging():
+    async def run(func, *args):
+        raise asyncio.CancelledError
+
+    writer = BatchWriter(lambda batch: None, run=run)
+
+    async def main():
+        return await asyncio.wait_for(asyncio.gather(*(writer.put(i) for i in range(3)), return_exceptions=True), 1)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, asyncio.CancelledError) for r in results)
+
+
+def test_sync_actions_run_off_the_event_loop():
+    controller = PooledController(threads=2)
+    threads = []
+
+    @controller.action('Slow blocking action')
+    def slow_action():
+        threads.append(threading.current_thread().name)
+        time.sleep(0.2)
+        return 'done'
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        result = await controller.registry.execute_action('slow_action', {})
+        ticker.cancel()
+        return result, ticks
+
+    try:
+        result, ticks = asyncio.run(main())
+    finally:
+        controller.shutdown()
+    assert result == 'done'
+    # the loop kept running while the action slept on a pool thread
+    assert ticks >= 10
+    assert threads[0].startswith('action')
+    assert controller.stats()['actions']['slow_action']['calls'] == 1
@@ -0,0 +1,118 @@
+import asyncio
+import time
+from email.utils import formatdate
+
+import pytest
+
+from common.asset_cache import AssetCache, freshness_lifetime
+
+NOW = time.time()
+
+
+@pytest.mark.parametrize('headers,expected', [
+    ({'cache-control': 'public, max-age=600'}, 600.0),
+    ({'cache-control': 'max-age=600, s-maxage=60'}, 60.0),
+    ({'cache-control': 'private, max-age=600'}, None),
+    ({'cache-control': 'no-store'}, None),
+    ({'cache-control': 'max-age=600', 'set-cookie': 'session=1'}, None),
+    ({'cache-control': 'max-age=600', 'vary': '*'}, None),
+    ({'cache-control': 'no-cache', 'etag': '"v1"'}, 0.0),
+    ({'cache-control': 'no-cache'}, None),
+    ({'date': formatdate(NOW, usegmt=True), 'expires': formatdate(NOW + 120, usegmt=True)}, 120.0),
+    ({'date': formatdate(NOW, usegmt=True), 'last-modified': formatdate(NOW - 1000, usegmt=True)}, 100.0),
+    ({}, None),
+])
+def test_freshness_lifetime(headers, expected):
+    assert freshness_lifetime(headers, now=NOW) == expected
+
+
+def test_freshness_lifetime_of_authorized_requests():
+    assert freshness_lifetime({'cache-control': 'max-age=600'}, authorized=True) is None
+    assert freshness_lifetime({'cache-control': 'public, max-age=600'}, authorized=True) == 600.0
+    assert freshness_lifetime({'cache-control': 's-maxage=60'}, authorized=True) == 60.0
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = AssetCache(tmp_path, max_bytes=2500)
+    yield cache
+    cache.close()
+
+
+def test_store_lookup_and_vary(cache):
+    headers = {'cache-control': 'max-age=600', 'content-type': 'text/css', 'content-length': '4', 'vary': 'Accept-Language, Accept-Encoding'}
+    assert cache.store('https://cdn.example/a.css', {'accept-language': 'en'}, headers, b'body')
+
+    asset = cache.lookup('https://cdn.example/a.css', {'accept-language': 'en', 'accept-encoding': 'br'})
+    assert asset.fresh and cache.read(asset) == b'body'
+    assert 'content-length' not in asset.headers
+    assert cache.lookup('https://cdn.example/a.css', {'accept-language': 'de'}) is None
+    assert cache.lookup('https://cdn.example/b.css', {}) is None
+
+
+def test_same_body_is_stored_once_and_lru_is_evicted(cache):
+    headers = {'cache-control': 'max-age=600'}
+    cache.store('https://cdn.example/1.js', {}, headers, b'a' * 1000)
+    cache.store('https://mirror.example/1.js', {}, headers, b'a' * 1000)
+    assert cache.stats()['bytes'] == 1000
+
+    cache.store('https://cdn.example/2.js', {}, headers, b'b' * 1000)
+    # touch the first body, so the second one is the least recently used
+    cache.lookup('https://cdn.example/1.js', {})
+    cache.store('https://cdn.example/3.js', {}, headers, b'c' * 1000)
+    assert cache.lookup('https://cdn.example/2.js', {}) is None
+    assert cache.lookup('https://cdn.example/3.js', {}) is not None
+    assert cache.stats()['bytes'] <= 2500
+
+
+def test_authorized_response_is_not_shared(cache):
+    headers = {'cache-control': 'max-age=600'}
+    assert not cache.store('https://app.example/avatar.png', {'authorization': 'Bearer alice'}, headers, b'alice')
+    assert cache.store('https://app.example/logo.png', {'authorization': 'Bearer alice'}, {'cache-control': 'public, max-age=600'}, b'logo')
+
+
+class FakeResponse:
+    def __init__(self, url, headers, body):
+        self.status, self.url, self.headers, self._body = 200, url, headers, body
+
+    async def body(self):
+        return self._body
+
+
+class FakeRequest:
+    method = 'GET'
+    resource_type = 'image'
+
+    def __init__(self, url, headers):
+        self.url = url
+        # like Playwright, the plain headers leave out credentials
+        self.headers = {name: value for name, value in headers.items() if name != 'authorization'}
+        self._all = headers
+
+    async def all_headers(self):
+        return self._all
+
+
+class FakeRoute:
+    def __init__(self, url, headers, response_body):
+        self.request = FakeRequest(url, headers)
+        self.response_body = response_body
+        self.fetched = 0
+        self.fulfilled = None
+
+    async def fetch(self, headers=None):
+        self.fetched += 1
+        return FakeResponse(self.request.url, {'cache-control': 'max-age=600'}, self.response_body)
+
+    async def fulfill(self, response=None, **kwargs):
+        self.fulfilled = await response.body() if response is not None else kwargs['body']
+
+
+def test_handle_does_not_serve_one_accounts_response_to_another(cache):
+    url = 'https://app.example/me/avatar.png'
+    alice = FakeRoute(url, {'authorization': 'Bearer alice'}, b'alice')
+    bob = FakeRoute(url, {'authorization': 'Bearer bob'}, b'bob')
+
+    assert asyncio.run(cache.handle(alice)) and asyncio.run(cache.handle(bob))
+    assert (alice.fulfilled, bob.fulfilled) == (b'alice', b'bob')
+    assert bob.fetched == 1 and cache.stats()['entries'] == 0
@@ -0,0 +1,144 @@
+import asyncio
+from types import SimpleNamespace
+
+from common.browser_pool import BrowserPool, PoolConfig
+
+
+class FakePlaywrightBrowser:
+    def __init__(self):
+        self.connected = True
+        self.contexts = []
+
+    def is_connected(self):
+        return self.connected
+
+
+class FakeContext:
+    def __init__(self, browser: 'FakeBrowser'):
+        self.browser = browser
+        self.pages = []
+        browser.playwright_browser.contexts.append(self)
+
+    async def close(self):
+        self.browser.playwright_browser.contexts.remove(self)
+
+
+class FakeBrowser:
+    """The parts of browser_use's Browser the pool uses"""
+
+    def __init__(self):
+        self.playwright_browser = None
+        self.config = SimpleNamespace(new_context_config=None)
+        self.closed = False
+
+    async def get_playwright_browser(self):
+        self.playwright_browser = FakePlaywrightBrowser()
+        return self.playwright_browser
+
+    async def new_context(self, config=None):
+        # opening a context yields to the event loop, like Playwright does
+        await asyncio.sleep(0)
+        return FakeContext(self)
+
+    async def close(self):
+        self.closed = True
+
+
+class Factory:
+    def __init__(self):
+        self.browsers: list[FakeBrowser] = []
+
+    def __call__(self) -> FakeBrowser:
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+
+def _pool(**options) -> tuple[BrowserPool, Factory]:
+    factory = Factory()
+    return BrowserPool(factory, PoolConfig(health_check_interval=0, **options)), factory
+
+
+async def _hold(pool: BrowserPool, release: asyncio.Event, opened: list):
+    async with pool.context() as context:
+        opened.append(context)
+        await release.wait()
+
+
+def test_contexts_are_spread_and_limited_per_browser():
+    async def scenario():
+        pool, factory = _pool(size=2, contexts_per_browser=2)
+        release, opened = asyncio.Event(), []
+        tasks = [asyncio.create_task(_hold(pool, release, opened)) for _ in range(5)]
+        await asyncio.sleep(0.05)
+        # the fifth borrower waits for a free slot
+        assert len(opened) == 4
+        assert [len(browser.playwright_browser.contexts) for browser in factory.browsers] == [2, 2]
+        release.set()
+        await asyncio.gather(*tasks)
+        assert len(opened) == 5 and pool.stats()['active_contexts'] == 0
+        await pool.close()
+        assert all(browser.closed for browser in factory.browsers)
+
+    asyncio.run(scenario())
+
+
+def test_browser_is_recycled_after_serving_its_contexts():
+    async def scenario():
+        pool, factory = _pool(size=1, contexts_per_browser=1, max_contexts_served=2)
+        for _ in range(3):
+            async with pool.context() as context:
+                pass
+        assert len(factory.browsers) == 2 and factory.browsers[0].closed
+        assert context.browser is factory.browsers[1] and not factory.browsers[1].closed
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_draining_browser_is_not_handed_out_past_its_last_contexts():
+    async def scenario():
+        pool, factory = _pool(size=1, contexts_per_browser=2, max_contexts_served=2)
+        first, second, opened = asyncio.Event(), asyncio.Event(), []
+        holders = [asyncio.create_task(_hold(pool, first, opened)), asyncio.create_task(_hold(pool, second, opened))]
+        await asyncio.sleep(0.01)
+        first.set()
+        await holders[0]
+        # the browser has served its contexts and only waits for the second one to close
+        late = asyncio.create_task(_hold(pool, asyncio.Event(), opened))
+        await asyncio.sleep(0.01)
+        assert len(opened) == 2 and len(factory.browsers) == 1
+
+        second.set()
+        await holders[1]
+        await asyncio.sleep(0.01)
+        assert len(opened) == 3 and opened[-1].browser is factory.browsers[1]
+        assert factory.browsers[0].closed
+        late.cancel()
+        await asyncio.gather(late, return_exceptions=True)
+        await pool.close()
+
+    asyncio.run(scenario())
+
+
+def test_health_check_replaces_crashed_and_leaking_browsers():
+    async def scenario():
+        pool, factory = _pool(size=3, contexts_per_browser=2, max_open_pages=5)
+        await pool.start()
+        crashed, leaking_pages, leaking_contexts = factory.browsers
+        crashed.playwright_browser.connected = False
+        FakeContext(leaking_pages).pages = ['page'] * 6
+        FakeContext(leaking_contexts)
+
+        await pool.check_health()
+        assert len(factory.browsers) == 6 and all(browser.closed for browser in factory.browsers[:3])
+        assert pool.stats() == {'browsers': 3, 'active_contexts': 0, 'served': 0, 'draining': 0}
+
+        # a browser in use is only replaced once its contexts are released
+        async with pool.context() as context:
+            context.browser.playwright_browser.connected = False
+            await pool.check_health()
+            assert not context.browser.closed and pool.stats()['draining'] == 1
+        assert context.browser.closed and len(factory.browsers) == 7
+        await pool.close()
+
+    asyncio.run(scenario())
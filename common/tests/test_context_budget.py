@@ -0,0 +1,68 @@
+import json
+import re
+
+import pytest
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, ToolMessage
+
+from common.context_budget import HISTORY_MARKER, BudgetedChatModel, PayloadStore, message_tokens
+
+PREFIX = [SystemMessage(content='You are a browser agent'), HumanMessage(content='Find the cheapest rice'), HumanMessage(content=HISTORY_MARKER)]
+STATE = HumanMessage(content='Current url: https://shop.example/search?q=rice')
+
+
+def _model(**options) -> BudgetedChatModel:
+    return BudgetedChatModel(inner=FakeListChatModel(responses=['ok']), payloads=PayloadStore(), **options)
+
+
+def _result(i: int, words: int = 150) -> HumanMessage:
+    return HumanMessage(content=f'Action result: product {i} ' + ' '.join(f'rice{i}-{n}' for n in range(words)))
+
+
+def _tool_step(i: int) -> list:
+    call = AIMessage(content='', tool_calls=[{'name': 'AgentOutput', 'args': {'action': [{'click_element': {'index': i}}]}, 'id': f'call{i}'}])
+    return [call, ToolMessage(content='Browser state was updated', tool_call_id=f'call{i}')]
+
+
+def test_large_results_are_stored_as_payloads():
+    model = _model(payload_threshold=50)
+    products = [{'name': f'Rice {i}', 'price': i * 1.5, 'url': f'https://shop.example/rice/{i}'} for i in range(40)]
+    small = HumanMessage(content='Action result: {\n  "found": 2\n}')
+    large = HumanMessage(content=f'Action result: {json.dumps(products, indent=2)}')
+
+    compacted = model.compact(PREFIX + [small, large, STATE])
+
+    assert compacted[3].content == 'Action result: {"found":2}'
+    handle = re.search(r'\[payload (\w+): ', compacted[4].content).group(1)
+    assert json.loads(model.payloads.get(handle)) == products
+    assert len(compacted[4].content) < 600
+    assert compacted[:3] == PREFIX and compacted[-1] is STATE
+    assert model.stats['steps'] == 1 and model.tokens_saved > 0
+
+
+def test_oldest_results_are_shortened_first():
+    model = _model(keep_recent=1)
+    history = [_result(i) for i in range(3)]
+    # room for everything once the oldest result is shortened
+    model.budget = sum(message_tokens(m) for m in PREFIX + [model._shorten(history[0])] + history[1:] + [STATE])
+
+    compacted = model.compact(PREFIX + history + [STATE])
+
+    assert compacted[3].content.endswith('… [shortened]')
+    assert compacted[4:] == history[1:] + [STATE]
+    assert sum(message_tokens(m) for m in compacted) <= model.budget
+    assert model.stats['evicted'] == 0
+
+
+@pytest.mark.parametrize('keep_recent', [1, 2])
+def test_tool_calls_are_evicted_with_their_tool_messages(keep_recent):
+    model = _model(budget=1, keep_recent=keep_recent)
+    history = _tool_step(1) + _tool_step(2) + [_result(3, words=5)]
+
+    compacted = model.compact(PREFIX + history + [STATE])
+
+    assert compacted[:3] == PREFIX and compacted[-1] is STATE
+    assert compacted[3].content == '[4 earlier history messages omitted to stay within the context budget]'
+    # no tool message is left without the call it answers
+    assert compacted[4:-1] == [history[-1]]
+    assert model.stats['evicted'] == 4
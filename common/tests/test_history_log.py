@@ -0,0 +1,88 @@
+import asyncio
+
+from browser_use import Controller
+from browser_use.agent.views import ActionResult, AgentBrain, AgentHistory, AgentOutput, AgentState
+from browser_use.browser.views import BrowserStateHistory
+
+from common.history_log import HistoryLog
+
+ActionModel = Controller().registry.create_action_model()
+StubOutput = AgentOutput.type_with_custom_actions(ActionModel)
+
+
+def _step(i: int, done: bool = False) -> tuple:
+    action = {'go_to_url': {'url': f'https://site.example/{i}'}} if i % 2 else {'click_element': {'index': i}}
+    output = StubOutput(current_state=AgentBrain(evaluation_previous_goal='', memory='', next_goal=f'step {i}'), action=[ActionModel(**action)])
+    state = BrowserStateHistory(url=f'https://site.example/{i % 3}', title='Site', tabs=[], interacted_element=[None], screenshot='iVBOR' * 100)
+    return output, state, [ActionResult(extracted_content=f'result {i}', is_done=done, success=True if done else None)]
+
+
+class StubAgent:
+    """The parts of browser_use.Agent the history log hooks into"""
+
+    def __init__(self, steps: int, replayed_at_end: int = 0):
+        self.state = AgentState()
+        self.steps = steps
+        self.replayed_at_end = replayed_at_end
+
+    def _make_history_item(self, model_output, state, result, metadata=None):
+        self.state.history.history.append(AgentHistory(model_output=model_output, result=result, state=state, metadata=metadata))
+
+    async def run(self, max_steps: int = 100):
+        for i in range(1, self.steps + 1):
+            self._make_history_item(*_step(i, done=i == self.steps and not self.replayed_at_end))
+        # macro steps are appended directly, and max_steps ends the run before the next LLM step
+        for i in range(self.replayed_at_end):
+            output, state, result = _step(self.steps + i + 1)
+            self.state.history.history.append(AgentHistory(model_output=output, result=result, state=state))
+        return self.state.history
+
+
+def test_window_is_trimmed_and_steps_round_trip(tmp_path):
+    log = HistoryLog(tmp_path, window=3)
+    agent = StubAgent(steps=12)
+    run = log.attach(agent, label='document site')
+
+    history = asyncio.run(agent.run())
+    assert len(history.history) == 3
+    assert history.is_successful() and history.final_result() == 'result 12'
+
+    assert [step['result'][0]['extracted_content'] for step in log.steps(run.id)] == [f'result {i}' for i in range(1, 13)]
+    assert [entry.step for entry in log.index(run.id, action='click_element')] == [2, 4, 6, 8, 10, 12]
+    assert [entry.step for entry in log.index(run.id, url='https://site.example/1')] == [1, 4, 7, 10]
+
+    full = log.history(run.id, StubOutput)
+    assert len(full.history) == 12
+    assert full.action_names()[:2] == ['go_to_url', 'click_element']
+    assert full.history[0].state.screenshot == 'iVBOR' * 100
+    assert log.runs()[0]['steps'] == 12
+    log.close()
+
+
+def test_steps_appended_at_the_end_of_a_run_are_logged(tmp_path):
+    log = HistoryLog(tmp_path, window=2)
+    agent = StubAgent(steps=3, replayed_at_end=2)
+    run = log.attach(agent)
+
+    history = asyncio.run(agent.run())
+    assert len(history.history) == 2
+    assert run.steps == 5
+    assert [entry.step for entry in log.index(run.id)] == [1, 2, 3, 4, 5]
+    log.close()
+
+
+def test_old_runs_are_pruned_as_new_ones_attach(tmp_path):
+    log = HistoryLog(tmp_path, max_runs=2)
+    finished = []
+    for _ in range(4):
+        agent = StubAgent(steps=2)
+        finished.append(log.attach(agent).id)
+        asyncio.run(agent.run())
+    assert [run['id'] for run in log.runs()] == finished[:1:-1]
+    assert {path.stem for path in tmp_path.glob('*.log')} == set(finished[2:])
+    assert list(log.steps(finished[0])) == []
+
+    # runs still going are kept, even past max_runs
+    running = [log.attach(StubAgent(steps=1)).id for _ in range(3)]
+    assert [run['id'] for run in log.runs()] == running[::-1]
+    log.close()
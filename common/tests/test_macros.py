@@ -0,0 +1,58 @@
+from common.macros import _fill, _templatize, describe_element, find_element
+
+PARAMS = {'product': 'rice'}
+
+
+class FakeNode:
+    def __init__(self, index, tag, text='', xpath='', **attributes):
+        self.highlight_index = index
+        self.tag_name = tag
+        self.text = text
+        self.xpath = xpath or f'html/body/{tag}[{index}]'
+        self.attributes = attributes
+
+    def get_all_text_till_next_clickable_element(self):
+        return self.text
+
+
+def test_templatize_replaces_whole_values_in_action_parameters_only():
+    recorded = [
+        {'input_text': {'index': 12, 'text': 'rice'}},
+        {'go_to_url': {'url': 'https://shop.example/search?q=rice'}},
+        {'input_text': {'index': 3, 'text': 'Sort by Price: low to high'}},
+        {'click_element': {'index': 7, 'xpath': 'html/body/div[@id="rice"]'}},
+    ]
+    templated = [_templatize(action, PARAMS) for action in recorded]
+
+    assert templated == [
+        {'input_text': {'index': 12, 'text': '{{product}}'}},
+        {'go_to_url': {'url': 'https://shop.example/search?q={{product}}'}},
+        {'input_text': {'index': 3, 'text': 'Sort by Price: low to high'}},
+        {'click_element': {'index': 7, 'xpath': 'html/body/div[@id="rice"]'}},
+    ]
+    assert [_fill(action, {'product': 'sugar'}) for action in templated][:3] == [
+        {'input_text': {'index': 12, 'text': 'sugar'}},
+        {'go_to_url': {'url': 'https://shop.example/search?q=sugar'}},
+        {'input_text': {'index': 3, 'text': 'Sort by Price: low to high'}},
+    ]
+    # values too short to be distinctive are left alone
+    assert _templatize({'input_text': {'index': 1, 'text': 'tv'}}, {'product': 'tv'}) == {'input_text': {'index': 1, 'text': 'tv'}}
+
+
+def test_find_element_by_attributes_text_and_xpath():
+    sort = FakeNode(4, 'button', 'Sort by Price: low to high')
+    page = {
+        1: FakeNode(1, 'input', id='search', name='q'),
+        2: FakeNode(2, 'a', 'Add to cart', xpath='html/body/div[1]/a', role='button'),
+        3: FakeNode(3, 'a', 'Add to cart', xpath='html/body/div[2]/a', role='button'),
+        4: sort,
+    }
+
+    assert find_element(describe_element(FakeNode(9, 'input', id='search', name='q')), page) == 1
+    # the same text twice: the xpath decides
+    assert find_element(describe_element(FakeNode(9, 'a', 'Add to cart', xpath='html/body/div[2]/a', role='button')), page) == 3
+    # attributes changed, the text did not
+    assert find_element(describe_element(FakeNode(9, 'button', 'Sort by Price: low to high', id='sort-v2')), page) == 4
+    assert find_element(describe_element(FakeNode(9, 'select', 'Quantity', name='qty')), page) is None
+    # descriptors are recorded literally, whatever the run's parameters
+    assert describe_element(sort)['text'] == 'Sort by Price: low to high'
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from common.context_budget import HISTORY_MARKER
+from common.model_router import RoutedChatModel, classify_step
+
+
+class FakeModel(BaseChatModel):
+    """Answers with its own name after `delay` seconds, or fails"""
+
+    answer: str
+    delay: float = 0.0
+    fail: bool = False
+    calls: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return 'fake'
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError(f'{self.answer} is down')
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f'{self.answer} is down')
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.answer))])
+
+
+def _step(*actions: str) -> AIMessage:
+    return AIMessage(content='', tool_calls=[{'name': 'AgentOutput', 'args': {'action': [{a: {}} for a in actions]}, 'id': '1'}])
+
+
+def _prompt(*steps: AIMessage, state: str = 'Current url: https://shop.example') -> list:
+    return [SystemMessage(content='You are a browser agent'), HumanMessage(content=HISTORY_MARKER), *steps, HumanMessage(content=state)]
+
+
+NAVIGATE = _prompt(_step('click_element'))
+
+
+def test_classify_step():
+    assert classify_step([HumanMessage(content='Summarize this page')]) == 'plan'
+    assert classify_step(_prompt()) == 'plan'
+    assert classify_step(NAVIGATE) == 'navigate'
+    assert classify_step(_prompt(_step('go_to_url'), _step('extract_content'))) == 'compare'
+    assert classify_step(_prompt(_step('click_element'), state='Action error 1/3: element not found')) == 'recover'
+    assert classify_step(_prompt(_step('click_element'), state='Now comes your last step. Use only the "done" action')) == 'finish'
+    assert classify_step(_prompt(_step('click_element'), _step('scroll_down')), replan_every=2) == 'plan'
+
+
+@pytest.fixture
+def models():
+    return FakeModel(answer='strong'), FakeModel(answer='fast')
+
+
+def _router(models, **options) -> RoutedChatModel:
+    strong, fast = models
+    return RoutedChatModel(inner=strong, fast=fast, **options)
+
+
+def test_routes_by_step_reason(models):
+    router = _router(models)
+    assert asyncio.run(router.ainvoke(NAVIGATE)).content == 'fast'
+    assert asyncio.run(router.ainvoke(_prompt())).content == 'strong'
+    assert router.invoke(NAVIGATE).content == 'fast'
+    assert [(d['reason'], d['answered_by']) for d in router.decisions] == [('navigate', 'fast'), ('plan', 'strong'), ('navigate', 'fast')]
+    assert router.stats()['reasons'] == {'navigate': 2, 'plan': 1}
+
+
+def test_error_falls_back_to_the_other_model(models):
+    strong, fast = models
+    fast.fail = True
+    router = _router(models)
+    assert asyncio.run(router.ainvoke(NAVIGATE)).content == 'strong'
+    assert router.invoke(NAVIGATE).content == 'strong'
+    assert all(d['fallback'] for d in router.decisions)
+    assert (fast.calls, strong.calls) == (2, 2)
+    assert router.stats()['fast']['errors'] == 1 and router.stats()['fallbacks'] == 2
+
+
+def test_timeout_falls_back_to_the_other_model(models):
+    strong, fast = models
+    fast.delay = 1.0
+    router = _router(models, fast_timeout=0.05)
+    assert asyncio.run(router.ainvoke(NAVIGATE)).content == 'strong'
+    stats = router.stats()
+    assert stats['fast']['timeouts'] == 1 and stats['answered_by'] == {'strong': 1}
+
+
+def test_slow_call_is_hedged_and_the_first_answer_wins(models):
+    strong, fast = models
+    router = _router(models, hedge_min_samples=3)
+    for _ in range(3):
+        asyncio.run(router.ainvoke(NAVIGATE))
+    assert not any(d['hedged'] for d in router.decisions)
+
+    fast.delay = 1.0
+    assert asyncio.run(router.ainvoke(NAVIGATE)).content == 'strong'
+    assert router.decisions[-1] | {'latency': None} == {
+        'step': 4, 'reason': 'navigate', 'routed_to': 'fast', 'hedged': True, 'fallback': False, 'answered_by': 'strong', 'latency': None,
+    }
+    assert router.decisions[-1]['latency'] < 1.0
+    assert (fast.calls, strong.calls) == (4, 1)
+
+
+def test_recent_decisions_are_bounded_and_stats_count_every_step(models):
+    router = _router(models, decision_window=2, hedge=False)
+    for _ in range(5):
+        asyncio.run(router.ainvoke(NAVIGATE))
+    assert [d['step'] for d in router.decisions] == [4, 5]
+    stats = router.stats()
+    assert stats['steps'] == 5 and stats['answered_by'] == {'fast': 5} and stats['fast']['calls'] == 5
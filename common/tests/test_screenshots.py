@@ -0,0 +1,60 @@
+import base64
+import io
+import json
+
+from PIL import Image, ImageDraw
+
+from common.screenshots import ScreenshotSink, dhash
+
+
+def _page(heading_at: int, noise: int = 0) -> Image.Image:
+    """A mock page: a dark header bar, a heading block and some text lines"""
+    image = Image.new('RGB', (1600, 1000), 'white')
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 1600, 120), fill=(30, 30, 60))
+    draw.rectangle((100, heading_at, 900, heading_at + 80), fill=(20, 20, 20))
+    for line in range(8):
+        draw.rectangle((100, 500 + line * 50, 1400 - line * 90, 520 + line * 50), fill=(90 + noise, 90, 90))
+    return image
+
+
+def _png(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+def _jpeg(image: Image.Image) -> bytes:
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG', quality=60)
+    return buffer.getvalue()
+
+
+def test_dhash_ignores_re_encoding_and_sees_layout_changes():
+    page = _page(200)
+    recompressed = Image.open(io.BytesIO(_jpeg(page)))
+    assert bin(dhash(page) ^ dhash(recompressed)).count('1') <= 4
+    assert bin(dhash(page) ^ dhash(_page(300))).count('1') > 4
+
+
+def test_near_identical_frames_are_written_once(tmp_path):
+    with ScreenshotSink(tmp_path, max_width=800, workers=1) as sink:
+        sink.submit(_png(_page(200)), 'https://shop.example/', 1).result()
+        # base64 frames from browser-use, a pixel of difference
+        sink.submit(base64.b64encode(_png(_page(200, noise=1))).decode(), 'https://shop.example/', 2).result()
+        sink.submit(_png(_page(300)), 'https://shop.example/cart', 3).result()
+
+    assert {key: sink.stats[key] for key in ('submitted', 'saved', 'duplicates', 'failed')} == {'submitted': 3, 'saved': 2, 'duplicates': 1, 'failed': 0}
+    manifest = [json.loads(line) for line in sink.manifest_path.read_text().splitlines()]
+    assert [(entry['step'], entry['duplicate']) for entry in manifest] == [(1, False), (2, True), (3, False)]
+    assert manifest[1]['file'] == manifest[0]['file']
+    files = sorted(tmp_path.glob('*.webp'))
+    assert [path.name for path in files] == sorted(entry['file'] for entry in manifest if not entry['duplicate'])
+    assert Image.open(files[0]).width == 800
+
+
+def test_unreadable_frames_are_counted_as_failed(tmp_path):
+    with ScreenshotSink(tmp_path, workers=1) as sink:
+        future = sink.submit(b'not a png', 'https://shop.example/', 1)
+        future.exception()
+    assert sink.stats['failed'] == 1 and sink.stats['saved'] == 0
@@ -0,0 +1,127 @@
+import asyncio
+import stat
+import time
+from types import SimpleNamespace
+
+import pytest
+from cryptography.fernet import Fernet
+
+from common.session_store import SessionStore
+
+SITE = 'shop.example'
+ACCOUNT = 'jane@example.com'
+
+
+def _state(*cookies: dict) -> dict:
+    return {'cookies': list(cookies), 'origins': [{'origin': 'https://shop.example', 'localStorage': [{'name': 'cart', 'value': '3'}]}]}
+
+
+def _cookie(name: str, expires: float) -> dict:
+    return {'name': name, 'value': f'{name}-secret', 'domain': SITE, 'path': '/', 'expires': expires}
+
+
+@pytest.fixture
+def key():
+    return Fernet.generate_key()
+
+
+@pytest.fixture
+def store(tmp_path, key):
+    return SessionStore(tmp_path, key=key)
+
+
+def test_states_round_trip_encrypted(store, tmp_path):
+    state = _state(_cookie('session', -1), _cookie('token', time.time() + 3600))
+    store.save(SITE, ACCOUNT, state)
+
+    assert store.load(SITE, ACCOUNT) == state
+    assert store.load(SITE) is None
+    [path] = tmp_path.glob('*.session')
+    assert b'token-secret' not in path.read_bytes() and ACCOUNT not in path.name
+    assert [(s['site'], s['account'], s['cookies'], s['origins']) for s in store.sessions()] == [(SITE, ACCOUNT, 2, 1)]
+
+
+def test_expired_states_and_cookies_are_dropped(store, key, tmp_path):
+    now = time.time()
+    store.save(SITE, ACCOUNT, _state(_cookie('old', now - 60), _cookie('session', -1), _cookie('token', now + 3600)))
+    assert [c['name'] for c in store.load(SITE, ACCOUNT)['cookies']] == ['session', 'token']
+
+    store.save(SITE, ACCOUNT, _state(_cookie('old', now - 60)))
+    assert store.load(SITE, ACCOUNT) is None
+    assert not list(tmp_path.glob('*.session'))
+
+    store.save(SITE, ACCOUNT, _state(_cookie('token', now + 3600)))
+    assert SessionStore(tmp_path, key=key, max_age_hours=-1).load(SITE, ACCOUNT) is None
+    assert not list(tmp_path.glob('*.session'))
+
+
+def test_states_saved_with_another_key_are_ignored(store, tmp_path):
+    store.save(SITE, ACCOUNT, _state(_cookie('session', -1)))
+    other = SessionStore(tmp_path, key=Fernet.generate_key())
+    assert other.load(SITE, ACCOUNT) is None and other.sessions() == []
+    # the state is still there for the right key
+    assert store.load(SITE, ACCOUNT) is not None
+
+
+def test_generated_key_is_private_and_reused(tmp_path):
+    first = SessionStore(tmp_path)
+    first.save(SITE, ACCOUNT, _state())
+    assert stat.S_IMODE((tmp_path / '.key').stat().st_mode) == 0o600
+    assert SessionStore(tmp_path).load(SITE, ACCOUNT) == _state()
+
+
+class FakePlaywrightContext:
+    def __init__(self):
+        self.cookies = []
+        self.captured = 0
+
+    async def add_cookies(self, cookies):
+        self.cookies += cookies
+
+    async def add_init_script(self, script):
+        pass
+
+    async def storage_state(self):
+        self.captured += 1
+        return _state(*self.cookies, _cookie(f'rotated{self.captured}', -1))
+
+
+class FakeContext:
+    def __init__(self):
+        self.playwright_context = FakePlaywrightContext()
+
+    async def get_session(self):
+        return SimpleNamespace(context=self.playwright_context)
+
+
+def _attach(store: SessionStore, context: FakeContext, confirm: bool, fail: bool = False):
+    async def run():
+        async with store.attach(context, SITE, ACCOUNT) as session:
+            if confirm:
+                await session.save()
+            if fail:
+                raise RuntimeError('agent failed')
+        return session
+
+    return asyncio.run(run())
+
+
+def test_restored_session_is_saved_on_exit_only_once_confirmed(store):
+    store.save(SITE, ACCOUNT, _state(_cookie('session', -1)))
+
+    context = FakeContext()
+    session = _attach(store, context, confirm=False)
+    assert session.restored and not session.authenticated
+    assert context.playwright_context.captured == 0
+    assert [c['name'] for c in store.load(SITE, ACCOUNT)['cookies']] == ['session']
+
+    context = FakeContext()
+    with pytest.raises(RuntimeError):
+        _attach(store, context, confirm=True, fail=True)
+    # saved when confirmed, not again after the failure
+    assert context.playwright_context.captured == 1
+
+    context = FakeContext()
+    _attach(store, context, confirm=True)
+    assert context.playwright_context.captured == 2
+    assert [c['name'] for c in store.load(SITE, ACCOUNT)['cookies']][-1] == 'rotated2'
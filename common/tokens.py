@@ -0,0 +1,43 @@
+"""
+Token counting shared by the agents.
+
+Uses tiktoken when it is installed (it ships with langchain-openai) and falls
+back to the usual ~4 characters per token estimate otherwise.
+"""
+
+import logging
+from functools import lru_cache
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = 'gpt-4o'
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding('o200k_base')
+    except Exception as e:
+        # encodings are downloaded on first use, which fails offline
+        logger.debug(f'Falling back to estimated token counts: {e}')
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    """Number of tokens `text` takes up in a prompt for `model`"""
+    if not text:
+        return 0
+    encoding = _encoding(model)
+    if encoding is None:
+        return max(1, len(text) // 4)
+    return len(encoding.encode(text, disallowed_special=()))
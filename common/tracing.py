@@ -0,0 +1,344 @@
+"""
+Hot-path tracing for agent runs.
+
+`trace_agent` instruments one browser-use Agent so every step records timed
+spans for its phases:
+
+    step        one agent step, from reading the page to the last action
+    llm         the model call, with input/output token counts
+    navigation  page load waits and navigations (navigate_to, go_back, refresh)
+    dom         DOM extraction and screenshot of the browser state
+    action      built-in browser actions (click_element, input_text, ...)
+    controller  actions registered by our agents (upload_cv, save_jobs, ...)
+
+Traces are written as Chrome trace-event JSON (open in chrome://tracing or
+https://ui.perfetto.dev) and as JSONL, one span per line, for the report:
+
+    AGENT_TRACE_DIR=traces python job_search_agent/read_apply_job.py
+    python -m common.tracing traces/*.jsonl --top 10
+
+Without AGENT_TRACE_DIR nothing is patched, so a disabled tracer costs nothing.
+"""
+
+import argparse
+import contextvars
+import functools
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Optional
+
+from browser_use import Controller
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatResult
+
+from common.llm_wrappers import ChatModelWrapper
+
+logger = logging.getLogger(__name__)
+
+# tracer, agent label and step of the code currently running; set by the patched Agent methods
+_active: contextvars.ContextVar[Optional['Tracer']] = contextvars.ContextVar('trace_active', default=None)
+_agent_label: contextvars.ContextVar[str] = contextvars.ContextVar('trace_agent', default='')
+_step: contextvars.ContextVar[Optional[int]] = contextvars.ContextVar('trace_step', default=None)
+
+_NAVIGATION_METHODS = ('_wait_for_page_and_frames_load', 'navigate_to', 'go_back', 'refresh_page')
+_PATCHED = '_traced'
+
+
+class Tracer:
+    def __init__(self, run: str, output_dir: Optional[str | Path] = None, enabled: bool = True):
+        self.run = run
+        self.output_dir = Path(output_dir) if output_dir else None
+        self.enabled = enabled
+        self.spans: list[dict] = []
+        self.started_at = time.time()
+        self._origin = time.perf_counter_ns()
+        self._lanes: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, run: str) -> 'Tracer':
+        """Tracer writing to AGENT_TRACE_DIR, or a disabled one when it is not set"""
+        output_dir = os.getenv('AGENT_TRACE_DIR')
+        return cls(run, output_dir, enabled=bool(output_dir))
+
+    def span(self, cat: str, name: str, **args: Any):
+        if not self.enabled:
+            return nullcontext(args)
+        return self._span(cat, name, args)
+
+    @contextmanager
+    def _span(self, cat: str, name: str, args: dict):
+        start = time.perf_counter_ns()
+        try:
+            yield args
+        except BaseException as e:
+            args['error'] = type(e).__name__
+            raise
+        finally:
+            self.record(cat, name, start, time.perf_counter_ns() - start, args)
+
+    def record(self, cat: str, name: str, start_ns: int, duration_ns: int, args: Optional[dict] = None):
+        agent = _agent_label.get()
+        span = {
+            'run': self.run,
+            'agent': agent,
+            'step': _step.get(),
+            'cat': cat,
+            'name': name,
+            'start_ms': (start_ns - self._origin) / 1e6,
+            'dur_ms': duration_ns / 1e6,
+            'args': args or {},
+        }
+        with self._lock:
+            self._lanes.setdefault(agent, len(self._lanes) + 1)
+            self.spans.append(span)
+
+    def chrome_trace(self) -> dict:
+        pid = os.getpid()
+        events = [
+            {'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': lane, 'args': {'name': agent or 'agent'}}
+            for agent, lane in self._lanes.items()
+        ]
+        for span in self.spans:
+            events.append(
+                {
+                    'ph': 'X',
+                    'cat': span['cat'],
+                    'name': span['name'],
+                    'pid': pid,
+                    'tid': self._lanes[span['agent']],
+                    'ts': span['start_ms'] * 1000,
+                    'dur': span['dur_ms'] * 1000,
+                    'args': {'step': span['step'], **span['args']},
+                }
+            )
+        return {'traceEvents': events, 'displayTimeUnit': 'ms', 'metadata': {'run': self.run, 'started_at': self.started_at}}
+
+    def save(self, output_dir: Optional[str | Path] = None) -> Optional[Path]:
+        """Write <run>-<time>.trace.json and .jsonl; returns the JSONL path"""
+        output_dir = Path(output_dir or self.output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        stem = f"{self.run}-{datetime.fromtimestamp(self.started_at).strftime('%Y%m%d-%H%M%S')}"
+        with open(output_dir / f'{stem}.trace.json', 'w') as f:
+            json.dump(self.chrome_trace(), f)
+        jsonl_path = output_dir / f'{stem}.jsonl'
+        with open(jsonl_path, 'w') as f:
+            for span in self.spans:
+                f.write(json.dumps(span) + '\n')
+        return jsonl_path
+
+    def close(self):
+        if self.enabled and self.output_dir and self.spans:
+            path = self.save()
+            logger.info(f'Trace with {len(self.spans)} spans written to {path} (and .trace.json)')
+
+
+class TracedChatModel(ChatModelWrapper):
+    """Records an llm span with token usage for every model call"""
+
+    @property
+    def _llm_type(self) -> str:
+        return f'traced-{self.inner._llm_type}'
+
+    def _generate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tracer = _active.get()
+        if tracer is None:
+            return self.call_model_sync(self.inner, messages, stop=stop, **kwargs)
+        with tracer.span('llm', self.model_name, messages=len(messages)) as args:
+            result = self.call_model_sync(self.inner, messages, stop=stop, **kwargs)
+            args.update(_usage(result))
+        return result
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: Optional[list[str]] = None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tracer = _active.get()
+        if tracer is None:
+            return await self.call_model(self.inner, messages, stop=stop, **kwargs)
+        with tracer.span('llm', self.model_name, messages=len(messages)) as args:
+            result = await self.call_model(self.inner, messages, stop=stop, **kwargs)
+            args.update(_usage(result))
+        return result
+
+
+def _usage(result: ChatResult) -> dict:
+    usage = getattr(result.generations[0].message, 'usage_metadata', None) or {}
+    return {'input_tokens': usage.get('input_tokens'), 'output_tokens': usage.get('output_tokens')}
+
+
+def _traced(cat: str, name: str, method):
+    """Async method wrapper recording a span on the active tracer, if any"""
+
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        tracer = _active.get()
+        if tracer is None:
+            return await method(*args, **kwargs)
+        with tracer.span(cat, name):
+            return await method(*args, **kwargs)
+
+    return wrapper
+
+
+def _instrument_browser_context(context):
+    # contexts and controllers can be shared by several agents, patch them once
+    if getattr(context, _PATCHED, False):
+        return
+    for method in _NAVIGATION_METHODS:
+        name = 'page_load_wait' if method.startswith('_wait') else method
+        setattr(context, method, _traced('navigation', name, getattr(context, method)))
+    context._update_state = _traced('dom', 'extract_state', context._update_state)
+    setattr(context, _PATCHED, True)
+
+
+@functools.lru_cache(maxsize=1)
+def _builtin_actions() -> frozenset[str]:
+    return frozenset(Controller().registry.registry.actions)
+
+
+def _instrument_controller(controller):
+    registry = controller.registry
+    if getattr(registry, _PATCHED, False):
+        return
+    execute_action = registry.execute_action
+
+    @functools.wraps(execute_action)
+    async def traced_execute_action(action_name: str, params: dict, *args, **kwargs):
+        tracer = _active.get()
+        if tracer is None:
+            return await execute_action(action_name, params, *args, **kwargs)
+        with tracer.span('action' if action_name in _builtin_actions() else 'controller', action_name):
+            return await execute_action(action_name, params, *args, **kwargs)
+
+    registry.execute_action = traced_execute_action
+    setattr(registry, _PATCHED, True)
+
+
+def trace_agent(agent, tracer: Tracer, label: str = ''):
+    """Instrument `agent` to record spans on `tracer`; returns the agent unchanged when tracing is off"""
+    if not tracer.enabled:
+        return agent
+    _instrument_browser_context(agent.browser_context)
+    _instrument_controller(agent.controller)
+    agent.llm = TracedChatModel(inner=agent.llm)
+
+    run, step = agent.run, agent.step
+
+    @functools.wraps(run)
+    async def traced_run(*args, **kwargs):
+        active, agent_label = _active.set(tracer), _agent_label.set(label)
+        try:
+            with tracer.span('run', label or 'agent'):
+                return await run(*args, **kwargs)
+        finally:
+            _active.reset(active)
+            _agent_label.reset(agent_label)
+
+    @functools.wraps(step)
+    async def traced_step(*args, **kwargs):
+        token = _step.set(agent.state.n_steps)
+        try:
+            with tracer.span('step', 'step') as span_args:
+                await step(*args, **kwargs)
+                last = agent.state.history.history[-1] if agent.state.history.history else None
+                if last is not None and last.model_output:
+                    span_args['actions'] = [next(iter(a.model_dump(exclude_unset=True)), None) for a in last.model_output.action]
+        finally:
+            _step.reset(token)
+
+    agent.run, agent.step = traced_run, traced_step
+    return agent
+
+
+# Report ----------------------------------------------------------------------
+
+
+def load_spans(paths: list[str]) -> list[dict]:
+    spans = []
+    for pattern in paths:
+        for path in sorted(glob.glob(pattern)) or [pattern]:
+            with open(path) as f:
+                spans.extend(json.loads(line) for line in f if line.strip())
+    return spans
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    return ordered[int(round(q * (len(ordered) - 1)))]
+
+
+def span_stats(spans: list[dict]) -> list[dict]:
+    """Count, p50, p95, max and total per span type (category and name)"""
+    durations = defaultdict(list)
+    for span in spans:
+        durations[(span['cat'], span['name'])].append(span['dur_ms'])
+    rows = []
+    for (cat, name), values in durations.items():
+        values.sort()
+        rows.append(
+            {
+                'cat': cat,
+                'name': name,
+                'count': len(values),
+                'p50_ms': percentile(values, 0.5),
+                'p95_ms': percentile(values, 0.95),
+                'max_ms': values[-1],
+                'total_ms': sum(values),
+            }
+        )
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def slow_steps(spans: list[dict], top: int = 10) -> list[dict]:
+    """Slowest steps across all runs, with the time spent per category inside each"""
+    breakdown = defaultdict(lambda: defaultdict(float))
+    for span in spans:
+        if span['cat'] not in ('step', 'run') and span['step'] is not None:
+            breakdown[(span['run'], span['agent'], span['step'])][span['cat']] += span['dur_ms']
+    steps = sorted((s for s in spans if s['cat'] == 'step'), key=lambda s: s['dur_ms'], reverse=True)[:top]
+    return [
+        {
+            'run': s['run'],
+            'agent': s['agent'],
+            'step': s['step'],
+            'dur_ms': s['dur_ms'],
+            'actions': s['args'].get('actions', []),
+            'breakdown_ms': dict(breakdown[(s['run'], s['agent'], s['step'])]),
+        }
+        for s in steps
+    ]
+
+
+def print_report(spans: list[dict], top: int = 10):
+    runs = {span['run'] for span in spans}
+    print(f'{len(spans)} spans from {len(runs)} run(s)\n')
+    print(f"{'category':<11} {'name':<28} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9} {'total s':>9}")
+    for row in span_stats(spans):
+        if row['cat'] == 'run':
+            continue
+        print(
+            f"{row['cat']:<11} {row['name'][:28]:<28} {row['count']:>6} {row['p50_ms']:>9.1f} "
+            f"{row['p95_ms']:>9.1f} {row['max_ms']:>9.1f} {row['total_ms'] / 1000:>9.2f}"
+        )
+    print(f'\nTop {top} slowest steps:')
+    for step in slow_steps(spans, top):
+        parts = ', '.join(f'{cat} {ms:.0f}ms' for cat, ms in sorted(step['breakdown_ms'].items(), key=lambda kv: -kv[1]))
+        agent = f"/{step['agent']}" if step['agent'] else ''
+        print(f"  {step['dur_ms']:>8.0f} ms  {step['run']}{agent} step {step['step']} {step['actions']}  ({parts})")
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Summarize agent traces: p50/p95 per span type and the slowest steps')
+    parser.add_argument('paths', nargs='+', help='JSONL trace files or glob patterns')
+    parser.add_argument('--top', type=int, default=10, help='number of slow steps to list')
+    args = parser.parse_args(argv)
+    print_report(load_spans(args.paths), args.top)
+
+
+if __name__ == '__main__':
+    main()
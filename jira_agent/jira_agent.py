@@ -1,13 +1,34 @@
-from browser_use import Agent, Browser, BrowserConfig
+from browser_use import Agent, Controller
 from langchain_openai import ChatOpenAI
 import asyncio
 import dotenv
-import os
+import hashlib
 import json
+import os
+import sys
+import logging
 from datetime import datetime
 
+# Repo root first, so `jira_agent` is the package even when this file runs as a script
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.browser_profiles import get_profile
+from common.context_budget import PayloadStore, register_payload_actions, with_context_budget
+from common.llm_cache import with_llm_cache
+from common.macros import MacroLibrary, run_with_macro
+from common.session_store import DEFAULT_ACCOUNT, SessionStore, attached, site_of
+from jira_agent.jira_api import JiraClient, JiraConfig, SubtaskExecutor, SubtaskResult, idempotency_label
+
+dotenv.load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# Story the plan's subtasks are created under
+PARENT_KEY = "MP-1"
+DEFAULT_JIRA_URL = "https://knowledge-gain-ai.atlassian.net"
+
 
-# Create fixed JWT implementation plan - no browser needed for this part
+# Create fixed JWT implementation plan - created through the Jira API, the browser is only a fallback
 jwt_implementation_plan = {
     "story_title": "JWT Authentication Implementation",
     "story_summary": "Implement secure JWT authentication for REST API endpoints",
@@ -88,70 +109,109 @@ Definition of Done:
     ]
 }
 
-# Configure the browser with correct parameters - only needed for task creation phase
-browser = Browser(
-    config=BrowserConfig(
-        chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-        headless=False,
-    )
-)
-
-# Single agent for task creation only
-task_creation_agent = Agent(
-    task="""
-    You'll be creating 4 specific JWT authentication subtasks in Jira. No analysis needed as the tasks are already defined.
-    
-    Follow these steps:
-    1. Navigate to https://knowledge-gain-ai.atlassian.net/browse/MP-1
-    2. For each of the 4 JWT subtasks provided in the JSON:
-       a. Look for a "Create Subtask" button or option (often found in dropdown menus or "+" buttons)
-       b. Fill in the summary and description exactly as specified in the JSON
-       c. Set priority to Medium and add the labels specified
-       d. Save the subtask
-       
-    If you encounter a login screen or JavaScript loading error (which is likely based on previous attempts):
-    - Simply report that the Jira instance requires authentication or is having loading issues
-    - No need to proceed further if you can't access the page
-    
-    Remember that the point is to demonstrate the approach, not necessarily complete the task if the system is inaccessible.
-    
-    Wait a full 10 seconds when first loading pages to allow all scripts to load properly.
-    """,
-    llm=ChatOpenAI(model='gpt-4o'),
-    browser=browser,
-)
+BROWSER_TASK = """
+Navigate to {base_url}/browse/{parent_key} and create the following {count} subtasks under it.
+For each subtask use the "Create subtask" option, fill in summary, description, priority and labels exactly
+as given, and save it. If you hit a login screen, report that the Jira instance requires authentication and stop.
+
+{subtasks}
+"""
+
+
+def format_subtasks(parent_key, subtasks):
+    blocks = []
+    for i, subtask in enumerate(subtasks, 1):
+        labels = list(subtask.get("labels", [])) + [idempotency_label(parent_key, subtask)]
+        blocks.append(
+            f"Subtask {i}\n"
+            f"Summary: {subtask['summary']}\n"
+            f"Priority: {subtask.get('priority', 'Medium')}\n"
+            f"Labels: {', '.join(labels)}\n"
+            f"Description:\n{subtask.get('description', '')}"
+        )
+    return "\n\n".join(blocks)
+
+
+def macro_name(subtasks):
+    """Recorded runs are shared by plans with the same number of subtasks, priorities and labels"""
+    shape = [(s.get("priority", "Medium"), sorted(s.get("labels", []))) for s in subtasks]
+    return f"jira_subtasks_{len(subtasks)}_{hashlib.sha1(json.dumps(shape).encode()).hexdigest()[:8]}"
+
+
+def macro_params(base_url, parent_key, subtasks):
+    """Values a recorded subtask run is replayed with, so one recording serves every story"""
+    params = {"base_url": base_url, "parent_key": parent_key}
+    for i, subtask in enumerate(subtasks, 1):
+        params[f"summary_{i}"] = subtask["summary"]
+        params[f"description_{i}"] = subtask.get("description", "")
+        params[f"tracking_label_{i}"] = idempotency_label(parent_key, subtask)
+    return params
+
+
+def browser_fallback(base_url, llm=None, headless=False, macros=None, sessions=None):
+    """
+    Creates the subtasks the API rejected with a browser agent, replaying a recorded run from `macros`
+    when there is one and starting from the Jira login saved in `sessions`
+    """
+
+    async def create_in_browser(parent_key, subtasks):
+        browser = get_profile('jira', default='fast' if headless else 'desktop').create_browser()
+        payloads = PayloadStore()
+        controller = Controller()
+        register_payload_actions(controller, payloads)
+        context = await browser.new_context()
+        try:
+            # signed in as JIRA_EMAIL when `python -m common.session_store login <jira url>` was run once
+            async with attached(sessions, context, site_of(base_url), os.getenv("JIRA_EMAIL", DEFAULT_ACCOUNT)) as session:
+                agent = Agent(
+                    task=BROWSER_TASK.format(
+                        base_url=base_url, parent_key=parent_key, count=len(subtasks),
+                        subtasks=format_subtasks(parent_key, subtasks),
+                    ),
+                    llm=with_context_budget(llm or with_llm_cache(ChatOpenAI(model='gpt-4o')), payloads),
+                    controller=controller,
+                    browser_context=context,
+                )
+                history = await run_with_macro(
+                    agent, macros, macro_name(subtasks), macro_params(base_url, parent_key, subtasks)
+                )
+                if session is not None and history.is_successful():
+                    await session.save()
+        finally:
+            await context.close()
+            await browser.close()
+        if history.is_successful():
+            return [SubtaskResult(s["summary"], "browser") for s in subtasks]
+        return [SubtaskResult(s["summary"], "failed", error=history.final_result()) for s in subtasks]
+
+    return create_in_browser
+
 
 async def main():
     print(f"Starting Jira workflow at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
     
     # Skip analysis phase - use predefined task plan
-    print("Using predefined JWT authentication implementation plan with 4 subtasks:")
+    print(f"Using predefined JWT authentication implementation plan with {len(jwt_implementation_plan['subtasks'])} subtasks:")
     for i, subtask in enumerate(jwt_implementation_plan["subtasks"], 1):
         print(f"  {i}. {subtask['summary']}")
     
-    # Update the agent's task with our predefined plan
-    task_creation_agent.task = task_creation_agent.task + f"\n\nUse the following subtask details:\n```json\n{json.dumps(jwt_implementation_plan, indent=2)}\n```"
+    # JIRA_BASE_URL / JIRA_EMAIL / JIRA_API_TOKEN; without credentials the API rejects and the browser takes over
+    config = JiraConfig.from_env() or JiraConfig(base_url=DEFAULT_JIRA_URL)
+    client = JiraClient(config)
+    executor = SubtaskExecutor(client, browser_fallback=browser_fallback(
+        config.base_url, macros=MacroLibrary.from_env(), sessions=SessionStore.from_env()
+    ))
     
-    # Run the task creation agent
-    print("\nAttempting to create subtasks in Jira...")
+    print(f"\nCreating subtasks under {PARENT_KEY} through the Jira API...")
     try:
-        creation_result = await task_creation_agent.run()
-        print("\nTask creation attempt completed.")
-        print("Result:")
-        print(creation_result)
-    except Exception as e:
-        print(f"\nError during task creation: {e}")
-        print("\nThe Jira instance may be inaccessible or requires authentication.")
-        print("In a real implementation, these tasks would be created with the details specified in the plan.")
+        results = await executor.create_subtasks(PARENT_KEY, jwt_implementation_plan["subtasks"])
+    finally:
+        client.close()
     
-    print("\nJWT Authentication Implementation Plan (for reference):")
-    print(json.dumps(jwt_implementation_plan, indent=2))
-    
-    input('\nPress Enter to close the browser...')
-    try:
-        await browser.close()
-    except:
-        print("Browser already closed or not available.")
+    print("\nResult:")
+    for result in results:
+        print(f"  [{result.status}] {result.key or '-'} {result.summary}" + (f" ({result.error})" if result.error else ""))
+
 
 if __name__ == '__main__':
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,267 @@
+"""
+Bulk Jira subtask creation through the REST API.
+
+A structured plan (like `jwt_implementation_plan`) is created in batches of
+up to 50 issues per `POST /rest/api/2/issue/bulk` over one keep-alive
+session. Every subtask carries an idempotency label derived from its parent
+and summary. Before each (re)try the executor looks those labels up and only
+sends what does not exist yet, so retries never create duplicates. Items
+that Jira rejects can be handed to a browser agent fallback.
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+# Jira accepts at most 50 issues per bulk request
+BULK_LIMIT = 50
+IDEMPOTENCY_PREFIX = 'idem-'
+
+
+class JiraError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+@dataclass
+class JiraConfig:
+    base_url: str
+    email: str = ''
+    api_token: str = ''
+    timeout: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> Optional['JiraConfig']:
+        """Config from JIRA_BASE_URL / JIRA_EMAIL / JIRA_API_TOKEN, None when not configured"""
+        base_url = os.getenv('JIRA_BASE_URL')
+        if not base_url:
+            return None
+        return cls(base_url=base_url, email=os.getenv('JIRA_EMAIL', ''), api_token=os.getenv('JIRA_API_TOKEN', ''))
+
+
+@dataclass
+class SubtaskResult:
+    summary: str
+    # created / existing / rejected / failed / browser
+    status: str
+    key: Optional[str] = None
+    error: Optional[str] = None
+
+
+def idempotency_label(parent_key: str, subtask: dict) -> str:
+    """Stable label identifying one plan item under one parent"""
+    if subtask.get('idempotency_key'):
+        seed = str(subtask['idempotency_key'])
+    else:
+        seed = f"{parent_key}\n{subtask['summary'].strip().lower()}"
+    return IDEMPOTENCY_PREFIX + hashlib.sha256(seed.encode()).hexdigest()[:16]
+
+
+class JiraClient:
+    """Thin Jira REST v2 client on a pooled keep-alive session"""
+
+    def __init__(self, config: JiraConfig, session: Optional[requests.Session] = None):
+        self.config = config
+        self.base_url = config.base_url.rstrip('/')
+        self.session = session or requests.Session()
+        if config.email and config.api_token:
+            self.session.auth = (config.email, config.api_token)
+        self.session.headers.update({'Accept': 'application/json', 'Content-Type': 'application/json'})
+        # idempotent GETs are retried by urllib3; bulk POSTs are retried by the executor
+        retry = Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 502, 503, 504), allowed_methods=('GET',))
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=10)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def request(self, method: str, path: str, **kwargs) -> dict:
+        response = self.session.request(method, f'{self.base_url}{path}', timeout=self.config.timeout, **kwargs)
+        if response.status_code >= 400:
+            raise JiraError(f'{method} {path} failed with {response.status_code}: {response.text[:300]}', response.status_code)
+        return response.json() if response.content else {}
+
+    def get_issue(self, key: str, fields: str = 'project,issuetype,summary') -> dict:
+        return self.request('GET', f'/rest/api/2/issue/{key}', params={'fields': fields})
+
+    def subtask_issue_type(self, name: Optional[str] = None) -> str:
+        """Id of the sub-task issue type (optionally by name)"""
+        types = self.request('GET', '/rest/api/2/issuetype')
+        subtask_types = [t for t in types if t.get('subtask')]
+        for issue_type in subtask_types:
+            if name is None or issue_type['name'].lower() == name.lower():
+                return issue_type['id']
+        raise JiraError(f'No sub-task issue type {name or ""} found'.strip())
+
+    def search(self, jql: str, fields: str = 'summary,labels', max_results: int = 100) -> list[dict]:
+        issues, start = [], 0
+        while True:
+            page = self.request(
+                'GET',
+                '/rest/api/2/search',
+                params={'jql': jql, 'fields': fields, 'startAt': start, 'maxResults': max_results},
+            )
+            issues.extend(page.get('issues', []))
+            start += len(page.get('issues', []))
+            if not page.get('issues') or start >= page.get('total', 0):
+                return issues
+
+    def bulk_create(self, issue_updates: list[dict]) -> dict:
+        """One bulk request; returns Jira's {'issues': [...], 'errors': [...]} response"""
+        response = self.session.post(
+            f'{self.base_url}/rest/api/2/issue/bulk',
+            json={'issueUpdates': issue_updates},
+            timeout=self.config.timeout,
+        )
+        if response.status_code in (201, 400):
+            # 400 means every element failed; the body still has per-element errors
+            body = response.json()
+            if 'issues' in body or 'errors' in body:
+                return body
+        if response.status_code == 429:
+            raise JiraError('rate limited', 429)
+        raise JiraError(f'Bulk create failed with {response.status_code}: {response.text[:300]}', response.status_code)
+
+    def close(self):
+        self.session.close()
+
+
+BrowserFallback = Callable[[str, list[dict]], Awaitable[list[SubtaskResult]]]
+
+
+@dataclass
+class SubtaskExecutor:
+    """Creates a plan's subtasks through the API, retrying safely and falling back to a browser for rejects"""
+
+    client: JiraClient
+    browser_fallback: Optional[BrowserFallback] = None
+    issue_type: Optional[str] = None
+    max_attempts: int = 4
+    backoff: float = 1.0
+    _issue_type_id: Optional[str] = field(default=None, init=False, repr=False)
+
+    def existing_subtasks(self, parent_key: str, labels: list[str]) -> dict[str, str]:
+        """Issue keys of subtasks under `parent_key` already carrying one of `labels`, by label"""
+        found = {}
+        for start in range(0, len(labels), BULK_LIMIT):
+            chunk = labels[start:start + BULK_LIMIT]
+            quoted = ', '.join(f'"{label}"' for label in chunk)
+            for issue in self.client.search(f'parent = {parent_key} AND labels in ({quoted})'):
+                for label in issue['fields'].get('labels', []):
+                    if label in chunk:
+                        found[label] = issue['key']
+        return found
+
+    def created_subtasks(self, parent_key: str, pending: dict[str, dict]) -> dict[str, str]:
+        """
+        Like existing_subtasks, but read from the parent issue rather than the
+        search index, which lags behind subtasks created moments ago
+        """
+        summaries = {subtask['summary'] for subtask in pending.values()}
+        found = {}
+        parent = self.client.get_issue(parent_key, fields='subtasks')
+        for subtask in parent['fields'].get('subtasks', []):
+            # the parent lists summaries only; labels are read for the candidates
+            if subtask.get('fields', {}).get('summary') not in summaries:
+                continue
+            for label in self.client.get_issue(subtask['key'], fields='labels')['fields'].get('labels', []):
+                if label in pending:
+                    found[label] = subtask['key']
+        return found
+
+    def _issue_update(self, project_key: str, parent_key: str, subtask: dict, label: str) -> dict:
+        fields = {
+            'project': {'key': project_key},
+            'parent': {'key': parent_key},
+            'issuetype': {'id': self._issue_type_id},
+            'summary': subtask['summary'],
+            'description': subtask.get('description', ''),
+            'labels': list(subtask.get('labels', [])) + [label],
+        }
+        if subtask.get('priority'):
+            fields['priority'] = {'name': subtask['priority']}
+        return {'fields': fields}
+
+    def create_subtasks_api(self, parent_key: str, subtasks: list[dict]) -> list[SubtaskResult]:
+        """API path only; rejected items come back with status 'rejected'"""
+        try:
+            parent = self.client.get_issue(parent_key)
+            if self._issue_type_id is None:
+                self._issue_type_id = self.client.subtask_issue_type(self.issue_type)
+        except (JiraError, requests.RequestException) as e:
+            # the API is unusable (auth, missing parent, ...): everything goes to the fallback
+            logger.warning(f'Jira API unavailable for {parent_key}: {e}')
+            return [SubtaskResult(s['summary'], 'rejected', error=str(e)) for s in subtasks]
+        project_key = parent['fields']['project']['key']
+
+        labels = [idempotency_label(parent_key, subtask) for subtask in subtasks]
+        results: dict[str, SubtaskResult] = {}
+        for start in range(0, len(subtasks), BULK_LIMIT):
+            batch = list(zip(labels[start:start + BULK_LIMIT], subtasks[start:start + BULK_LIMIT]))
+            results.update(self._create_batch(project_key, parent_key, batch))
+        return [results[label] for label in labels]
+
+    def _create_batch(self, project_key: str, parent_key: str, batch: list[tuple[str, dict]]) -> dict[str, SubtaskResult]:
+        results: dict[str, SubtaskResult] = {}
+        pending = dict(batch)
+        for attempt in range(1, self.max_attempts + 1):
+            try:
+                # anything a previous (possibly timed out) attempt created is not sent again
+                existing = self.existing_subtasks(parent_key, list(pending))
+                if attempt > 1:
+                    missing = {label: subtask for label, subtask in pending.items() if label not in existing}
+                    existing.update(self.created_subtasks(parent_key, missing))
+                for label, key in existing.items():
+                    status = 'existing' if attempt == 1 else 'created'
+                    results[label] = SubtaskResult(pending.pop(label)['summary'], status, key=key)
+                if not pending:
+                    break
+                items = list(pending.items())
+                body = self.client.bulk_create(
+                    [self._issue_update(project_key, parent_key, subtask, label) for label, subtask in items]
+                )
+            except (JiraError, requests.RequestException) as e:
+                transient = not isinstance(e, JiraError) or e.status in (None, 429) or e.status >= 500
+                if not transient or attempt == self.max_attempts:
+                    for label, subtask in pending.items():
+                        results[label] = SubtaskResult(subtask['summary'], 'failed' if transient else 'rejected', error=str(e))
+                    break
+                delay = self.backoff * 2 ** (attempt - 1)
+                logger.warning(f'Bulk create attempt {attempt} failed ({e}), retrying in {delay:.1f}s')
+                time.sleep(delay)
+                continue
+
+            failed = {error['failedElementNumber']: error for error in body.get('errors', [])}
+            created = iter(body.get('issues', []))
+            for number, (label, subtask) in enumerate(items):
+                if number in failed:
+                    element_errors = failed[number].get('elementErrors', {})
+                    message = '; '.join(
+                        list(element_errors.get('errorMessages', []))
+                        + [f'{k}: {v}' for k, v in element_errors.get('errors', {}).items()]
+                    )
+                    results[label] = SubtaskResult(subtask['summary'], 'rejected', error=message or 'rejected')
+                else:
+                    results[label] = SubtaskResult(subtask['summary'], 'created', key=next(created)['key'])
+            break
+        return results
+
+    async def create_subtasks(self, parent_key: str, subtasks: list[dict]) -> list[SubtaskResult]:
+        """Create through the API, then send only the rejected items to the browser fallback"""
+        results = await asyncio.to_thread(self.create_subtasks_api, parent_key, subtasks)
+        rejected = [i for i, result in enumerate(results) if result.status == 'rejected']
+        if rejected and self.browser_fallback is not None:
+            logger.info(f'{len(rejected)} subtasks rejected by the API, creating them in the browser')
+            fallback = await self.browser_fallback(parent_key, [subtasks[i] for i in rejected])
+            for i, result in zip(rejected, fallback):
+                results[i] = result
+        return results
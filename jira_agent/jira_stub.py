@@ -0,0 +1,207 @@
+"""
+Local in-memory Jira stub for exercising the REST executor without a real instance.
+
+Implements the handful of REST v2 endpoints jira_api.py uses. It validates
+priorities like Jira does, and can be told to reject summaries, to drop the
+connection after committing a bulk request, which simulates a timeout whose
+write still went through, or to keep new issues out of search results for a
+while, as Jira's eventually consistent search index does.
+
+    python -m jira_agent.jira_stub --port 8089
+"""
+
+import argparse
+import json
+import logging
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {'Highest', 'High', 'Medium', 'Low', 'Lowest'}
+ISSUE_TYPES = [
+    {'id': '10001', 'name': 'Story', 'subtask': False},
+    {'id': '10003', 'name': 'Sub-task', 'subtask': True},
+]
+
+_PARENT_JQL = re.compile(r'parent\s*=\s*"?([\w-]+)"?', re.IGNORECASE)
+_LABELS_JQL = re.compile(r'labels\s+in\s*\(([^)]*)\)', re.IGNORECASE)
+
+
+class JiraStub:
+    def __init__(self, project_key: str = 'MP', port: int = 0, latency: float = 0.0):
+        self.project_key = project_key
+        self.latency = latency
+        self.issues: dict[str, dict] = {}
+        # summaries the stub refuses to create, as if a field validator failed
+        self.reject_summaries: set[str] = set()
+        # number of upcoming bulk requests to commit but answer by dropping the connection
+        self.drop_after_commit = 0
+        # seconds a created issue stays invisible to JQL search
+        self.search_delay = 0.0
+        self._created_at: dict[str, float] = {}
+        self.requests: list[tuple[str, str]] = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self.add_issue(f'{project_key}-1', 'JWT Authentication Implementation', issue_type=ISSUE_TYPES[0])
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), _handler(self))
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def add_issue(self, key: Optional[str], summary: str, issue_type: dict = ISSUE_TYPES[1], **fields) -> dict:
+        with self._lock:
+            key = key or f'{self.project_key}-{len(self.issues) + 1}'
+            issue = {
+                'id': str(self._next_id),
+                'key': key,
+                'fields': {'summary': summary, 'project': {'key': self.project_key}, 'issuetype': issue_type, **fields},
+            }
+            self._next_id += 1
+            self.issues[key] = issue
+            self._created_at[key] = time.monotonic()
+            return issue
+
+    def subtasks(self, parent_key: str) -> list[dict]:
+        return [i for i in self.issues.values() if i['fields'].get('parent', {}).get('key') == parent_key]
+
+    def validate(self, fields: dict) -> dict[str, str]:
+        errors = {}
+        if not fields.get('summary'):
+            errors['summary'] = 'You must specify a summary of the issue.'
+        elif fields['summary'] in self.reject_summaries:
+            errors['summary'] = 'Summary rejected by a workflow validator.'
+        parent = fields.get('parent', {}).get('key')
+        if parent and parent not in self.issues:
+            errors['parent'] = f'Issue {parent} does not exist.'
+        priority = fields.get('priority', {}).get('name')
+        if priority is not None and priority not in PRIORITIES:
+            errors['priority'] = 'Specify a valid priority.'
+        if any(' ' in label for label in fields.get('labels', [])):
+            errors['labels'] = 'Labels cannot contain spaces.'
+        return errors
+
+    def create(self, fields: dict) -> dict:
+        issue_type = next((t for t in ISSUE_TYPES if t['id'] == fields.get('issuetype', {}).get('id')), ISSUE_TYPES[1])
+        extra = {k: v for k, v in fields.items() if k not in ('summary', 'project', 'issuetype')}
+        issue = self.add_issue(None, fields['summary'], issue_type=issue_type, **extra)
+        return {'id': issue['id'], 'key': issue['key'], 'self': f"{self.base_url}/rest/api/2/issue/{issue['id']}"}
+
+    def get(self, key: str) -> Optional[dict]:
+        issue = self.issues.get(key)
+        if issue is None:
+            return None
+        # the issue itself is read from the database, subtasks included
+        subtasks = [{'id': i['id'], 'key': i['key'], 'fields': {'summary': i['fields']['summary']}} for i in self.subtasks(key)]
+        return {**issue, 'fields': {**issue['fields'], 'subtasks': subtasks}}
+
+    def search(self, jql: str) -> list[dict]:
+        indexed_before = time.monotonic() - self.search_delay
+        issues = [i for i in self.issues.values() if self._created_at[i['key']] <= indexed_before]
+        if match := _PARENT_JQL.search(jql):
+            issues = [i for i in issues if i['fields'].get('parent', {}).get('key') == match.group(1)]
+        if match := _LABELS_JQL.search(jql):
+            wanted = {label.strip().strip('"\'') for label in match.group(1).split(',')}
+            issues = [i for i in issues if wanted & set(i['fields'].get('labels', []))]
+        return issues
+
+
+def _handler(stub: JiraStub):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            logger.debug(format % args)
+
+        def _send(self, status: int, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _begin(self):
+            stub.requests.append((self.command, self.path))
+            if stub.latency:
+                time.sleep(stub.latency)
+            return urlsplit(self.path)
+
+        def do_GET(self):
+            url = self._begin()
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == '/rest/api/2/issuetype':
+                return self._send(200, ISSUE_TYPES)
+            if url.path == '/rest/api/2/search':
+                issues = stub.search(query.get('jql', ''))
+                start, limit = int(query.get('startAt', 0)), int(query.get('maxResults', 50))
+                return self._send(200, {'startAt': start, 'total': len(issues), 'issues': issues[start:start + limit]})
+            if url.path.startswith('/rest/api/2/issue/'):
+                issue = stub.get(url.path.rsplit('/', 1)[-1])
+                if issue is None:
+                    return self._send(404, {'errorMessages': ['Issue does not exist or you do not have permission to see it.']})
+                return self._send(200, issue)
+            self._send(404, {'errorMessages': [f'No endpoint {url.path}']})
+
+        def do_POST(self):
+            url = self._begin()
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            if url.path == '/rest/api/2/issue':
+                errors = stub.validate(body.get('fields', {}))
+                if errors:
+                    return self._send(400, {'errorMessages': [], 'errors': errors})
+                return self._send(201, stub.create(body['fields']))
+            if url.path == '/rest/api/2/issue/bulk':
+                issues, errors = [], []
+                for number, update in enumerate(body.get('issueUpdates', [])):
+                    element_errors = stub.validate(update.get('fields', {}))
+                    if element_errors:
+                        errors.append(
+                            {
+                                'status': 400,
+                                'elementErrors': {'errorMessages': [], 'errors': element_errors},
+                                'failedElementNumber': number,
+                            }
+                        )
+                    else:
+                        issues.append(stub.create(update['fields']))
+                if stub.drop_after_commit > 0:
+                    stub.drop_after_commit -= 1
+                    self.close_connection = True
+                    self.connection.close()
+                    return
+                return self._send(201 if issues else 400, {'issues': issues, 'errors': errors})
+            self._send(404, {'errorMessages': [f'No endpoint {url.path}']})
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local Jira REST stub')
+    parser.add_argument('--port', type=int, default=8089)
+    parser.add_argument('--project', default='MP')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    with JiraStub(args.project, args.port) as stub:
+        print(f'Jira stub listening on {stub.base_url} (JIRA_BASE_URL={stub.base_url})')
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
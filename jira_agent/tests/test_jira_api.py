@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+import pytest
+
+from jira_agent.jira_api import JiraClient, JiraConfig, SubtaskExecutor, SubtaskResult
+from jira_agent.jira_stub import JiraStub
+
+
+def _plan(count):
+    return [
+        {"summary": f"Subtask {i}", "description": f"Do part {i}", "priority": "Medium", "labels": ["authentication"]}
+        for i in range(count)
+    ]
+
+@pytest.fixture
+def stub():
+    with JiraStub() as stub:
+        yield stub
+
+@pytest.fixture
+def client(stub):
+    client = JiraClient(JiraConfig(base_url=stub.base_url))
+    yield client
+    client.close()
+
+def test_bulk_creates_fifty_subtasks_in_one_request(stub, client):
+    start = time.perf_counter()
+    results = asyncio.run(SubtaskExecutor(client).create_subtasks("MP-1", _plan(50)))
+    assert time.perf_counter() - start < 5
+    assert [r.status for r in results] == ["created"] * 50
+    assert len(stub.subtasks("MP-1")) == 50
+    assert [p for m, p in stub.requests if m == "POST"] == ["/rest/api/2/issue/bulk"]
+
+def test_rerun_does_not_duplicate(stub, client):
+    executor = SubtaskExecutor(client)
+    asyncio.run(executor.create_subtasks("MP-1", _plan(3)))
+    results = asyncio.run(executor.create_subtasks("MP-1", _plan(3)))
+    assert [r.status for r in results] == ["existing"] * 3
+    assert len(stub.subtasks("MP-1")) == 3
+
+def test_retry_after_lost_response_does_not_duplicate(stub, client):
+    stub.drop_after_commit = 1
+    results = asyncio.run(SubtaskExecutor(client, backoff=0).create_subtasks("MP-1", _plan(4)))
+    assert [r.status for r in results] == ["created"] * 4
+    assert all(r.key for r in results)
+    assert len(stub.subtasks("MP-1")) == 4
+
+def test_retry_does_not_duplicate_while_search_lags(stub, client):
+    stub.drop_after_commit = 1
+    stub.search_delay = 60
+    results = asyncio.run(SubtaskExecutor(client, backoff=0).create_subtasks("MP-1", _plan(4)))
+    assert [r.status for r in results] == ["created"] * 4
+    assert len(stub.subtasks("MP-1")) == 4
+
+def test_only_rejected_items_go_to_browser(stub, client):
+    plan = _plan(3)
+    plan[1]["priority"] = "Urgent"
+    handed_over = []
+
+    async def fallback(parent_key, subtasks):
+        handed_over.extend(s["summary"] for s in subtasks)
+        return [SubtaskResult(s["summary"], "browser") for s in subtasks]
+
+    results = asyncio.run(SubtaskExecutor(client, browser_fallback=fallback).create_subtasks("MP-1", plan))
+    assert [r.status for r in results] == ["created", "browser", "created"]
+    assert handed_over == ["Subtask 1"]
+
+def test_unknown_parent_is_rejected(client):
+    results = asyncio.run(SubtaskExecutor(client).create_subtasks("MP-404", _plan(2)))
+    assert [r.status for r in results] == ["rejected"] * 2
@@ -0,0 +1,220 @@
+"""
+Content-addressed cache for the CV and everything derived from it.
+
+The PDF is parsed once per distinct file content: the extracted text, a compact
+structured profile (contact details, skills, titles, experience) and token counts are stored on disk under the SHA-256 of the
+file bytes, so repeated runs and repeated read_cv calls skip PDF parsing.
+"""
+
+import hashlib
+import logging
+import re
+from datetime import date
+from pathlib import Path
+from typing import Optional
+
+from pydantic import BaseModel
+from PyPDF2 import PdfReader
+
+from common.tokens import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Bump when the extraction logic changes so stale cache entries are rebuilt
+CACHE_VERSION = 2
+
+KNOWN_SKILLS = [
+	'Python', 'Java', 'Kotlin', 'Scala', 'Go', 'Rust', 'C++', 'C#', 'JavaScript', 'TypeScript', 'PHP', 'Ruby', 'SQL',
+	'Spring', 'Spring Boot', 'Django', 'Flask', 'FastAPI', 'Node.js', 'React', 'ReactJs', 'Angular', 'Vue', 'GraphQL',
+	'REST', 'gRPC', 'Kafka', 'RabbitMQ', 'Postgres', 'PostgreSQL', 'MySQL', 'MongoDB', 'Redis', 'Elasticsearch',
+	'Cassandra', 'DynamoDB', 'Docker', 'Kubernetes', 'Istio', 'Terraform', 'Ansible', 'Jenkins', 'Buildkite',
+	'AWS', 'GCP', 'Azure', 'BigQuery', 'Spark', 'Hadoop', 'Airflow', 'Datadog', 'Prometheus', 'Grafana',
+	'Machine Learning', 'Deep Learning', 'NLP', 'Computer Vision', 'PyTorch', 'TensorFlow', 'scikit-learn',
+	'Pandas', 'NumPy', 'LLM', 'Microservices', 'Junit', 'Mockito', 'TDD', 'CI/CD', 'Linux', 'Git',
+]
+
+_TITLE_WORDS = (
+	'engineer', 'developer', 'scientist', 'architect', 'manager', 'lead', 'intern', 'analyst',
+	'consultant', 'researcher', 'sde', 'director', 'head of',
+)
+
+_MONTH_YEAR = r'(?:(\d{1,2})/)?((?:19|20)\d{2})'
+_DATE_RANGE = re.compile(
+	_MONTH_YEAR + r'\s*(?:to|-|–|—)\s*(?:' + _MONTH_YEAR + r'|(current|present|now|today))',
+	re.IGNORECASE,
+)
+_STATED_YEARS = re.compile(r'(\d{1,2})\+?\s*years? of (?:professional )?experience', re.IGNORECASE)
+_EMAIL = re.compile(r'[\w.+-]+@[\w-]+(?:\.[\w-]+)+')
+_PHONE = re.compile(r'\+?\d[\d ()./-]{6,}\d')
+_URL = re.compile(r'(?:https?://|www\.)[^\s|,]+', re.IGNORECASE)
+_NAME = re.compile(r"[A-Za-zÀ-ÿ'-]+(?: [A-Za-zÀ-ÿ'-]+){1,3}")
+
+
+class CVProfile(BaseModel):
+	name: Optional[str] = None
+	email: Optional[str] = None
+	phone: Optional[str] = None
+	location: Optional[str] = None
+	links: list[str] = []
+	skills: list[str] = []
+	titles: list[str] = []
+	years_experience: Optional[float] = None
+
+
+class CVArtifacts(BaseModel):
+	sha256: str
+	source: str
+	text: str
+	profile: CVProfile
+	text_tokens: int
+	profile_tokens: int
+
+	def compact(self) -> str:
+		"""Profile serialized as small as possible for the prompt"""
+		return self.profile.model_dump_json(exclude_none=True)
+
+
+class CVCache:
+	def __init__(self, cache_dir: Path):
+		self.cache_dir = Path(cache_dir)
+		self.cache_dir.mkdir(parents=True, exist_ok=True)
+		# (path, size, mtime) -> artifacts, so unchanged files are not even re-hashed in-process
+		self._memory: dict[tuple, CVArtifacts] = {}
+
+	def load(self, path: Path) -> CVArtifacts:
+		path = Path(path)
+		stat = path.stat()
+		memo_key = (str(path.absolute()), stat.st_size, stat.st_mtime_ns)
+		if memo_key in self._memory:
+			return self._memory[memo_key]
+
+		data = path.read_bytes()
+		digest = hashlib.sha256(data).hexdigest()
+		cache_file = self.cache_dir / f'{digest}.v{CACHE_VERSION}.json'
+
+		if cache_file.exists():
+			try:
+				artifacts = CVArtifacts.model_validate_json(cache_file.read_text())
+				logger.info(f'Loaded cached cv artifacts for {path.name} ({digest[:12]})')
+			except ValueError as e:
+				logger.warning(f'Ignoring corrupt cv cache entry {cache_file}: {e}')
+				artifacts = self._build(path, digest)
+				self._write(cache_file, artifacts)
+		else:
+			artifacts = self._build(path, digest)
+			self._write(cache_file, artifacts)
+
+		self._memory[memo_key] = artifacts
+		return artifacts
+
+	def _build(self, path: Path, digest: str) -> CVArtifacts:
+		pdf = PdfReader(path)
+		text = ''
+		for page in pdf.pages:
+			text += page.extract_text() or ''
+		logger.info(f'Parsed cv {path.name} with {len(text)} characters')
+
+		profile = extract_profile(text)
+		return CVArtifacts(
+			sha256=digest,
+			source=path.name,
+			text=text,
+			profile=profile,
+			text_tokens=count_tokens(text),
+			profile_tokens=count_tokens(profile.model_dump_json(exclude_none=True)),
+		)
+
+	def _write(self, cache_file: Path, artifacts: CVArtifacts):
+		# write-then-rename so concurrent readers never see a partial file
+		tmp = cache_file.with_suffix('.tmp')
+		tmp.write_text(artifacts.model_dump_json())
+		tmp.replace(cache_file)
+
+
+def extract_profile(text: str) -> CVProfile:
+	"""Pull skills, job titles and years of experience out of free CV text"""
+	normalized = re.sub(r'\s+', ' ', text)
+
+	skills = []
+	seen = set()
+	for skill in KNOWN_SKILLS:
+		pattern = r'(?<![\w+#])' + re.escape(skill) + r'(?![\w+#])'
+		# short names and acronyms (Go, REST, SQL) only count with their exact casing
+		flags = 0 if len(skill) <= 4 else re.IGNORECASE
+		if re.search(pattern, normalized, flags) and skill.lower() not in seen:
+			seen.add(skill.lower())
+			skills.append(skill)
+
+	titles = []
+	periods = []
+	for line in text.splitlines():
+		match = _DATE_RANGE.search(line)
+		if not match:
+			continue
+		start = _to_months(match.group(1), match.group(2))
+		end = _current_months() if match.group(5) else _to_months(match.group(3), match.group(4))
+		if end >= start:
+			periods.append((start, end))
+		title = re.sub(r'\s+', ' ', line[match.end() :]).strip(' -|,')
+		if title and len(title) <= 80 and any(word in title.lower() for word in _TITLE_WORDS) and title not in titles:
+			titles.append(title)
+
+	years = _merged_years(periods)
+	stated = [int(m) for m in _STATED_YEARS.findall(normalized)]
+	if stated and (years is None or max(stated) > years):
+		years = float(max(stated))
+
+	return CVProfile(**extract_contact(text), skills=skills, titles=titles, years_experience=years)
+
+
+def extract_contact(text: str) -> dict:
+	"""Name, email, phone, location and links from the CV header"""
+	lines = [re.sub(r'\s+', ' ', line).strip() for line in text.splitlines()]
+	lines = [line for line in lines if line]
+	contact: dict = {'links': [url.rstrip('/.') for url in _URL.findall(text)][:5]}
+
+	email = _EMAIL.search(text)
+	if email:
+		contact['email'] = email.group()
+	# the header sits above the first section, the name is its first line that is only words
+	header = lines[:6]
+	for line in header:
+		if _NAME.fullmatch(line) and not any(word in line.lower() for word in _TITLE_WORDS):
+			contact['name'] = line.title() if line.isupper() else line
+			break
+	for line in header:
+		if '@' not in line and not _PHONE.search(line):
+			continue
+		for part in re.split(r'\s*[|•·]\s*', line):
+			phone = _PHONE.fullmatch(part)
+			if phone and 'phone' not in contact:
+				contact['phone'] = part
+			elif not phone and '@' not in part and not _URL.search(part) and re.search(r'[A-Za-z]{3}', part):
+				contact.setdefault('location', re.sub(r'\s*,\s*', ', ', part))
+	return contact
+
+
+def _to_months(month: Optional[str], year: str) -> int:
+	return int(year) * 12 + (int(month) - 1 if month else 0)
+
+
+def _current_months() -> int:
+	today = date.today()
+	return today.year * 12 + today.month - 1
+
+
+def _merged_years(periods: list[tuple[int, int]]) -> Optional[float]:
+	"""Total time covered by (possibly overlapping) employment periods"""
+	if not periods:
+		return None
+	total = 0
+	current_start, current_end = None, None
+	for start, end in sorted(periods):
+		if current_end is None or start > current_end:
+			if current_end is not None:
+				total += current_end - current_start
+			current_start, current_end = start, end
+		else:
+			current_end = max(current_end, end)
+	total += current_end - current_start
+	return round(total / 12, 1)
@@ -0,0 +1,316 @@
+"""
+Fills a whole application form from the CV profile in one pass.
+
+Every input, select, textarea and file input of the page (iframes included,
+most applicant tracking systems embed their form) is listed in one script
+call per frame. Fields are matched to profile values by their autocomplete
+hint, label, name and placeholder, filled in one more script call per frame,
+and the CV is attached to the resume upload directly. Only the fields left
+over (questions, consents, values the CV does not have) go back to the LLM.
+"""
+
+import logging
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+from job_search_agent.cv_cache import CVProfile
+
+logger = logging.getLogger(__name__)
+
+# Fields of the page, tagged with data-agent-field so they can be filled without indexes
+FORM_FIELDS_JS = """() => {
+	const clean = s => (s || '').trim().replace(/\\s+/g, ' ').slice(0, 200);
+	const text = el => el ? clean(el.innerText || el.textContent) : '';
+	const visible = el => {
+		const rect = el.getBoundingClientRect();
+		const style = getComputedStyle(el);
+		return rect.width > 0 && rect.height > 0 && style.visibility !== 'hidden' && style.display !== 'none';
+	};
+	const labelOf = el => {
+		if (el.labels && el.labels.length) return text(el.labels[0]);
+		const labelledBy = el.getAttribute('aria-labelledby');
+		if (labelledBy) return clean(labelledBy.split(/\\s+/).map(id => text(document.getElementById(id))).join(' '));
+		if (el.getAttribute('aria-label')) return clean(el.getAttribute('aria-label'));
+		const group = el.closest('fieldset, .form-group, [class*="field"], [class*="question"]');
+		const label = group && group.querySelector('legend, label, [class*="label"]');
+		return label ? text(label) : '';
+	};
+	const fields = [];
+	const radios = {};
+	let next = 0;
+	for (const el of document.querySelectorAll('input, select, textarea')) {
+		const type = (el.getAttribute('type') || el.tagName).toLowerCase();
+		if (['hidden', 'submit', 'button', 'reset', 'image', 'password', 'search'].includes(type) || el.disabled || el.readOnly) continue;
+		// styled uploads hide the real file input behind a button
+		if (type !== 'file' && !visible(el)) continue;
+		const id = String(next++);
+		el.setAttribute('data-agent-field', id);
+		const entry = {
+			id, type, tag: el.tagName.toLowerCase(), name: el.name || el.id || '', label: labelOf(el),
+			autocomplete: (el.getAttribute('autocomplete') || '').toLowerCase(), placeholder: el.placeholder || '',
+			required: el.required || el.getAttribute('aria-required') === 'true', value: type === 'file' ? '' : (el.value || ''),
+			accept: el.accept || '', options: [],
+		};
+		if (el.tagName === 'SELECT') {
+			entry.options = [...el.options].filter(o => !o.disabled && o.value).map(o => ({value: o.value, text: clean(o.text)}));
+			if (el.selectedIndex > 0 || (el.value && entry.options.length && entry.options[0].value !== el.value)) entry.value = el.value;
+			else entry.value = '';
+		} else if (type === 'radio') {
+			// one entry per radio group, its options are the buttons
+			const group = radios[el.name];
+			const option = {value: el.value, text: text(el.labels && el.labels[0]) || el.value};
+			if (group) { group.options.push(option); if (el.checked) group.value = el.value; continue; }
+			entry.label = text(el.closest('fieldset') && el.closest('fieldset').querySelector('legend')) || entry.label;
+			entry.options = [option];
+			entry.value = el.checked ? el.value : '';
+			radios[el.name] = entry;
+		} else if (type === 'checkbox') {
+			entry.value = el.checked ? 'checked' : '';
+		}
+		fields.push(entry);
+	}
+	return fields;
+}"""
+
+# Sets values the way typing would, through the native setter so React-controlled inputs notice
+FILL_FIELDS_JS = """(fills) => {
+	const failed = [];
+	for (const {id, value} of fills) {
+		const el = document.querySelector(`[data-agent-field="${id}"]`);
+		if (!el) { failed.push(id); continue; }
+		const proto = el.tagName === 'SELECT' ? HTMLSelectElement.prototype
+			: el.tagName === 'TEXTAREA' ? HTMLTextAreaElement.prototype : HTMLInputElement.prototype;
+		el.focus();
+		Object.getOwnPropertyDescriptor(proto, 'value').set.call(el, value);
+		for (const type of ['input', 'change']) el.dispatchEvent(new Event(type, {bubbles: true}));
+		el.blur();
+		if (el.value !== value) failed.push(id);
+	}
+	return failed;
+}"""
+
+# autocomplete tokens (https://html.spec.whatwg.org/#autofill-field) to profile values
+AUTOCOMPLETE = {
+	'name': 'full_name',
+	'given-name': 'first_name',
+	'family-name': 'last_name',
+	'email': 'email',
+	'tel': 'phone',
+	'tel-national': 'phone',
+	'url': 'website',
+	'address-level2': 'city',
+	'country': 'country',
+	'country-name': 'country',
+	'organization-title': 'current_title',
+}
+
+# Checked in order against the label, then the name and placeholder; the first match wins
+FIELD_PATTERNS = [
+	(key, re.compile(pattern, re.IGNORECASE))
+	for key, pattern in (
+		('first_name', r'first.?name|given.?name|fore.?name|\bfname\b|vorname'),
+		('last_name', r'last.?name|family.?name|sur.?name|\blname\b|nachname'),
+		('email', r'e.?mail'),
+		('phone', r'phone|mobile|\btel\b|telefon|cell'),
+		('linkedin', r'linked.?in'),
+		('github', r'git.?hub'),
+		('website', r'website|portfolio|personal.?(?:site|url|page)|\bblog\b'),
+		('years_experience', r'years.{0,20}experience|experience.{0,10}years'),
+		('current_title', r'current.{0,10}(?:title|position|role)|job.?title|headline'),
+		('city', r'\bcity\b|\btown\b|\bort\b'),
+		('country', r'\bcountry\b|\bland\b'),
+		('location', r'location|address|where.{0,20}based|wohnort'),
+		('full_name', r'^\W*(?:full|your|legal)?[\s_-]*name\W*$'),
+	)
+]
+# Labels that only look like applicant details (company name, referrer's email, ...)
+NOT_APPLICANT = re.compile(r'company|employer|school|university|referr|reference|recruiter|emergency|manager|hiring', re.IGNORECASE)
+RESUME_UPLOAD = re.compile(r'resume|\bcv\b|curriculum|lebenslauf', re.IGNORECASE)
+OTHER_UPLOAD = re.compile(r'cover|letter|photo|picture|avatar|image|transcript|portfolio|certificate', re.IGNORECASE)
+
+
+@dataclass
+class FormField:
+	# Playwright frame the field was listed in; page.frames changes as iframes load and unload
+	frame: Any = field(repr=False, compare=False)
+	id: str
+	type: str
+	tag: str
+	name: str = ''
+	label: str = ''
+	autocomplete: str = ''
+	placeholder: str = ''
+	required: bool = False
+	value: str = ''
+	accept: str = ''
+	options: list[dict] = field(default_factory=list)
+
+	@property
+	def selector(self) -> str:
+		return f'[data-agent-field="{self.id}"]'
+
+	def describe(self) -> str:
+		"""One line for the LLM: what the field asks and how to answer it"""
+		text = self.label or self.placeholder or self.name or self.type
+		details = [self.type] + (['required'] if self.required else [])
+		if self.options:
+			shown = ', '.join(option['text'] for option in self.options[:10])
+			details.append(f'options: {shown}' + (', ...' if len(self.options) > 10 else ''))
+		return f'{text} ({"; ".join(details)})'
+
+
+@dataclass
+class FillReport:
+	filled: list[str] = field(default_factory=list)
+	attached: Optional[str] = None
+	unresolved: list[FormField] = field(default_factory=list)
+
+	def summary(self) -> str:
+		lines = [f'Filled {len(self.filled)} fields from my cv: {", ".join(self.filled) or "none"}.']
+		if self.attached:
+			lines.append(f'Attached my cv to "{self.attached}".')
+		if self.unresolved:
+			lines.append('Fill these yourself (already filled fields are not listed):')
+			lines += [f'- {f.describe()}' for f in self.unresolved]
+		else:
+			lines.append('No fields left to fill, review the form and submit it.')
+		return '\n'.join(lines)
+
+
+def applicant_values(profile: CVProfile) -> dict[str, str]:
+	"""Form values the CV profile can answer, by field key"""
+	values: dict[str, str] = {}
+	if profile.name:
+		parts = profile.name.split()
+		values.update(full_name=profile.name, first_name=parts[0], last_name=' '.join(parts[1:]) or parts[0])
+	if profile.email:
+		values['email'] = profile.email
+	if profile.phone:
+		values['phone'] = profile.phone
+	if profile.location:
+		parts = [part.strip() for part in profile.location.split(',') if part.strip() and not part.strip().isdigit()]
+		values['location'] = ', '.join(parts)
+		values['city'] = parts[0]
+		if len(parts) > 1:
+			values['country'] = parts[-1]
+	for link in profile.links:
+		key = 'linkedin' if 'linkedin.' in link else 'github' if 'github.' in link else 'website'
+		values.setdefault(key, link if link.startswith('http') else f'https://{link}')
+	if profile.years_experience is not None:
+		values['years_experience'] = str(int(profile.years_experience))
+	if profile.titles:
+		values['current_title'] = profile.titles[0]
+	return values
+
+
+def classify(form_field: FormField) -> Optional[str]:
+	"""Profile key the field asks for, 'resume' for the CV upload, None when it is something else"""
+	if form_field.type == 'file':
+		described = f'{form_field.label} {form_field.name} {form_field.placeholder}'
+		if RESUME_UPLOAD.search(described):
+			return 'resume'
+		return None if OTHER_UPLOAD.search(described) else 'upload'
+	if form_field.type in ('checkbox', 'radio'):
+		# consents and yes/no questions need judgement
+		return None
+	if NOT_APPLICANT.search(form_field.label):
+		return None
+	for token in form_field.autocomplete.split():
+		if token in AUTOCOMPLETE:
+			return AUTOCOMPLETE[token]
+	if form_field.type == 'email':
+		return 'email'
+	if form_field.type == 'tel':
+		return 'phone'
+	for text in (form_field.label, form_field.name, form_field.placeholder):
+		if not text:
+			continue
+		for key, pattern in FIELD_PATTERNS:
+			if pattern.search(text):
+				return key
+	return None
+
+
+def choose_option(options: list[dict], value: str) -> Optional[str]:
+	"""Value of the select option matching `value`, exact text first, then containment"""
+	wanted = value.strip().lower()
+	for option in options:
+		if wanted in (option['text'].lower(), option['value'].lower()):
+			return option['value']
+	for option in options:
+		text = option['text'].lower()
+		if text and (wanted in text or text in wanted):
+			return option['value']
+	return None
+
+
+def plan_fill(fields: list[FormField], values: dict[str, str]) -> tuple[list[tuple[FormField, str]], Optional[FormField], list[FormField]]:
+	"""(field, value) pairs to fill, the file input for the CV and the empty fields nobody can answer"""
+	fills, unresolved = [], []
+	uploads = [f for f in fields if f.type == 'file']
+	resume = next((f for f in uploads if classify(f) == 'resume'), None)
+	generic = [f for f in uploads if classify(f) == 'upload']
+	# the only upload not labeled as something else is the resume
+	if resume is None and len(generic) == 1:
+		resume = generic[0]
+	for form_field in fields:
+		if form_field is resume or form_field.value:
+			continue
+		key = classify(form_field)
+		value = values.get(key) if key else None
+		if value is not None and form_field.tag == 'select':
+			value = choose_option(form_field.options, value)
+		if value is None or form_field.type == 'file':
+			unresolved.append(form_field)
+		else:
+			fills.append((form_field, value))
+	return fills, resume, unresolved
+
+
+async def list_fields(page) -> list[FormField]:
+	"""Form fields of every frame of a Playwright page"""
+	fields = []
+	for frame in page.frames:
+		try:
+			items = await frame.evaluate(FORM_FIELDS_JS)
+		except Exception as e:
+			# detached or still loading frames
+			logger.debug(f'Skipping frame {frame.url}: {e}')
+			continue
+		fields += [FormField(frame=frame, **item) for item in items]
+	return fields
+
+
+async def fill_form(page, profile: CVProfile, cv_file: Path) -> FillReport:
+	"""Fill every field of the page the profile answers and attach the CV"""
+	fields = await list_fields(page)
+	fills, resume, unresolved = plan_fill(fields, applicant_values(profile))
+	report = FillReport(unresolved=unresolved)
+
+	batches: dict[Any, list[tuple[FormField, str]]] = {}
+	for form_field, value in fills:
+		batches.setdefault(form_field.frame, []).append((form_field, value))
+	for frame, batch in batches.items():
+		try:
+			failed = set(await frame.evaluate(FILL_FIELDS_JS, [{'id': f.id, 'value': value} for f, value in batch]))
+		except Exception as e:
+			# the frame was detached or navigated since the fields were listed
+			logger.debug(f'Filling frame {frame.url} failed: {e}')
+			failed = {f.id for f, _ in batch}
+		for form_field, _ in batch:
+			if form_field.id in failed:
+				report.unresolved.append(form_field)
+			else:
+				report.filled.append(form_field.label or form_field.name or form_field.type)
+
+	if resume is not None:
+		try:
+			await resume.frame.set_input_files(resume.selector, str(Path(cv_file).absolute()))
+			report.attached = resume.label or resume.name or 'file upload'
+		except Exception as e:
+			logger.debug(f'Attaching the cv failed: {e}')
+			report.unresolved.append(resume)
+	logger.info(f'Filled {len(report.filled)} of {len(fields)} form fields, {len(report.unresolved)} left for the agent')
+	return report
@@ -0,0 +1,139 @@
+"""
+Local pre-ranking of job listings against the CV.
+
+Listings and the CV are turned into TF-IDF vectors (words and word pairs,
+titles counted twice) and scored by cosine similarity in one batch of NumPy
+operations over a sparse (document, term) layout, so a thousand listings take
+milliseconds. The agent only reviews the top candidates instead of reading
+every listing.
+"""
+
+from itertools import chain
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# ASCII punctuation splits words; '+', '#' and '.' stay for c++, c#, node.js
+_SEPARATORS = str.maketrans({c: ' ' for c in map(chr, range(128)) if not (c.isalnum() or c in '+#.')})
+
+STOP_WORDS = frozenset(
+	'a an and are as at be by for from has have in is it its of on or our that the their this to we will with you your '
+	'job jobs role position team work working apply new join us'.split()
+)
+
+# Anchors that look like listings, with the text of the card around them
+LISTINGS_JS = """() => {
+	const seen = new Set();
+	const listings = [];
+	for (const a of document.querySelectorAll('a[href]')) {
+		const title = (a.innerText || '').trim().replace(/\\s+/g, ' ');
+		if (title.length < 4 || title.length > 200 || seen.has(a.href) || a.href.startsWith('javascript:')) continue;
+		seen.add(a.href);
+		const card = a.closest('li, article, tr, [class*="job"], [class*="result"], [class*="card"]') || a.parentElement;
+		const description = ((card && card.innerText) || '').trim().replace(/\\s+/g, ' ').slice(0, 1000);
+		listings.push({title, link: a.href, description});
+	}
+	return listings;
+}"""
+
+
+@dataclass
+class Listing:
+	title: str
+	link: str
+	description: str = ''
+
+
+@dataclass
+class RankedListing:
+	score: float
+	listing: Listing
+
+
+def _split(text: str) -> list[str]:
+	return text.lower().translate(_SEPARATORS).split()
+
+
+def _normalize(word: str) -> Optional[str]:
+	word = word.strip('.')
+	return word if len(word) > 1 and word not in STOP_WORDS else None
+
+
+def tokenize(text: str) -> list[str]:
+	"""Lower-cased words without stop words"""
+	return [word for word in map(_normalize, _split(text)) if word]
+
+
+class JobRanker:
+	"""Scores listings against one CV; build it once per CV and call rank() per page of listings"""
+
+	def __init__(self, cv_text: str):
+		self.cv_words = _split(cv_text)
+
+	def score(self, listings: list[Listing]) -> np.ndarray:
+		"""Cosine similarity of every listing with the CV, in listing order"""
+		n_docs = len(listings)
+		if not n_docs or not self.cv_words:
+			return np.zeros(n_docs, dtype=np.float32)
+
+		# one flat array of word ids for all listings, the CV last as document n_docs
+		texts = [_split(f'{listing.title} {listing.title} {listing.description}') for listing in listings]
+		texts.append(self.cv_words)
+		flat = list(chain.from_iterable(texts))
+		raw_ids = {word: i for i, word in enumerate(dict.fromkeys(flat))}
+		# every distinct raw word is normalized once ('aws.' is 'aws'), stop words map to -1
+		vocabulary: dict[str, int] = {}
+		normalized = np.full(len(raw_ids), -1, dtype=np.int64)
+		for i, raw in enumerate(raw_ids):
+			word = _normalize(raw)
+			if word:
+				normalized[i] = vocabulary.setdefault(word, len(vocabulary))
+		words = normalized[np.fromiter(map(raw_ids.__getitem__, flat), dtype=np.int64, count=len(flat))]
+		docs = np.repeat(np.arange(len(texts)), [len(text) for text in texts])
+		docs, words = docs[words >= 0], words[words >= 0]
+		if not len(words) or docs[-1] != n_docs:
+			return np.zeros(n_docs, dtype=np.float32)
+
+		# adjacent word pairs ("machine learning") within a document are terms too
+		n_words = len(vocabulary)
+		same_doc = docs[1:] == docs[:-1]
+		terms = np.concatenate([words, n_words + words[:-1][same_doc] * n_words + words[1:][same_doc]])
+		docs = np.concatenate([docs, docs[1:][same_doc]])
+		terms = np.unique(terms, return_inverse=True)[1].ravel()
+		n_terms = int(terms.max()) + 1
+
+		# term counts per (document, term) pair
+		pairs, counts = np.unique(docs * n_terms + terms, return_counts=True)
+		docs, terms = np.divmod(pairs, n_terms)
+		is_cv = docs == n_docs
+
+		# document frequency over the listings, smoothed as in scikit-learn
+		idf = np.log((1 + n_docs) / (1 + np.bincount(terms[~is_cv], minlength=n_terms))) + 1
+		weights = (1 + np.log(counts)) * idf[terms]
+
+		cv = np.zeros(n_terms)
+		cv[terms[is_cv]] = weights[is_cv]
+		cv_norm = np.linalg.norm(cv)
+		docs, terms, weights = docs[~is_cv], terms[~is_cv], weights[~is_cv]
+		norms = np.sqrt(np.bincount(docs, weights=weights**2, minlength=n_docs))
+		dots = np.bincount(docs, weights=weights * cv[terms], minlength=n_docs)
+		with np.errstate(divide='ignore', invalid='ignore'):
+			scores = np.where(norms > 0, dots / (norms * cv_norm), 0.0)
+		return scores.astype(np.float32)
+
+	def rank(self, listings: list[Listing], top_k: int = 10, min_score: float = 0.0) -> list[RankedListing]:
+		"""The top_k best matching listings scoring above min_score, best first"""
+		scores = self.score(listings)
+		if not len(scores):
+			return []
+		top_k = min(top_k, len(scores))
+		best = np.argpartition(-scores, top_k - 1)[:top_k]
+		best = best[np.argsort(-scores[best], kind='stable')]
+		return [RankedListing(float(scores[i]), listings[i]) for i in best if scores[i] > min_score]
+
+
+async def extract_listings(page, limit: Optional[int] = None) -> list[Listing]:
+	"""Listing-like links on a Playwright page"""
+	items = await page.evaluate(LISTINGS_JS)
+	return [Listing(**item) for item in items[:limit]]
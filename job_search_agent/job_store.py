@@ -0,0 +1,202 @@
+"""
+SQLite-backed store for scraped job listings.
+
+Listings are deduplicated on their normalized link (unique index, upsert
+semantics), written in batches, and read back through bounded, paged queries
+so the agent never has to pull the whole store into its prompt. CSV export is
+kept for humans.
+"""
+
+import csv
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ['Title', 'Company', 'Link', 'Salary', 'Location', 'Fit Score']
+
+# Query parameters that only track where a click came from, by exact name (utm_* by prefix)
+_TRACKING_PARAMS = {'gclid', 'fbclid', 'trk', 'ref', 'src', 'source'}
+_TRACKING_PREFIX = 'utm_'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+	id INTEGER PRIMARY KEY,
+	link TEXT NOT NULL,
+	title TEXT NOT NULL,
+	company TEXT NOT NULL,
+	fit_score REAL NOT NULL DEFAULT 0,
+	location TEXT,
+	salary TEXT,
+	created_at REAL NOT NULL,
+	updated_at REAL NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS jobs_link ON jobs (link);
+CREATE INDEX IF NOT EXISTS jobs_fit_score ON jobs (fit_score DESC);
+CREATE INDEX IF NOT EXISTS jobs_company ON jobs (company COLLATE NOCASE, fit_score DESC);
+"""
+
+_UPSERT = """
+INSERT INTO jobs (link, title, company, fit_score, location, salary, created_at, updated_at)
+VALUES (:link, :title, :company, :fit_score, :location, :salary, :now, :now)
+ON CONFLICT (link) DO UPDATE SET
+	title = excluded.title,
+	company = excluded.company,
+	fit_score = excluded.fit_score,
+	location = COALESCE(excluded.location, jobs.location),
+	salary = COALESCE(excluded.salary, jobs.salary),
+	updated_at = excluded.updated_at
+"""
+
+
+def _strip_tracking(query: str) -> str:
+	params = [
+		(key, value)
+		for key, value in parse_qsl(query, keep_blank_values=True)
+		if key.lower() not in _TRACKING_PARAMS and not key.lower().startswith(_TRACKING_PREFIX)
+	]
+	return urlencode(sorted(params))
+
+
+def normalize_link(link: str) -> str:
+	"""Canonical form of a job link so the same listing is stored once"""
+	parts = urlsplit(link.strip())
+	path = parts.path.rstrip('/') or '/'
+	fragment = ''
+	# hash-routed ATS pages (#/job/123, #!/job/123) identify the listing in the fragment, which can carry tracking params of its own
+	if parts.fragment.startswith(('/', '!')):
+		route, _, query = parts.fragment.partition('?')
+		query = _strip_tracking(query)
+		fragment = f'{route}?{query}' if query else route
+	return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, _strip_tracking(parts.query), fragment))
+
+
+class JobStore:
+	def __init__(self, path: str | Path = 'jobs.db', batch_size: int = 50):
+		self.path = Path(path)
+		self.batch_size = batch_size
+		self._pending: dict[str, dict] = {}
+		# actions run on worker threads, so one connection guarded by a lock
+		self._lock = threading.RLock()
+		self._conn = sqlite3.connect(self.path, check_same_thread=False)
+		self._conn.row_factory = sqlite3.Row
+		self._conn.execute('PRAGMA journal_mode=WAL')
+		self._conn.execute('PRAGMA synchronous=NORMAL')
+		self._conn.executescript(_SCHEMA)
+
+	def upsert(self, job: dict):
+		"""Queue a job for writing; it is flushed with the next batch"""
+		self.upsert_many([job])
+
+	def upsert_many(self, jobs: Iterable[dict]):
+		with self._lock:
+			for job in jobs:
+				row = {
+					'link': normalize_link(job['link']),
+					'title': job['title'],
+					'company': job['company'],
+					'fit_score': float(job.get('fit_score') or 0),
+					'location': job.get('location'),
+					'salary': job.get('salary'),
+				}
+				# later duplicates in the same batch win
+				self._pending[row['link']] = row
+			if len(self._pending) >= self.batch_size:
+				self.flush()
+
+	def flush(self):
+		with self._lock:
+			if not self._pending:
+				return
+			now = time.time()
+			rows = [dict(row, now=now) for row in self._pending.values()]
+			with self._conn:
+				self._conn.executemany(_UPSERT, rows)
+			logger.debug(f'Flushed {len(rows)} jobs to {self.path}')
+			self._pending.clear()
+
+	def query(
+		self,
+		limit: int = 10,
+		offset: int = 0,
+		company: Optional[str] = None,
+		location: Optional[str] = None,
+		min_score: Optional[float] = None,
+	) -> list[dict]:
+		"""Best matching jobs first, filtered and paged"""
+		where, params = self._filters(company, location, min_score)
+		sql = f'SELECT title, company, link, fit_score, location, salary FROM jobs {where} ORDER BY fit_score DESC, id LIMIT ? OFFSET ?'
+		with self._lock:
+			self.flush()
+			rows = self._conn.execute(sql, [*params, limit, offset]).fetchall()
+		return [dict(row) for row in rows]
+
+	def count(self, company: Optional[str] = None, location: Optional[str] = None, min_score: Optional[float] = None) -> int:
+		where, params = self._filters(company, location, min_score)
+		with self._lock:
+			self.flush()
+			return self._conn.execute(f'SELECT COUNT(*) FROM jobs {where}', params).fetchone()[0]
+
+	def links(self, company: Optional[str] = None) -> list[str]:
+		where, params = self._filters(company, None, None)
+		with self._lock:
+			self.flush()
+			return [row[0] for row in self._conn.execute(f'SELECT link FROM jobs {where} ORDER BY id', params)]
+
+	def export_csv(self, path: str | Path = 'jobs.csv') -> int:
+		"""Write every stored job to a CSV file for humans, best matches first"""
+		with self._lock:
+			self.flush()
+			rows = self._conn.execute(
+				'SELECT title, company, link, salary, location, fit_score FROM jobs ORDER BY fit_score DESC, id'
+			).fetchall()
+		with open(path, 'w', newline='') as f:
+			writer = csv.writer(f)
+			writer.writerow(CSV_COLUMNS)
+			writer.writerows(tuple(row) for row in rows)
+		return len(rows)
+
+	def import_csv(self, path: str | Path = 'jobs.csv') -> int:
+		"""Load jobs from a CSV written by export_csv or by the old append-only save_jobs"""
+		jobs = []
+		with open(path, newline='') as f:
+			for row in csv.reader(f):
+				if len(row) < 3 or row[0] == CSV_COLUMNS[0] or not row[2]:
+					continue
+				jobs.append(
+					{
+						'title': row[0],
+						'company': row[1],
+						'link': row[2],
+						'salary': row[3] or None if len(row) > 3 else None,
+						'location': row[4] or None if len(row) > 4 else None,
+						'fit_score': float(row[5]) if len(row) > 5 and row[5] else 0,
+					}
+				)
+		self.upsert_many(jobs)
+		self.flush()
+		return len(jobs)
+
+	def close(self):
+		with self._lock:
+			self.flush()
+			self._conn.close()
+
+	@staticmethod
+	def _filters(company: Optional[str], location: Optional[str], min_score: Optional[float]) -> tuple[str, list]:
+		clauses, params = [], []
+		if company:
+			clauses.append('company = ? COLLATE NOCASE')
+			params.append(company.strip())
+		if location:
+			clauses.append('location LIKE ?')
+			params.append(f'%{location.strip()}%')
+		if min_score is not None:
+			clauses.append('fit_score >= ?')
+			params.append(min_score)
+		return ('WHERE ' + ' AND '.join(clauses)) if clauses else '', params
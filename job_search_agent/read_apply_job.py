@@ -6,10 +6,11 @@ Also you have to install PyPDF2 to read pdf files: pip install PyPDF2
 """
 
 import asyncio
-import csv
+import functools
 import logging
 import os
 import sys
+import threading
 from pathlib import Path
 from typing import Optional
 
@@ -18,25 +19,42 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel, SecretStr
-from PyPDF2 import PdfReader
 
-from browser_use import ActionResult, Agent, Controller
-from browser_use.browser.browser import Browser, BrowserConfig
+from browser_use import ActionResult, Agent
 from browser_use.browser.context import BrowserContext
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+from common.action_pool import BatchWriter, PooledController
+from common.browser_pool import BrowserPool, PoolConfig
+from common.browser_profiles import get_profile
+from common.context_budget import PayloadStore, register_payload_actions, with_context_budget
+from common.history_log import HistoryLog
+from common.llm_cache import with_llm_cache
+from common.model_router import RoutedChatModel, with_model_router
+from common.tracing import Tracer, trace_agent
+from job_search_agent.cv_cache import CVCache
+from job_search_agent.form_filler import fill_form
+from job_search_agent.job_ranker import JobRanker, extract_listings
+from job_search_agent.job_store import JobStore
+
 logger = logging.getLogger(__name__)
 
-# Validate required environment variables
 load_dotenv()
 required_env_vars = ['OPENAI_API_KEY']
-for var in required_env_vars:
-	if not os.getenv(var):
-		raise ValueError(f'{var} is not set. Please add it to your environment variables.')
 
-# Full screen mode
-controller = Controller()
+
+def check_env():
+	# Validated when a run starts, so importing the module (runner, tests) needs no keys
+	for var in required_env_vars:
+		if not os.getenv(var):
+			raise ValueError(f'{var} is not set. Please add it to your environment variables.')
+
+
+# Blocking actions (PDF parsing, SQLite) run on the controller's pool, never on the loop the agents share
+controller = PooledController()
+
+# Large action results are kept here once and read back by handle (read_payload)
+payloads = PayloadStore()
+register_payload_actions(controller, payloads)
 
 # Check multiple locations for the CV file
 current_dir = Path.cwd()
@@ -49,17 +67,51 @@ possible_cv_paths = [
 	current_dir / 'jira_task_creation_results' / 'Vikas_CV_1.pdf'  # Subfolder
 ]
 
-CV = None
-for path in possible_cv_paths:
-	if path.exists():
-		CV = path
-		logger.info(f"Found CV at: {CV}")
-		break
 
-if CV is None:
+@functools.lru_cache(maxsize=None)
+def cv_path() -> Path:
+	# Looked up on first use, not on import
+	for path in possible_cv_paths:
+		if path.exists():
+			logger.info(f"Found CV at: {path}")
+			return path
 	raise FileNotFoundError(f'CV file not found. Please place "Vikas_CV_1.pdf" in one of these locations: {", ".join(str(p) for p in possible_cv_paths)}')
 
 
+@functools.lru_cache(maxsize=None)
+def cv_cache() -> CVCache:
+	# Parsed CV text and profile, keyed by the file's content hash
+	return CVCache(Path(os.getenv('CV_CACHE_DIR', script_dir / '.cache' / 'cv')))
+
+
+@functools.lru_cache(maxsize=None)
+def job_ranker() -> JobRanker:
+	# Vectorizes the CV once; listings are scored locally before the LLM reviews any of them
+	return JobRanker(cv_cache().load(cv_path()).text)
+
+
+@functools.lru_cache(maxsize=None)
+def history_log() -> Optional[HistoryLog]:
+	# Every agent keeps its last steps in memory, the rest of a long sweep goes to the step log on disk
+	return HistoryLog.from_env()
+
+
+def close_history_log():
+	"""Flush the step log of every agent and close it"""
+	if history_log.cache_info().currsize == 0:
+		return
+	log = history_log()
+	history_log.cache_clear()
+	if log is not None:
+		log.log_stats()
+		log.close()
+
+
+# Saved listings, deduplicated by link; jobs.csv is exported from here for humans
+JOBS_DB = Path('jobs.db')
+JOBS_CSV = Path('jobs.csv')
+
+
 class Job(BaseModel):
 	title: str
 	link: str
@@ -69,43 +121,145 @@ class Job(BaseModel):
 	salary: Optional[str] = None
 
 
-@controller.action('Save jobs to file - with a score how well it fits to my profile', param_model=Job)
-def save_jobs(job: Job):
-	with open('jobs.csv', 'a', newline='') as f:
-		writer = csv.writer(f)
-		writer.writerow([job.title, job.company, job.link, job.salary, job.location])
+class JobQuery(BaseModel):
+	limit: int = 10
+	page: int = 0
+	company: Optional[str] = None
+	location: Optional[str] = None
+
+
+class RankQuery(BaseModel):
+	top_k: int = 10
+
+
+# Upper bound on jobs returned per read, keeps the prompt small however big the store gets
+MAX_JOBS_PER_READ = 25
+
+
+def open_job_store() -> JobStore:
+	is_new = not JOBS_DB.exists()
+	store = JobStore(JOBS_DB)
+	if is_new and JOBS_CSV.exists():
+		imported = store.import_csv(JOBS_CSV)
+		logger.info(f'Imported {imported} jobs from {JOBS_CSV}')
+	return store
+
+
+_job_store: Optional[JobStore] = None
+_job_store_lock = threading.Lock()
+
+
+def get_job_store() -> JobStore:
+	# Opened on first use and shared by every agent in the process; sync actions run in threads
+	global _job_store
+	with _job_store_lock:
+		if _job_store is None:
+			_job_store = open_job_store()
+		return _job_store
+
+
+def close_job_store():
+	"""Export the saved jobs to jobs.csv and close the store"""
+	global _job_store
+	with _job_store_lock:
+		if _job_store is None:
+			return
+		store, _job_store = _job_store, None
+	exported = store.export_csv(JOBS_CSV)
+	logger.info(f"Exported {exported} saved jobs to {JOBS_CSV}")
+	store.close()
+
+
+def write_jobs(jobs: list[dict]):
+	job_store = get_job_store()
+	job_store.upsert_many(jobs)
+	job_store.flush()
+
+
+def job_writer() -> BatchWriter:
+	# Saves from every agent are committed together, a few milliseconds' worth per transaction
+	return controller.writer('jobs', write_jobs)
 
+
+@controller.action('Save jobs to file - with a score how well it fits to my profile', param_model=Job)
+async def save_jobs(job: Job):
+	await job_writer().put(job.model_dump())
 	return 'Saved job to file'
 
 
-@controller.action('Read jobs from file')
-def read_jobs():
-	try:
-		with open('jobs.csv', 'r') as f:
-			return f.read()
-	except FileNotFoundError:
-		# Create empty jobs file if it doesn't exist
-		with open('jobs.csv', 'w', newline='') as f:
-			writer = csv.writer(f)
-			writer.writerow(['Title', 'Company', 'Link', 'Salary', 'Location'])
-		return "New jobs file created."
-
-
-@controller.action('Read my cv for context to fill forms')
-def read_cv():
-	pdf = PdfReader(CV)
-	text = ''
-	for page in pdf.pages:
-		text += page.extract_text() or ''
-	logger.info(f'Read cv with {len(text)} characters')
-	return ActionResult(extracted_content=text, include_in_memory=True)
+@controller.action(
+	'Read saved jobs - best fit scores first, optionally filtered by company or location; use page to see more',
+	param_model=JobQuery,
+)
+def read_jobs(query: JobQuery):
+	limit = max(1, min(query.limit, MAX_JOBS_PER_READ))
+	job_store = get_job_store()
+	total = job_store.count(company=query.company, location=query.location)
+	if total == 0:
+		return 'No saved jobs match.'
+
+	jobs = job_store.query(limit=limit, offset=query.page * limit, company=query.company, location=query.location)
+	lines = [f"{job['fit_score']:.2f} | {job['title']} | {job['company']} | {job['location'] or '-'} | {job['link']}" for job in jobs]
+	pages = (total + limit - 1) // limit
+	return f'Page {query.page + 1}/{pages} of {total} saved jobs (fit | title | company | location | link):\n' + '\n'.join(lines)
 
 
 @controller.action(
-	'Upload cv to element - call this function to upload if element is not found, try with different index of the same upload element',
+	'Rank the job listings on the current page against my cv - returns only the top_k best matches with a precomputed '
+	'fit score (0-1); review these instead of reading every listing',
+	param_model=RankQuery,
+)
+async def rank_jobs(query: RankQuery, browser: BrowserContext):
+	listings = await extract_listings(await browser.get_current_page())
+	if not listings:
+		return ActionResult(error='No job listings found on the current page')
+	# the first call parses the cv
+	ranker = await controller.run_blocking(job_ranker)
+	ranked = await controller.run_blocking(ranker.rank, listings, top_k=max(1, min(query.top_k, MAX_JOBS_PER_READ)))
+	if not ranked:
+		return ActionResult(extracted_content=f'None of the {len(listings)} links on this page match my cv.', include_in_memory=True)
+	lines = [f'{r.score:.2f} | {r.listing.title} | {r.listing.link}' for r in ranked]
+	logger.info(f'Ranked {len(listings)} listings locally, kept {len(ranked)}')
+	return ActionResult(
+		extracted_content=f'Top {len(ranked)} of {len(listings)} listings by similarity to my cv (fit | title | link):\n' + '\n'.join(lines),
+		include_in_memory=True,
+	)
+
+
+@controller.action(
+	'Read my cv for context to fill forms - returns a compact profile (skills, titles, years of experience); '
+	'set full=true only if you need the complete cv text',
+	cpu_bound=True,
+)
+def read_cv(full: bool = False):
+	cv = cv_cache().load(cv_path())
+	if full:
+		logger.info(f'Read full cv with {cv.text_tokens} tokens')
+		# only shown for the next step instead of being pinned into every later prompt
+		return ActionResult(extracted_content=cv.text, include_in_memory=False)
+	logger.info(f'Read cv profile with {cv.profile_tokens} tokens (full text: {cv.text_tokens})')
+	return ActionResult(extracted_content=cv.compact(), include_in_memory=True)
+
+
+@controller.action(
+	'Fill the application form on the current page from my cv in one go - fills every field it recognizes '
+	'(name, email, phone, links, location, ...), attaches my cv to the resume upload and returns only the fields '
+	'left for you to fill; call it before typing into any form field',
+)
+async def fill_application_form(browser: BrowserContext):
+	page = await browser.get_current_page()
+	cv = await controller.run_blocking(cv_cache().load, cv_path())
+	report = await fill_form(page, cv.profile, cv_path())
+	if not report.filled and not report.attached and not report.unresolved:
+		return ActionResult(error='No form fields found on the current page')
+	return ActionResult(extracted_content=report.summary(), include_in_memory=True)
+
+
+@controller.action(
+	'Upload cv to element - only if fill_application_form could not attach it; pass the index of the upload element',
 )
 async def upload_cv(index: int, browser: BrowserContext):
-	path = str(CV.absolute())
+	path = str(cv_path().absolute())
 	dom_el = await browser.get_dom_element_by_index(index)
 
 	if dom_el is None:
@@ -133,66 +287,102 @@ async def upload_cv(index: int, browser: BrowserContext):
 		return ActionResult(error=f'Failed to upload file to index {index}')
 
 
-# Function to create a fresh browser instance with proper configuration
+# Function to create a fresh browser instance with proper configuration.
+# Every call launches its own Chrome process, so the pool can run several side by side.
+# Visible by default; AGENT_BROWSER_PROFILE_JOB_SEARCH=fast runs headless without images, fonts and trackers.
 def create_browser():
-	# Close any existing Chrome instances (optional)
-	os.system("pkill -f 'Google Chrome'")
-	
-	return Browser(
-		config=BrowserConfig(
-			chrome_instance_path='/Applications/Google Chrome.app/Contents/MacOS/Google Chrome',
-			headless=False,  # Use visible browser
-			default_viewport={"width": 1280, "height": 800},  # Set explicit viewport size
-			args=[
-				"--start-maximized",  # Start with maximized window
-				"--window-size=1280,800",  # Explicit window size
-				"--disable-dev-shm-usage",  # Avoid issues with shared memory in Docker
-				"--no-sandbox",  # Run without sandbox for compatibility
-			]
+	return get_profile('job_search').create_browser(
+		"--start-maximized",  # Start with maximized window
+		"--no-sandbox",  # Run without sandbox for compatibility
+	)
+
+
+# Chrome processes in the pool and isolated contexts each of them may serve at once
+POOL_CONFIG = PoolConfig(size=2, contexts_per_browser=3)
+
+
+# Task definition, the target company is appended
+JOB_SEARCH_TASK = (
+	'You are a professional job finder. '
+	'First, read my CV using the read_cv action to understand my skills and experience. '
+	'Then, search for machine learning internships at the specified company. '
+	'Navigate to the company careers page, search for relevant positions, and save promising listings to a file. '
+	'On every page of results, call rank_jobs first and only open the top ranked listings instead of reading them all. '
+	'For each good match, create a Job object with title, company name, link, and a fit score based on my CV '
+	'(start from the rank_jobs score). '
+	'When you fill an application form, call fill_application_form first and only fill the fields it returns. '
+	'Do not take screenshots as they may cause errors. '
+	'Target company: '
+)
+
+
+def create_model():
+	# Using standard OpenAI API; routine steps go to Gemini Flash when GEMINI_API_KEY is set
+	return with_model_router(
+		with_llm_cache(
+			ChatOpenAI(
+				model='gpt-4o',
+				api_key=SecretStr(os.getenv('OPENAI_API_KEY', '')),
+			)
 		)
 	)
 
 
+async def run_job_search(
+	company: str,
+	pool: BrowserPool,
+	model,
+	tracer: Optional[Tracer] = None,
+	max_steps: int = 100,
+	careers_url: Optional[str] = None,
+):
+	"""Search one company's careers page for matching jobs in a pooled browser context"""
+	task = JOB_SEARCH_TASK + company
+	if careers_url:
+		task += f'. Careers page: {careers_url}'
+	# saved jobs are looked up by company name afterwards
+	task += f'. Use "{company}" as the company name of every job you save.'
+	async with pool.context() as context:
+		# every agent gets its own token budget for the history it resends each step
+		llm = with_context_budget(model, payloads)
+		agent = Agent(task=task, llm=llm, controller=controller, browser_context=context)
+		if history_log() is not None:
+			history_log().attach(agent, label=company)
+		if tracer is not None:
+			trace_agent(agent, tracer, label=company)
+		return await agent.run(max_steps=max_steps)
+
+
 async def main():
-	# Create a fresh browser instance
-	browser = create_browser()
-	
-	# Task definition
-	ground_task = (
-		'You are a professional job finder. '
-		'First, read my CV using the read_cv action to understand my skills and experience. '
-		'Then, search for machine learning internships at the specified company. '
-		'Navigate to the company careers page, search for relevant positions, and save promising listings to a file. '
-		'For each good match, create a Job object with title, company name, link, and a fit score based on my CV. '
-		'Do not take screenshots as they may cause errors. '
-		'Target company: '
-	)
-	
-	tasks = [ground_task + 'Google']
-	
-	# Using standard OpenAI API
-	model = ChatOpenAI(
-		model='gpt-4o',
-		api_key=SecretStr(os.getenv('OPENAI_API_KEY', '')),
-	)
+	check_env()
+	# Pool of warm browsers; every agent gets its own isolated context
+	pool = BrowserPool(create_browser, POOL_CONFIG)
+	# Per-step spans (LLM, DOM, navigation, actions) when AGENT_TRACE_DIR is set
+	tracer = Tracer.from_env('read_apply_job')
 
-	try:
-		agents = []
-		for task in tasks:
-			agent = Agent(task=task, llm=model, controller=controller, browser=browser)
-			agents.append(agent)
+	companies = ['Google']
+	model = create_model()
 
-		await asyncio.gather(*[agent.run() for agent in agents])
+	try:
+		await pool.start()
+		await asyncio.gather(*[run_job_search(company, pool, model, tracer) for company in companies])
 	except Exception as e:
 		logger.error(f"Error during execution: {e}")
 	finally:
-		# Always close the browser
+		# Always close the browsers
 		try:
-			logger.info("Closing browser...")
-			await browser.close()
+			logger.info("Closing browser pool...")
+			await pool.close()
 		except Exception as close_error:
-			logger.error(f"Error closing browser: {close_error}")
+			logger.error(f"Error closing browser pool: {close_error}")
+		close_job_store()
+		controller.log_stats()
+		close_history_log()
+		tracer.close()
+		if isinstance(model, RoutedChatModel):
+			model.log_stats()
 
 
 if __name__ == '__main__':
-	asyncio.run(main())
\ No newline at end of file
+	logging.basicConfig(level=logging.INFO)
+	asyncio.run(main())
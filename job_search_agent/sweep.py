@@ -0,0 +1,346 @@
+"""
+Job search fan-out over many companies, checkpointed in SQLite.
+
+Every company moves through pending -> running -> done / failed in sweep.db,
+together with the job links saved for it. Companies are scheduled through a
+work queue with a bounded number of agents at once (by default one per
+browser context in the pool), and careers pages on the same domain are paced
+and capped so a sweep never hammers one ATS. A restarted sweep skips finished
+companies, puts interrupted ones back to pending and retries failures up to
+--max-attempts.
+
+	python job_search_agent/sweep.py companies.txt --browsers 3 --contexts-per-browser 3
+	python job_search_agent/sweep.py --status
+
+companies.txt has one company per line, optionally followed by its careers
+page: `Stripe, https://stripe.com/jobs`. Lines starting with # are ignored.
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common.rate_limit import DomainRateLimiter, domain_of
+
+logger = logging.getLogger(__name__)
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS companies (
+	name TEXT PRIMARY KEY COLLATE NOCASE,
+	careers_url TEXT,
+	status TEXT NOT NULL DEFAULT 'pending',
+	attempts INTEGER NOT NULL DEFAULT 0,
+	error TEXT,
+	jobs INTEGER NOT NULL DEFAULT 0,
+	position INTEGER NOT NULL,
+	updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS companies_status ON companies (status, position);
+CREATE TABLE IF NOT EXISTS company_jobs (
+	company TEXT NOT NULL COLLATE NOCASE,
+	link TEXT NOT NULL,
+	PRIMARY KEY (company, link)
+);
+"""
+
+
+@dataclass
+class Company:
+	name: str
+	careers_url: Optional[str] = None
+	status: str = PENDING
+	attempts: int = 0
+	error: Optional[str] = None
+	jobs: int = 0
+
+
+def load_companies(path: str | Path) -> list[Company]:
+	companies = []
+	for line in Path(path).read_text().splitlines():
+		line = line.strip()
+		if not line or line.startswith('#'):
+			continue
+		name, _, url = (part.strip() for part in line.partition(','))
+		companies.append(Company(name, url or None))
+	return companies
+
+
+class SweepStore:
+	"""Durable per-company state of a sweep; every transition is committed immediately"""
+
+	def __init__(self, path: str | Path = 'sweep.db'):
+		self.path = Path(path)
+		self._lock = threading.Lock()
+		self._conn = sqlite3.connect(self.path, check_same_thread=False)
+		self._conn.row_factory = sqlite3.Row
+		self._conn.execute('PRAGMA journal_mode=WAL')
+		self._conn.execute('PRAGMA synchronous=NORMAL')
+		self._conn.executescript(_SCHEMA)
+
+	def add(self, companies: list[Company]) -> int:
+		"""Register companies; known ones keep their state, a new careers URL is taken over"""
+		with self._lock, self._conn:
+			start = self._conn.execute('SELECT COALESCE(MAX(position), 0) FROM companies').fetchone()[0]
+			before = self._conn.total_changes
+			self._conn.executemany(
+				'INSERT INTO companies (name, careers_url, position, updated_at) VALUES (?, ?, ?, ?) '
+				'ON CONFLICT (name) DO UPDATE SET careers_url = COALESCE(excluded.careers_url, companies.careers_url)',
+				[(c.name, c.careers_url, start + i, time.time()) for i, c in enumerate(companies, 1)],
+			)
+			return self._conn.total_changes - before
+
+	def recover(self) -> int:
+		"""Companies left running by a crashed sweep go back to pending"""
+		with self._lock, self._conn:
+			return self._conn.execute('UPDATE companies SET status = ? WHERE status = ?', (PENDING, RUNNING)).rowcount
+
+	def runnable(self, max_attempts: int, retry_failed: bool = True) -> list[Company]:
+		"""Pending companies, then failed ones that still have attempts left, in input order"""
+		statuses = (PENDING, FAILED) if retry_failed else (PENDING,)
+		with self._lock:
+			rows = self._conn.execute(
+				f'SELECT * FROM companies WHERE status IN ({",".join("?" * len(statuses))}) AND attempts < ? '
+				'ORDER BY status = ? DESC, position',
+				(*statuses, max_attempts, PENDING),
+			).fetchall()
+		return [_company(row) for row in rows]
+
+	def mark_running(self, name: str):
+		self._set(name, 'status = ?, attempts = attempts + 1, error = NULL', (RUNNING,))
+
+	def mark_done(self, name: str, links: list[str]):
+		with self._lock, self._conn:
+			self._conn.executemany('INSERT OR IGNORE INTO company_jobs (company, link) VALUES (?, ?)', [(name, link) for link in links])
+			self._conn.execute(
+				'UPDATE companies SET status = ?, jobs = (SELECT COUNT(*) FROM company_jobs WHERE company = ?), updated_at = ? '
+				'WHERE name = ?',
+				(DONE, name, time.time(), name),
+			)
+
+	def mark_failed(self, name: str, error: str):
+		self._set(name, 'status = ?, error = ?', (FAILED, error[:1000]))
+
+	def mark_pending(self, name: str):
+		# interrupted before finishing: the attempt does not count
+		self._set(name, 'status = ?, attempts = MAX(attempts - 1, 0)', (PENDING,))
+
+	def get(self, name: str) -> Optional[Company]:
+		with self._lock:
+			row = self._conn.execute('SELECT * FROM companies WHERE name = ?', (name,)).fetchone()
+		return _company(row) if row else None
+
+	def companies(self, status: Optional[str] = None) -> list[Company]:
+		where, params = ('WHERE status = ?', (status,)) if status else ('', ())
+		with self._lock:
+			rows = self._conn.execute(f'SELECT * FROM companies {where} ORDER BY position', params).fetchall()
+		return [_company(row) for row in rows]
+
+	def links(self, name: str) -> list[str]:
+		with self._lock:
+			return [row[0] for row in self._conn.execute('SELECT link FROM company_jobs WHERE company = ?', (name,))]
+
+	def counts(self) -> dict[str, int]:
+		with self._lock:
+			rows = self._conn.execute('SELECT status, COUNT(*) FROM companies GROUP BY status').fetchall()
+		return {PENDING: 0, RUNNING: 0, DONE: 0, FAILED: 0, **{status: count for status, count in rows}}
+
+	def close(self):
+		with self._lock:
+			self._conn.close()
+
+	def _set(self, name: str, assignments: str, params: tuple):
+		with self._lock, self._conn:
+			self._conn.execute(f'UPDATE companies SET {assignments}, updated_at = ? WHERE name = ?', (*params, time.time(), name))
+
+
+def _company(row: sqlite3.Row) -> Company:
+	return Company(row['name'], row['careers_url'], row['status'], row['attempts'], row['error'], row['jobs'])
+
+
+# Searches one company and returns (success, error, saved job links)
+SearchFn = Callable[[Company], Awaitable[tuple[bool, Optional[str], list[str]]]]
+
+
+class JobSweep:
+	def __init__(
+		self,
+		store: SweepStore,
+		search: SearchFn,
+		parallel: int = 4,
+		max_attempts: int = 3,
+		rate_limiter: Optional[DomainRateLimiter] = None,
+		per_domain: int = 2,
+	):
+		self.store = store
+		self.search = search
+		self.parallel = parallel
+		self.max_attempts = max_attempts
+		# spacing between agents starting on the same careers domain
+		self.rate_limiter = rate_limiter or DomainRateLimiter(min_interval=10.0, jitter=5.0)
+		# agents allowed on the same careers domain at once (shared ATS hosts)
+		self.per_domain = per_domain
+		self._domains: dict[str, asyncio.Semaphore] = {}
+
+	async def run(self, retry_failed: bool = True) -> dict[str, int]:
+		recovered = self.store.recover()
+		if recovered:
+			logger.info(f'Recovered {recovered} companies interrupted by an earlier sweep')
+		queue: asyncio.Queue[Company] = asyncio.Queue()
+		for company in self.store.runnable(self.max_attempts, retry_failed):
+			queue.put_nowait(company)
+		total = queue.qsize()
+		logger.info(f'Sweeping {total} companies with {self.parallel} agents in parallel ({self.store.counts()[DONE]} already done)')
+
+		async def worker():
+			while not queue.empty():
+				company = queue.get_nowait()
+				if self._domain_busy(company) and not queue.empty():
+					# take another company instead of idling behind a busy domain
+					queue.put_nowait(company)
+					await asyncio.sleep(0.05)
+					continue
+				await self._process(company)
+				counts = self.store.counts()
+				logger.info(f"Progress: {counts[DONE]} done, {counts[FAILED]} failed, {queue.qsize()} queued of {total}")
+
+		await asyncio.gather(*(worker() for _ in range(min(self.parallel, total))))
+		return self.store.counts()
+
+	def _gate(self, company: Company) -> Optional[asyncio.Semaphore]:
+		if not company.careers_url:
+			return None
+		domain = domain_of(company.careers_url)
+		if domain not in self._domains:
+			self._domains[domain] = asyncio.Semaphore(self.per_domain)
+		return self._domains[domain]
+
+	def _domain_busy(self, company: Company) -> bool:
+		gate = self._gate(company)
+		return gate is not None and gate.locked()
+
+	async def _process(self, company: Company):
+		gate = self._gate(company)
+		if gate:
+			await gate.acquire()
+		try:
+			if gate:
+				await self.rate_limiter.wait(company.careers_url)
+			self.store.mark_running(company.name)
+			try:
+				success, error, links = await self.search(company)
+			except asyncio.CancelledError:
+				self.store.mark_pending(company.name)
+				raise
+			except Exception as e:
+				logger.error(f'{company.name}: search crashed: {e!r}')
+				self.store.mark_failed(company.name, f'{type(e).__name__}: {e}')
+				return
+			if success:
+				self.store.mark_done(company.name, links)
+				logger.info(f'{company.name}: done, {len(links)} jobs saved')
+			else:
+				self.store.mark_failed(company.name, error or 'Agent did not finish the search')
+				logger.warning(f'{company.name}: failed: {error}')
+		finally:
+			if gate:
+				gate.release()
+
+
+def agent_search(pool, model, tracer=None, max_steps: int = 100) -> SearchFn:
+	"""SearchFn running read_apply_job's agent in a pooled browser context"""
+	from job_search_agent.read_apply_job import get_job_store, run_job_search
+
+	async def search(company: Company):
+		history = await run_job_search(company.name, pool, model, tracer, max_steps, careers_url=company.careers_url)
+		links = get_job_store().links(company.name)
+		if history.is_successful():
+			return True, None, links
+		errors = [error for error in history.errors() if error]
+		return False, history.final_result() or (errors[-1] if errors else None), links
+
+	return search
+
+
+def print_status(store: SweepStore):
+	counts = store.counts()
+	print(', '.join(f'{count} {status}' for status, count in counts.items()))
+	for company in store.companies(FAILED):
+		print(f'  failed ({company.attempts} attempts) {company.name}: {company.error}')
+
+
+async def sweep(args):
+	from common.asset_cache import log_asset_stats
+	from common.browser_pool import BrowserPool, PoolConfig
+	from common.tracing import Tracer
+	from job_search_agent import read_apply_job
+
+	read_apply_job.check_env()
+	store = SweepStore(args.db)
+	if args.companies:
+		added = store.add(load_companies(args.companies))
+		logger.info(f'Added {added} companies from {args.companies}')
+
+	config = PoolConfig(size=args.browsers, contexts_per_browser=args.contexts_per_browser)
+	pool = BrowserPool(read_apply_job.create_browser, config)
+	tracer = Tracer.from_env('job_sweep')
+	model = read_apply_job.create_model()
+	job_sweep = JobSweep(
+		store,
+		agent_search(pool, model, tracer, args.max_steps),
+		# one agent per browser context unless told otherwise
+		parallel=args.parallel or config.size * config.contexts_per_browser,
+		max_attempts=args.max_attempts,
+		rate_limiter=DomainRateLimiter(min_interval=args.domain_interval, jitter=args.domain_interval / 2),
+		per_domain=args.per_domain,
+	)
+	try:
+		await job_sweep.run(retry_failed=not args.no_retry)
+	finally:
+		await pool.close()
+		log_asset_stats()
+		read_apply_job.close_job_store()
+		read_apply_job.controller.log_stats()
+		read_apply_job.close_history_log()
+		tracer.close()
+		print_status(store)
+		store.close()
+
+
+def main(argv: Optional[list[str]] = None):
+	parser = argparse.ArgumentParser(description='Search jobs at many companies with checkpointing and resume')
+	parser.add_argument('companies', nargs='?', help='file with one company per line (optionally "name, careers url")')
+	parser.add_argument('--db', default='sweep.db', help='checkpoint database')
+	parser.add_argument('--status', action='store_true', help='print the sweep state and exit')
+	parser.add_argument('--browsers', type=int, default=2, help='Chrome processes in the pool')
+	parser.add_argument('--contexts-per-browser', type=int, default=3)
+	parser.add_argument('--parallel', type=int, default=0, help='agents at once (default: one per browser context)')
+	parser.add_argument('--max-attempts', type=int, default=3, help='attempts per company before giving up')
+	parser.add_argument('--no-retry', action='store_true', help='only run pending companies, leave failures alone')
+	parser.add_argument('--per-domain', type=int, default=2, help='agents at once on the same careers domain')
+	parser.add_argument('--domain-interval', type=float, default=10.0, help='seconds between agents starting on the same domain')
+	parser.add_argument('--max-steps', type=int, default=100, help='agent steps per company')
+	args = parser.parse_args(argv)
+
+	logging.basicConfig(level=logging.INFO)
+	if args.status:
+		store = SweepStore(args.db)
+		print_status(store)
+		store.close()
+		return
+	asyncio.run(sweep(args))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,147 @@
+import asyncio
+
+from job_search_agent.cv_cache import CVProfile, extract_contact
+from job_search_agent.form_filler import FILL_FIELDS_JS, FormField, applicant_values, choose_option, classify, fill_form, plan_fill
+
+CV_HEADER = """ JANE  DOE
+Berlin,Germany,13055  | +49 1742 565535  | jane.doe@example.com  | https://www.linkedin.com/in/janedoe/
+PROFESSIONAL SUMMARY
+Senior Software Engineer with 8 years of experience.
+"""
+
+PROFILE = CVProfile(
+	name='Jane Doe',
+	email='jane.doe@example.com',
+	phone='+49 1742 565535',
+	location='Berlin, Germany, 13055',
+	links=['https://www.linkedin.com/in/janedoe'],
+	titles=['Senior Software Engineer'],
+	years_experience=8.0,
+)
+
+
+def _field(id, label='', type='text', tag='input', **kwargs):
+	return FormField(frame=0, id=id, type=type, tag=tag, label=label, **kwargs)
+
+
+def test_extract_contact_from_cv_header():
+	assert extract_contact(CV_HEADER) == {
+		'name': 'Jane Doe',
+		'email': 'jane.doe@example.com',
+		'phone': '+49 1742 565535',
+		'location': 'Berlin, Germany, 13055',
+		'links': ['https://www.linkedin.com/in/janedoe'],
+	}
+
+
+def test_classify_uses_autocomplete_labels_and_names():
+	assert classify(_field('0', 'Vorname')) == 'first_name'
+	assert classify(_field('1', '', name='applicant[last_name]')) == 'last_name'
+	assert classify(_field('2', 'Full name', autocomplete='name')) == 'full_name'
+	assert classify(_field('3', 'Contact', type='email')) == 'email'
+	assert classify(_field('4', 'LinkedIn Profile URL')) == 'linkedin'
+	assert classify(_field('5', 'Name')) == 'full_name'
+	# look like applicant fields but are not
+	assert classify(_field('6', 'Company name')) is None
+	assert classify(_field('7', "Referrer's email")) is None
+	assert classify(_field('8', 'I agree to the privacy policy', type='checkbox')) is None
+	assert classify(_field('9', 'Resume/CV', type='file')) == 'resume'
+	assert classify(_field('10', 'Cover letter', type='file')) is None
+
+
+def test_plan_fill_returns_only_unresolved_fields():
+	fields = [
+		_field('0', 'First name'),
+		_field('1', 'Last name'),
+		_field('2', 'Email', value='already@typed.com'),
+		_field('3', 'Country', tag='select', options=[{'value': 'fr', 'text': 'France'}, {'value': 'de', 'text': 'Germany'}]),
+		_field('4', 'Why do you want to join?', tag='textarea', required=True),
+		_field('5', 'GitHub'),
+		_field('6', 'Cover letter', type='file'),
+		_field('7', 'Attach', type='file'),
+	]
+	fills, resume, unresolved = plan_fill(fields, applicant_values(PROFILE))
+
+	assert [(f.id, value) for f, value in fills] == [('0', 'Jane'), ('1', 'Doe'), ('3', 'de')]
+	assert resume.id == '7'
+	assert [f.id for f in unresolved] == ['4', '5', '6']
+	assert choose_option([{'value': 'US', 'text': 'United States'}], 'united states') == 'US'
+
+
+class FakeFrame:
+	def __init__(self, fields):
+		self.fields = fields
+		self.filled = None
+		self.uploaded = None
+		self.url = 'https://jobs.example/apply'
+
+	async def evaluate(self, script, arg=None):
+		if script == FILL_FIELDS_JS:
+			self.filled = arg
+			return []
+		return self.fields
+
+	async def set_input_files(self, selector, path):
+		self.uploaded = (selector, path)
+
+
+class FakePage:
+	def __init__(self, *frames):
+		self.frames = list(frames)
+
+
+class LoadingPage:
+	"""A page whose ad iframe shows up between listing and filling the form"""
+
+	def __init__(self, *frames):
+		self._frames = list(frames)
+		self.listed = False
+
+	@property
+	def frames(self):
+		if self.listed:
+			return [FakeFrame([])] + self._frames
+		self.listed = True
+		return list(self._frames)
+
+
+ITEM = {'name': '', 'autocomplete': '', 'placeholder': '', 'required': False, 'value': '', 'accept': '', 'options': []}
+
+
+def _application_frame():
+	return FakeFrame([
+		{**ITEM, 'id': '0', 'type': 'text', 'tag': 'input', 'label': 'Full name'},
+		{**ITEM, 'id': '1', 'type': 'tel', 'tag': 'input', 'label': 'Phone'},
+		{**ITEM, 'id': '2', 'type': 'file', 'tag': 'input', 'label': 'Resume'},
+		{**ITEM, 'id': '3', 'type': 'text', 'tag': 'input', 'label': 'Expected salary', 'required': True},
+	])
+
+
+def test_fill_form_batches_each_frame_and_attaches_the_cv(tmp_path):
+	main = FakeFrame([])
+	embedded = _application_frame()
+	cv = tmp_path / 'cv.pdf'
+	cv.write_bytes(b'%PDF')
+
+	report = asyncio.run(fill_form(FakePage(main, embedded), PROFILE, cv))
+
+	assert main.filled is None
+	assert embedded.filled == [{'id': '0', 'value': 'Jane Doe'}, {'id': '1', 'value': '+49 1742 565535'}]
+	assert embedded.uploaded == ('[data-agent-field="2"]', str(cv.absolute()))
+	assert report.filled == ['Full name', 'Phone'] and report.attached == 'Resume'
+	assert [f.id for f in report.unresolved] == ['3']
+	assert 'Expected salary (text; required)' in report.summary()
+
+
+def test_fill_form_fills_the_frame_it_listed_when_frames_change(tmp_path):
+	main = FakeFrame([])
+	embedded = _application_frame()
+	cv = tmp_path / 'cv.pdf'
+	cv.write_bytes(b'%PDF')
+
+	report = asyncio.run(fill_form(LoadingPage(main, embedded), PROFILE, cv))
+
+	assert main.filled is None
+	assert [fill['id'] for fill in embedded.filled] == ['0', '1']
+	assert embedded.uploaded == ('[data-agent-field="2"]', str(cv.absolute()))
+	assert report.attached == 'Resume'
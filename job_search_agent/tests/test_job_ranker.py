@@ -0,0 +1,57 @@
+import random
+import time
+
+from job_search_agent.job_ranker import JobRanker, Listing, tokenize
+
+CV = """
+Senior Software Engineer with 8 years of experience building backend services in Java and Python.
+Spring Boot microservices on Kubernetes, Kafka event streaming, PostgreSQL, AWS. Machine learning
+pipelines with PyTorch and scikit-learn.
+"""
+
+
+def test_tokenize_keeps_technical_terms():
+	assert tokenize('Senior C++/C# dev (Node.js, AWS.) and the team') == ['senior', 'c++', 'c#', 'dev', 'node.js', 'aws']
+
+
+def test_rank_puts_matching_listings_first():
+	listings = [
+		Listing('Store Cashier', 'https://jobs.example/1', 'Retail store, weekend shifts, customer service'),
+		Listing('Backend Engineer (Java, Kafka)', 'https://jobs.example/2', 'Spring Boot microservices on Kubernetes and AWS'),
+		Listing('Machine Learning Engineer', 'https://jobs.example/3', 'Train models with PyTorch, Python pipelines'),
+		Listing('Pastry Chef', 'https://jobs.example/4', 'Bakery, early mornings'),
+	]
+	ranked = JobRanker(CV).rank(listings, top_k=3)
+
+	assert {r.listing.link for r in ranked} == {'https://jobs.example/2', 'https://jobs.example/3'}
+	assert ranked[0].score >= ranked[1].score > 0
+	assert all(0 < r.score <= 1 for r in ranked)
+
+
+def test_rank_limits_and_empty_input():
+	ranker = JobRanker(CV)
+	listings = [Listing(f'Java Engineer {i}', f'https://jobs.example/{i}', 'Spring Boot, Kafka') for i in range(30)]
+
+	assert len(ranker.rank(listings, top_k=5)) == 5
+	assert ranker.rank(listings, top_k=5, min_score=0.99) == []
+	assert ranker.rank([]) == []
+	assert JobRanker('').rank(listings) == []
+
+
+def test_rank_thousand_listings_in_one_batch():
+	rng = random.Random(7)
+	words = 'sales marketing nurse driver chef java python kubernetes kafka machine learning designer legal finance'.split()
+	listings = [
+		Listing(' '.join(rng.sample(words, 3)).title(), f'https://jobs.example/{i}', ' '.join(rng.choices(words, k=30)))
+		for i in range(1000)
+	]
+	listings.append(Listing('Senior Backend Engineer (Java, Spring Boot, Kafka)', 'https://jobs.example/best', 'Microservices, AWS, PostgreSQL'))
+	ranker = JobRanker(CV)
+
+	start = time.perf_counter()
+	ranked = ranker.rank(listings, top_k=10)
+	elapsed = time.perf_counter() - start
+
+	assert ranked[0].listing.link == 'https://jobs.example/best'
+	assert len(ranked) == 10
+	assert elapsed < 1.0
@@ -0,0 +1,14 @@
+import pytest
+
+from job_search_agent.job_store import normalize_link
+
+
+@pytest.mark.parametrize('link,expected', [
+	('HTTPS://Jobs.Example.com/careers/123/?utm_source=li&gclid=x&ref=feed#apply', 'https://jobs.example.com/careers/123'),
+	('https://jobs.example.com/view?id=5&source_id=9&referenceId=7&src=mail', 'https://jobs.example.com/view?id=5&referenceId=7&source_id=9'),
+	('https://jobs.example.com/#/job/123?utm_medium=x', 'https://jobs.example.com/#/job/123'),
+	('https://jobs.example.com/#/jobs?team=ops&ref=feed', 'https://jobs.example.com/#/jobs?team=ops'),
+	('https://jobs.example.com/#!/job/456', 'https://jobs.example.com/#!/job/456'),
+])
+def test_normalize_link(link, expected):
+	assert normalize_link(link) == expected
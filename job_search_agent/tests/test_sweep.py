@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from common.rate_limit import DomainRateLimiter
+from job_search_agent.sweep import DONE, FAILED, PENDING, RUNNING, Company, JobSweep, SweepStore, load_companies
+
+
+@pytest.fixture
+def store(tmp_path):
+	store = SweepStore(tmp_path / 'sweep.db')
+	yield store
+	store.close()
+
+
+def _sweep(store, search, **kwargs):
+	kwargs.setdefault('rate_limiter', DomainRateLimiter(min_interval=0, jitter=0))
+	return JobSweep(store, search, **kwargs)
+
+
+def test_load_companies(tmp_path):
+	path = tmp_path / 'companies.txt'
+	path.write_text('# big tech\nGoogle\nStripe, https://stripe.com/jobs\n\n')
+	assert load_companies(path) == [Company('Google'), Company('Stripe', 'https://stripe.com/jobs')]
+
+
+def test_sweep_checkpoints_and_resumes(store):
+	store.add([Company(f'Company {i}') for i in range(20)])
+	calls = []
+
+	async def flaky(company):
+		calls.append(company.name)
+		if company.name == 'Company 3':
+			return False, 'careers page not found', []
+		return True, None, [f'https://jobs.example.com/{company.name}/1']
+
+	counts = asyncio.run(_sweep(store, flaky, parallel=4).run())
+	assert counts == {PENDING: 0, RUNNING: 0, DONE: 19, FAILED: 1}
+	assert store.links('Company 0') == ['https://jobs.example.com/Company 0/1']
+	assert store.get('Company 3').error == 'careers page not found'
+
+	# a restart only retries the failure
+	calls.clear()
+	asyncio.run(_sweep(store, flaky, parallel=4).run())
+	assert calls == ['Company 3']
+	assert store.get('Company 3').attempts == 2
+
+	# once out of attempts it is left alone
+	calls.clear()
+	asyncio.run(_sweep(store, flaky, max_attempts=2).run())
+	assert calls == []
+
+
+def test_interrupted_companies_go_back_to_pending(store):
+	store.add([Company('A'), Company('B')])
+	store.mark_running('A')  # a crashed sweep left A running
+
+	async def ok(company):
+		return True, None, []
+
+	asyncio.run(_sweep(store, ok).run())
+	assert store.counts()[DONE] == 2
+	assert store.get('A').attempts == 2
+
+
+def test_parallelism_is_bounded_globally_and_per_domain(store):
+	store.add([Company(f'Shared {i}', 'https://boards.greenhouse.io/x') for i in range(6)] + [Company(f'Own {i}') for i in range(6)])
+	running = {'all': 0, 'shared': 0, 'peak_all': 0, 'peak_shared': 0}
+
+	async def search(company):
+		shared = company.careers_url is not None
+		running['all'] += 1
+		running['shared'] += shared
+		running['peak_all'] = max(running['peak_all'], running['all'])
+		running['peak_shared'] = max(running['peak_shared'], running['shared'])
+		await asyncio.sleep(0.01)
+		running['all'] -= 1
+		running['shared'] -= shared
+		return True, None, []
+
+	asyncio.run(_sweep(store, search, parallel=5, per_domain=2).run())
+	assert running['peak_all'] <= 5
+	assert running['peak_shared'] == 2
+	assert store.counts()[DONE] == 12
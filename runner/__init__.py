@@ -0,0 +1,3 @@
+from runner.run_tasks import Resources, Task, TaskRunner, load_tasks
+
+__all__ = ['Resources', 'Task', 'TaskRunner', 'load_tasks']
@@ -0,0 +1,267 @@
+"""
+Batch runner: works through a queue of agent tasks in one process.
+
+Tasks come from a JSONL file (one task per line) or a YAML list:
+
+    {"id": "rice", "workflow": "compare_offers", "params": {"product": "Fortune Basmati Rice 5kg"}}
+    {"workflow": "job_search", "params": {"company": "Google"}}
+
+The LLM client and the browser pool are built on first use and shared by all
+tasks. At most --concurrency tasks run at once, every result is appended to
+the output JSONL as soon as it finishes, and nothing ever waits on stdin.
+
+    python -m runner.run_tasks tasks.jsonl --output results.jsonl --concurrency 4
+    python -m runner.run_tasks tasks.jsonl --output results.jsonl --resume
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+import traceback
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Iterable, Optional
+
+from runner.workflows import WORKFLOWS
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Task:
+    id: str
+    workflow: str
+    params: dict[str, Any] = field(default_factory=dict)
+
+
+def load_tasks(path: str | Path) -> list[Task]:
+    """Tasks from a .jsonl file, or a .yaml/.yml list (optionally under a `tasks` key)"""
+    path = Path(path)
+    if path.suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise RuntimeError('YAML task files need PyYAML: pip install pyyaml') from None
+        data = yaml.safe_load(path.read_text()) or []
+        entries = data.get('tasks', []) if isinstance(data, dict) else data
+    else:
+        with open(path) as f:
+            entries = [json.loads(line) for line in f if line.strip() and not line.lstrip().startswith('#')]
+
+    tasks, seen = [], set()
+    for number, entry in enumerate(entries, 1):
+        if entry.get('workflow') not in WORKFLOWS:
+            raise ValueError(f"Task {number}: unknown workflow {entry.get('workflow')!r}, expected one of {', '.join(WORKFLOWS)}")
+        task = Task(id=str(entry.get('id', number)), workflow=entry['workflow'], params=entry.get('params', {}))
+        if task.id in seen:
+            raise ValueError(f'Task {number}: duplicate id {task.id!r}')
+        seen.add(task.id)
+        tasks.append(task)
+    return tasks
+
+
+def finished_ids(output: str | Path) -> set[str]:
+    """Ids of tasks that already succeeded in an earlier run's output"""
+    path = Path(output)
+    if not path.exists():
+        return set()
+    done = set()
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('status') == 'ok':
+                done.add(record['id'])
+    return done
+
+
+class Resources:
+    """LLM client, browser pools and agents shared by all tasks, each built on first use"""
+
+    def __init__(
+        self,
+        model: str = 'gpt-4o',
+        browsers: int = 2,
+        contexts_per_browser: int = 3,
+        headless: bool = True,
+        profile: Optional[str] = None,
+    ):
+        self.model = model
+        self.browsers = browsers
+        self.contexts_per_browser = contexts_per_browser
+        self.headless = headless
+        # browser profile of workflows without an AGENT_BROWSER_PROFILE_<WORKFLOW> override
+        self.profile = profile or ('fast' if headless else 'desktop')
+        self._llm = None
+        self._pools = {}
+        self._buying_agent = None
+        self._tracer = None
+        self._on_close = []
+
+    @property
+    def llm(self):
+        if self._llm is None:
+            from langchain_openai import ChatOpenAI
+
+            from common.llm_cache import with_llm_cache
+            from common.model_router import with_model_router
+
+            self._llm = with_model_router(with_llm_cache(ChatOpenAI(model=self.model)))
+        return self._llm
+
+    def pool_for(self, workflow: Optional[str] = None):
+        """Browser pool for the workflow's profile; workflows with the same profile share one pool"""
+        from common.browser_profiles import get_profile
+
+        profile = get_profile(workflow, default=self.profile)
+        if profile.name not in self._pools:
+            from common.browser_pool import BrowserPool, PoolConfig
+
+            config = PoolConfig(size=self.browsers, contexts_per_browser=self.contexts_per_browser)
+            self._pools[profile.name] = BrowserPool(profile.create_browser, config)
+        return self._pools[profile.name]
+
+    @property
+    def pool(self):
+        return self.pool_for()
+
+    @property
+    def buying_agent(self):
+        if self._buying_agent is None:
+            from buying_agent.buying_agent import BuyingAgent
+            from common.browser_profiles import get_profile
+            from common.macros import MacroLibrary
+            from common.session_store import SessionStore
+
+            self._buying_agent = BuyingAgent(
+                llm=self.llm,
+                headless=self.headless,
+                tracer=self.tracer,
+                browser_pool=self.pool_for('buying_agent'),
+                macros=MacroLibrary.from_env(),
+                profile=get_profile('buying_agent', default=self.profile),
+                sessions=SessionStore.from_env(),
+            )
+        return self._buying_agent
+
+    @property
+    def tracer(self):
+        # AGENT_TRACE_DIR turns tracing on for every task of the batch
+        if self._tracer is None:
+            from common.tracing import Tracer
+
+            self._tracer = Tracer.from_env('runner')
+        return self._tracer
+
+    def on_close(self, callback):
+        """Call `callback` once when the batch is over"""
+        if callback not in self._on_close:
+            self._on_close.append(callback)
+
+    async def close(self):
+        for pool in self._pools.values():
+            await pool.close()
+        if self._pools:
+            from common.asset_cache import log_asset_stats
+
+            log_asset_stats()
+        for callback in self._on_close:
+            callback()
+        if hasattr(self._llm, 'log_stats'):
+            self._llm.log_stats()
+        if self._tracer is not None:
+            self._tracer.close()
+
+
+class TaskRunner:
+    def __init__(self, resources: Resources, output: str | Path, concurrency: int = 4, task_timeout: Optional[float] = None):
+        self.resources = resources
+        self.output = Path(output)
+        self.concurrency = concurrency
+        self.task_timeout = task_timeout
+        self.counts = {'ok': 0, 'error': 0, 'timeout': 0}
+
+    async def run(self, tasks: Iterable[Task]) -> dict:
+        """Run all tasks with at most `concurrency` in flight; returns the status counts"""
+        queue: asyncio.Queue[Task] = asyncio.Queue()
+        for task in tasks:
+            queue.put_nowait(task)
+        total = queue.qsize()
+        self.output.parent.mkdir(parents=True, exist_ok=True)
+
+        with open(self.output, 'a') as out:
+
+            async def worker():
+                while not queue.empty():
+                    task = queue.get_nowait()
+                    record = await self.run_task(task)
+                    self.counts[record['status']] += 1
+                    # one line per finished task, flushed right away so a crash loses nothing
+                    out.write(json.dumps(record, default=str) + '\n')
+                    out.flush()
+                    done = sum(self.counts.values())
+                    logger.info(f"[{done}/{total}] {task.id} ({task.workflow}): {record['status']} in {record['duration_s']:.1f}s")
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total) or 1)))
+        return self.counts
+
+    async def run_task(self, task: Task) -> dict:
+        record = {'id': task.id, 'workflow': task.workflow, 'params': task.params}
+        start = time.perf_counter()
+        try:
+            coro = WORKFLOWS[task.workflow](self.resources, **task.params)
+            result = await asyncio.wait_for(coro, self.task_timeout) if self.task_timeout else await coro
+            record.update(status='ok', result=result)
+        except asyncio.TimeoutError:
+            record.update(status='timeout', error=f'Timed out after {self.task_timeout}s')
+        except Exception as e:
+            logger.debug(traceback.format_exc())
+            record.update(status='error', error=f'{type(e).__name__}: {e}')
+        record['duration_s'] = time.perf_counter() - start
+        return record
+
+
+async def run(args) -> dict:
+    tasks = load_tasks(args.tasks)
+    if args.resume:
+        done = finished_ids(args.output)
+        tasks = [task for task in tasks if task.id not in done]
+        logger.info(f'Resuming: {len(done)} tasks already done, {len(tasks)} left')
+
+    resources = Resources(args.model, args.browsers, args.contexts_per_browser, headless=not args.headful, profile=args.profile)
+    try:
+        return await TaskRunner(resources, args.output, args.concurrency, args.task_timeout).run(tasks)
+    finally:
+        await resources.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    parser = argparse.ArgumentParser(description='Run a batch of agent tasks from a JSONL or YAML file')
+    parser.add_argument('tasks', help='tasks file (.jsonl, .yaml or .yml)')
+    parser.add_argument('--output', default='results.jsonl', help='results are appended here, one JSON line per task')
+    parser.add_argument('--concurrency', type=int, default=4, help='tasks running at once')
+    parser.add_argument('--task-timeout', type=float, default=None, help='seconds before a task is abandoned')
+    parser.add_argument('--resume', action='store_true', help='skip tasks that already succeeded in --output')
+    parser.add_argument('--model', default='gpt-4o')
+    parser.add_argument('--browsers', type=int, default=2, help='Chrome processes in the shared pool')
+    parser.add_argument('--contexts-per-browser', type=int, default=3)
+    parser.add_argument('--headful', action='store_true', help='show the browsers')
+    parser.add_argument(
+        '--profile', choices=('desktop', 'fast'), help='browser profile (default: fast, desktop with --headful); '
+        'AGENT_BROWSER_PROFILE_<WORKFLOW> overrides it per workflow'
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    counts = asyncio.run(run(args))
+    print(f"{counts['ok']} ok, {counts['error']} failed, {counts['timeout']} timed out; results in {args.output}")
+    return 0 if not counts['error'] and not counts['timeout'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
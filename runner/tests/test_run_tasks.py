@@ -0,0 +1,66 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+import pytest
+
+from runner.run_tasks import Resources, TaskRunner, finished_ids, load_tasks
+from runner.workflows import WORKFLOWS, workflow
+
+
+@pytest.fixture
+def sleepy():
+    state = {"running": 0, "peak": 0}
+
+    @workflow("test_sleep")
+    async def sleep(resources, seconds=0.01, fail=False):
+        state["running"] += 1
+        state["peak"] = max(state["peak"], state["running"])
+        try:
+            await asyncio.sleep(seconds)
+            if fail:
+                raise RuntimeError("boom")
+            return seconds
+        finally:
+            state["running"] -= 1
+
+    yield state
+    del WORKFLOWS["test_sleep"]
+
+def _write_tasks(path, tasks):
+    path.write_text("\n".join(json.dumps(t) for t in tasks) + "\n")
+    return path
+
+def test_load_tasks_jsonl_and_yaml(tmp_path):
+    jsonl = _write_tasks(tmp_path / "tasks.jsonl", [{"workflow": "agent", "params": {"task": "a"}}, {"id": "x", "workflow": "job_search"}])
+    assert [(t.id, t.workflow) for t in load_tasks(jsonl)] == [("1", "agent"), ("x", "job_search")]
+
+    yaml_file = tmp_path / "tasks.yaml"
+    yaml_file.write_text("tasks:\n  - id: rice\n    workflow: compare_offers\n    params: {product: rice}\n")
+    assert load_tasks(yaml_file)[0].params == {"product": "rice"}
+
+def test_load_tasks_rejects_unknown_workflow(tmp_path):
+    with pytest.raises(ValueError, match="unknown workflow"):
+        load_tasks(_write_tasks(tmp_path / "tasks.jsonl", [{"workflow": "nope"}]))
+
+def test_runner_bounds_concurrency_and_streams_results(tmp_path, sleepy):
+    tasks = load_tasks(_write_tasks(tmp_path / "tasks.jsonl", [{"workflow": "test_sleep"} for _ in range(200)] + [{"workflow": "test_sleep", "params": {"fail": True}}]))
+    output = tmp_path / "results.jsonl"
+    counts = asyncio.run(TaskRunner(Resources(), output, concurrency=8).run(tasks))
+
+    assert counts == {"ok": 200, "error": 1, "timeout": 0}
+    assert sleepy["peak"] == 8
+    records = [json.loads(line) for line in output.read_text().splitlines()]
+    assert len(records) == 201
+    assert [r["error"] for r in records if r["status"] == "error"] == ["RuntimeError: boom"]
+    assert len(finished_ids(output)) == 200
+
+def test_runner_times_out_slow_tasks(tmp_path, sleepy):
+    tasks = load_tasks(_write_tasks(tmp_path / "tasks.jsonl", [{"workflow": "test_sleep", "params": {"seconds": 5}}]))
+    counts = asyncio.run(TaskRunner(Resources(), tmp_path / "out.jsonl", task_timeout=0.05).run(tasks))
+    assert counts["timeout"] == 1
+
+def test_import_does_not_load_agent_stack():
+    code = "import sys, runner.run_tasks; print(any(m in sys.modules for m in ('browser_use', 'langchain_openai', 'playwright')))"
+    assert subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout.strip() == "False"
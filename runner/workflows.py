@@ -0,0 +1,102 @@
+"""
+Workflows the batch runner can execute.
+
+Each workflow is an async function taking the shared Resources and the task's
+parameters and returning something JSON-serializable. Agent modules are
+imported inside the workflow, so the runner only pays for the stacks its
+queued tasks actually use.
+"""
+
+from dataclasses import asdict
+from typing import Any, Awaitable, Callable
+
+WORKFLOWS: dict[str, Callable[..., Awaitable[Any]]] = {}
+
+
+def workflow(name: str):
+    """Register an async workflow under `name`"""
+
+    def decorator(func):
+        WORKFLOWS[name] = func
+        return func
+
+    return decorator
+
+
+def _history_result(history) -> dict:
+    # a history bound by the history log only holds the last steps; step numbers still count them all
+    last = history.history[-1] if history.history else None
+    steps = last.metadata.step_number if last is not None and last.metadata else len(history.history)
+    return {'success': bool(history.is_successful()), 'final_result': history.final_result(), 'steps': steps}
+
+
+@workflow('agent')
+async def run_agent(resources, task: str, max_steps: int = 50) -> dict:
+    """Free-form browser task in a pooled context"""
+    from browser_use import Agent
+
+    from common.tracing import trace_agent
+
+    async with resources.pool_for('agent').context() as context:
+        agent = Agent(task=task, llm=resources.llm, browser_context=context)
+        trace_agent(agent, resources.tracer)
+        return _history_result(await agent.run(max_steps=max_steps))
+
+
+@workflow('job_search')
+async def job_search(resources, company: str, max_steps: int = 100) -> dict:
+    from job_search_agent.read_apply_job import check_env, close_history_log, close_job_store, controller, run_job_search
+
+    check_env()
+    # jobs.csv is exported once, when the batch is over
+    resources.on_close(close_job_store)
+    resources.on_close(controller.log_stats)
+    resources.on_close(close_history_log)
+    return _history_result(await run_job_search(company, resources.pool_for('job_search'), resources.llm, resources.tracer, max_steps))
+
+
+@workflow('compare_offers')
+async def compare_offers(resources, product: str, max_price: float | None = None) -> list[dict]:
+    offers = await resources.buying_agent.compare_offers(product, max_price)
+    return [offer.model_dump() | {'total_price': offer.total_price} for offer in offers]
+
+
+@workflow('check_price')
+async def check_price(resources, url: str) -> dict | None:
+    check = await resources.buying_agent.current_price(url)
+    return check.model_dump() if check else None
+
+
+@workflow('jira_subtasks')
+async def jira_subtasks(resources, parent_key: str, subtasks: list[dict]) -> list[dict]:
+    from jira_agent.jira_agent import DEFAULT_JIRA_URL, browser_fallback
+    from jira_agent.jira_api import JiraClient, JiraConfig, SubtaskExecutor
+
+    from common.macros import MacroLibrary
+    from common.session_store import SessionStore
+
+    config = JiraConfig.from_env() or JiraConfig(base_url=DEFAULT_JIRA_URL)
+    client = JiraClient(config)
+
+    async def fallback(parent_key, rejected):
+        # the LLM is only built when the API actually rejects something
+        return await browser_fallback(
+            config.base_url,
+            llm=resources.llm,
+            headless=resources.headless,
+            macros=MacroLibrary.from_env(),
+            sessions=SessionStore.from_env(),
+        )(parent_key, rejected)
+
+    try:
+        results = await SubtaskExecutor(client, browser_fallback=fallback).create_subtasks(parent_key, subtasks)
+    finally:
+        client.close()
+    return [asdict(result) for result in results]
+
+
+@workflow('document_site')
+async def document_site(resources, url: str, output_dir: str, max_pages: int = 200, concurrency: int = 4) -> str:
+    from browser_agent.agent import document_with_crawler
+
+    return await document_with_crawler(max_pages, concurrency, url=url, output_dir=output_dir, llm=resources.llm)